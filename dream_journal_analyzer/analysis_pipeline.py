@@ -0,0 +1,249 @@
+"""
+Single-pass analysis pipeline for dream reports
+"""
+
+import re
+from collections import Counter, defaultdict
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional
+
+from dream_models import Dream
+from search_index import STOP_WORDS
+
+
+LOCATION_KEYWORDS = ['house', 'school', 'work', 'forest', 'beach', 'city', 'room', 'car', 'street']
+
+_WORD_PATTERN = re.compile(r'\b\w+\b')
+_WORD_CHAR = re.compile(r'\w')
+
+
+class Accumulator:
+    """Consumes dreams one at a time and produces a single metric
+    
+    Dreams are fed in chronological order. ``result`` is called once after
+    the last dream and its value is stored under ``name``.
+    """
+    
+    name = ''
+    
+    def update(self, dream: Dream):
+        raise NotImplementedError
+    
+    def result(self) -> Any:
+        raise NotImplementedError
+
+
+class MonthlyCounts(Accumulator):
+    """Number of dreams per ``YYYY-MM`` month"""
+    
+    name = 'dreams_by_month'
+    
+    def __init__(self):
+        self.counts = defaultdict(int)
+    
+    def update(self, dream: Dream):
+        self.counts[dream.date.strftime('%Y-%m')] += 1
+    
+    def result(self) -> Dict[str, int]:
+        return dict(self.counts)
+
+
+def count_words(contents: Iterable[str]) -> Counter:
+    """Count content words across texts, excluding stop words"""
+    counts = Counter()
+    for content in contents:
+        words = _WORD_PATTERN.findall(content.lower())
+        counts.update(word for word in words if word not in STOP_WORDS and len(word) > 2)
+    return counts
+
+
+def merge_counters(counters: List[Counter]) -> Counter:
+    """Tree-reduce partial counts, merging neighbours so chunk order is kept
+    
+    ``Counter.most_common`` breaks ties by first insertion, so merging the
+    partials strictly left to right keeps the result identical to counting
+    every text serially.
+    """
+    if not counters:
+        return Counter()
+    
+    while len(counters) > 1:
+        merged = []
+        for i in range(0, len(counters), 2):
+            left = counters[i]
+            if i + 1 < len(counters):
+                left.update(counters[i + 1])
+            merged.append(left)
+        counters = merged
+    return counters[0]
+
+
+class WordFrequency(Accumulator):
+    """Most common content words, excluding stop words
+    
+    With ``workers`` above one, dream contents are collected into chunks of
+    ``chunk_size`` and counted in a process pool while the pass continues;
+    the per-chunk counts are tree-reduced once the last dream is seen. The
+    pool is only started once a full chunk is ready, so small journals are
+    counted in-process.
+    """
+    
+    name = 'common_words'
+    
+    def __init__(self, limit: int = 20, workers: int = 0, chunk_size: int = 500):
+        self.limit = limit
+        self.workers = workers
+        self.chunk_size = max(1, chunk_size)
+        self.counts = Counter()
+        self._chunk: List[str] = []
+        self._pending: List[Future] = []
+        self._executor: Optional[ProcessPoolExecutor] = None
+    
+    def update(self, dream: Dream):
+        if self.workers <= 1:
+            self.counts.update(count_words((dream.content,)))
+            return
+        
+        self._chunk.append(dream.content)
+        if len(self._chunk) >= self.chunk_size:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            self._pending.append(self._executor.submit(count_words, self._chunk))
+            self._chunk = []
+    
+    def result(self) -> List[tuple]:
+        if self._executor is not None:
+            try:
+                partials = [future.result() for future in self._pending]
+            finally:
+                self._executor.shutdown()
+                self._executor = None
+            partials.append(count_words(self._chunk))
+            self.counts = merge_counters(partials)
+            self._pending = []
+            self._chunk = []
+        elif self._chunk:
+            self.counts = count_words(self._chunk)
+            self._chunk = []
+        
+        return self.counts.most_common(self.limit)
+
+
+class AverageLength(Accumulator):
+    """Mean dream length in words"""
+    
+    name = 'avg_dream_length'
+    
+    def __init__(self):
+        self.total_words = 0
+        self.count = 0
+    
+    def update(self, dream: Dream):
+        self.total_words += len(dream.content.split())
+        self.count += 1
+    
+    def result(self) -> float:
+        return self.total_words / self.count if self.count else 0
+
+
+class KeywordMatcher:
+    """Finds whole-word occurrences of many keywords in one scan
+    
+    The keywords are compiled into a single regex shaped like a trie, so
+    each position in the text is tried against shared prefixes instead of
+    every keyword in turn. The trie sits inside a lookahead, so every
+    position where a keyword starts is reported, including keywords nested
+    inside a longer one ("party" in "house party"). Shorter keywords that
+    start where a longer one does are precomputed per keyword. Matching is
+    case-insensitive; results are the lowercased keywords.
+    """
+    
+    def __init__(self, keywords: Iterable[str]):
+        normalized = (keyword.strip().lower() for keyword in keywords if keyword and keyword.strip())
+        self.keywords = list(dict.fromkeys(normalized))
+        self._rank = {keyword: rank for rank, keyword in enumerate(self.keywords)}
+        # Word boundaries by lookaround, so keywords such as "c++" that start or end in punctuation still match
+        self._pattern = re.compile(r'(?<!\w)(?=(' + self._trie_pattern(self.keywords) + r')(?!\w))') if self.keywords else None
+        self._prefixes = {keyword: self._keyword_prefixes(keyword) for keyword in self.keywords}
+    
+    def _keyword_prefixes(self, keyword: str) -> List[str]:
+        """Shorter keywords that a match of ``keyword`` also contains as whole words"""
+        return [
+            keyword[:end] for end in range(1, len(keyword))
+            if keyword[:end] in self._rank and not _WORD_CHAR.match(keyword, end)
+        ]
+    
+    @staticmethod
+    def _trie_pattern(keywords: List[str]) -> str:
+        """Regex source for a trie over the keywords"""
+        trie = {}
+        for keyword in keywords:
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[''] = {}
+        
+        def build(node: Dict[str, dict]) -> str:
+            branches = [re.escape(char) + build(child) for char, child in node.items() if char]
+            if not branches:
+                return ''
+            pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+            return f'(?:{pattern})?' if '' in node else pattern
+        
+        return '(?:' + build(trie) + ')'
+    
+    def find(self, text: str) -> List[str]:
+        """Distinct keywords occurring in the text, in configured order"""
+        if self._pattern is None:
+            return []
+        found = set()
+        for keyword in self._pattern.findall(text.lower()):
+            if keyword not in found:
+                found.add(keyword)
+                found.update(self._prefixes[keyword])
+        return sorted(found, key=self._rank.__getitem__)
+
+
+class SettingCounts(Accumulator):
+    """Location keywords mentioned across dreams"""
+    
+    name = 'common_settings'
+    
+    def __init__(self, matcher: KeywordMatcher = None, limit: int = 10):
+        self.matcher = matcher or KeywordMatcher(LOCATION_KEYWORDS)
+        self.limit = limit
+        self.counts = Counter()
+    
+    def update(self, dream: Dream):
+        self.counts.update(self.matcher.find(dream.content))
+    
+    def result(self) -> List[str]:
+        return [setting for setting, count in self.counts.most_common(self.limit)]
+
+
+class DayOfWeekCounts(Accumulator):
+    """Dreams per day of the week"""
+    
+    name = 'time_patterns'
+    
+    def __init__(self):
+        self.counts = defaultdict(int)
+    
+    def update(self, dream: Dream):
+        self.counts[dream.date.strftime('%A')] += 1
+    
+    def result(self) -> Dict[str, Any]:
+        most_common_day = max(self.counts, key=self.counts.get) if self.counts else "Unknown"
+        return {
+            'dreams_by_day': dict(self.counts),
+            'most_common_day': most_common_day
+        }
+
+
+def run_pipeline(dreams: Iterable[Dream], accumulators: List[Accumulator]) -> Dict[str, Any]:
+    """Feed every dream through all accumulators in a single pass"""
+    updates = [accumulator.update for accumulator in accumulators]
+    for dream in dreams:
+        for update in updates:
+            update(dream)
+    return {accumulator.name: accumulator.result() for accumulator in accumulators}
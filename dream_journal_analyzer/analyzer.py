@@ -2,19 +2,51 @@
 Dream pattern analysis and insights generation
 """
 
-import re
-from collections import Counter, defaultdict
-from datetime import datetime, timedelta
+from collections import Counter
+from dataclasses import asdict
+from datetime import datetime
 from typing import Dict, List, Any, Tuple
-import statistics
-from dream_models import DreamJournal, Dream
+from config import AnalysisSettings, default_settings
+from dream_models import DreamJournal
+from emotion_trends import EmotionTrend, emotion_trends, describe_trends
+from analysis_pipeline import (
+    Accumulator, MonthlyCounts, WordFrequency, AverageLength,
+    SettingCounts, DayOfWeekCounts, KeywordMatcher, LOCATION_KEYWORDS, run_pipeline
+)
 
 
 class DreamAnalyzer:
     """Analyzes dream patterns and generates insights"""
     
-    def __init__(self, journal: DreamJournal):
+    def __init__(self, journal: DreamJournal, settings: AnalysisSettings = None):
         self.journal = journal
+        self.settings = settings or default_settings().analysis
+        self._location_matcher = None
+    
+    def _run(self, accumulators: List[Accumulator]) -> Dict[str, Any]:
+        """Stream the journal once through the given accumulators"""
+        return run_pipeline(self.journal.iter_dreams_by_date(), accumulators)
+    
+    def _pattern_accumulators(self, stats: Dict[str, Any]) -> List[Accumulator]:
+        """Accumulators behind analyze_patterns"""
+        return [MonthlyCounts()]
+    
+    def _content_accumulators(self) -> List[Accumulator]:
+        """Accumulators behind analyze_content_patterns"""
+        return [self._word_frequency(), AverageLength(), self._setting_counts(), DayOfWeekCounts()]
+    
+    def _word_frequency(self) -> WordFrequency:
+        """Word counter, parallel when analysis.parallel_workers is above one"""
+        return WordFrequency(
+            workers=self.settings.parallel_workers,
+            chunk_size=self.settings.parallel_chunk_size
+        )
+    
+    def _setting_counts(self) -> SettingCounts:
+        """Settings counter over the configured location vocabulary"""
+        if self._location_matcher is None:
+            self._location_matcher = KeywordMatcher(self.settings.location_keywords or LOCATION_KEYWORDS)
+        return SettingCounts(self._location_matcher)
     
     def analyze_patterns(self) -> Dict[str, Any]:
         """Analyze dream patterns and return insights"""
@@ -26,9 +58,13 @@ class DreamAnalyzer:
                 'message': 'No dreams to analyze yet. Start logging your dreams!'
             }
         
+        return self._build_insights(stats, self._run(self._pattern_accumulators(stats)))
+    
+    def _build_insights(self, stats: Dict[str, Any], results: Dict[str, Any]) -> Dict[str, Any]:
+        """Combine journal statistics and pipeline results into insights"""
         # Time-based analysis
-        dreams_by_month = self._analyze_dreams_by_month()
-        most_active_period = self._find_most_active_period()
+        dreams_by_month = results['dreams_by_month']
+        most_active_period = self._find_most_active_period(dreams_by_month)
         
         # Content analysis
         top_emotions = self._get_top_items(stats['emotion_counts'], 5)
@@ -36,11 +72,14 @@ class DreamAnalyzer:
         common_characters = self._get_top_items(stats['character_counts'], 5)
         
         # Pattern analysis
-        recurring_themes = self._find_recurring_themes()
-        emotional_trends = self._analyze_emotional_trends()
+        recurring_themes = self._find_recurring_themes(stats['theme_counts'])
+        theme_associations = self._find_theme_associations(recurring_themes[:3])
+        trend_window = self._trend_window()
+        trends = emotion_trends(trend_window)
+        emotional_trends = describe_trends(trends, trend_window, self._trend_bucket())
         
         # Calculate averages
-        avg_dreams_per_month = self._calculate_avg_dreams_per_month()
+        avg_dreams_per_month = self._calculate_avg_dreams_per_month(stats)
         
         return {
             'total_dreams': stats['total_dreams'],
@@ -52,23 +91,20 @@ class DreamAnalyzer:
             'lucid_percentage': stats['lucid_percentage'],
             'nightmare_percentage': stats['nightmare_percentage'],
             'recurring_themes': recurring_themes,
+            'theme_associations': theme_associations,
             'emotional_trends': emotional_trends,
+            'emotion_trends': [asdict(trend) for trend in trends],
             'dreams_by_month': dreams_by_month
         }
     
     def _analyze_dreams_by_month(self) -> Dict[str, int]:
         """Analyze dream frequency by month"""
-        dreams_by_month = defaultdict(int)
-        
-        for dream in self.journal.dreams:
-            month_key = dream.date.strftime('%Y-%m')
-            dreams_by_month[month_key] += 1
-        
-        return dict(dreams_by_month)
+        return self._run([MonthlyCounts()])['dreams_by_month']
     
-    def _find_most_active_period(self) -> str:
+    def _find_most_active_period(self, dreams_by_month: Dict[str, int] = None) -> str:
         """Find the most active dreaming period"""
-        dreams_by_month = self._analyze_dreams_by_month()
+        if dreams_by_month is None:
+            dreams_by_month = self._analyze_dreams_by_month()
         
         if not dreams_by_month:
             return "No data available"
@@ -80,153 +116,98 @@ class DreamAnalyzer:
         """Get top items from a count dictionary"""
         return [item for item, count in Counter(counts).most_common(limit)]
     
-    def _find_recurring_themes(self) -> List[str]:
+    def _find_recurring_themes(self, theme_counts: Dict[str, int] = None) -> List[str]:
         """Find themes that appear in multiple dreams"""
-        stats = self.journal.get_statistics()
-        theme_counts = stats['theme_counts']
+        if theme_counts is None:
+            theme_counts = self.journal.get_statistics().get('theme_counts', {})
         
         # Themes that appear in at least 2 dreams
         recurring = [theme for theme, count in theme_counts.items() if count >= 2]
         return sorted(recurring, key=lambda x: theme_counts[x], reverse=True)
     
+    def _find_theme_associations(self, themes: List[str]) -> Dict[str, List[str]]:
+        """Themes most often recorded together with each of the given themes"""
+        associations = {}
+        for theme in themes:
+            linked = [tag for kind, tag, count in self.journal.get_cooccurring_tags('themes', theme)
+                      if kind == 'themes' and count >= 2]
+            if linked:
+                associations[theme] = linked[:3]
+        return associations
+    
+    def _trend_bucket(self) -> str:
+        return self.settings.trend_bucket
+    
+    def _trend_window(self) -> List[Tuple[str, int, Counter]]:
+        """Per-bucket counts for the latest analysis.trend_window weeks or months"""
+        buckets = self.journal.get_emotion_buckets(self._trend_bucket())
+        return buckets.window(self.settings.trend_window)
+    
+    def _emotion_trends(self) -> List[EmotionTrend]:
+        """Slope and largest shift of every emotion over the trend window"""
+        return emotion_trends(self._trend_window())
+    
     def _analyze_emotional_trends(self) -> str:
         """Analyze emotional trends over time"""
-        if len(self.journal.dreams) < 2:
-            return "Not enough data for trend analysis"
-        
-        # Sort dreams by date
-        sorted_dreams = sorted(self.journal.dreams, key=lambda d: d.date)
-        
-        # Split into two halves
-        mid_point = len(sorted_dreams) // 2
-        early_dreams = sorted_dreams[:mid_point]
-        recent_dreams = sorted_dreams[mid_point:]
-        
-        # Count emotions in each half
-        early_emotions = Counter()
-        recent_emotions = Counter()
-        
-        for dream in early_dreams:
-            early_emotions.update(dream.emotions)
-        
-        for dream in recent_dreams:
-            recent_emotions.update(dream.emotions)
-        
-        # Find changes
-        increasing_emotions = []
-        decreasing_emotions = []
-        
-        all_emotions = set(early_emotions.keys()) | set(recent_emotions.keys())
-        
-        for emotion in all_emotions:
-            early_count = early_emotions.get(emotion, 0)
-            recent_count = recent_emotions.get(emotion, 0)
-            
-            if recent_count > early_count:
-                increasing_emotions.append(emotion)
-            elif early_count > recent_count:
-                decreasing_emotions.append(emotion)
-        
-        trends = []
-        if increasing_emotions:
-            trends.append(f"Increasing: {', '.join(increasing_emotions[:3])}")
-        if decreasing_emotions:
-            trends.append(f"Decreasing: {', '.join(decreasing_emotions[:3])}")
-        
-        return "; ".join(trends) if trends else "No significant trends detected"
+        window = self._trend_window()
+        return describe_trends(emotion_trends(window), window, self._trend_bucket())
     
-    def _calculate_avg_dreams_per_month(self) -> float:
+    def _calculate_avg_dreams_per_month(self, stats: Dict[str, Any] = None) -> float:
         """Calculate average dreams per month"""
-        if not self.journal.dreams:
+        if stats is None:
+            stats = self.journal.get_statistics()
+        
+        if not stats['total_dreams']:
             return 0.0
         
-        dates = [dream.date for dream in self.journal.dreams]
-        earliest = min(dates)
-        latest = max(dates)
+        earliest = stats['earliest_date']
+        latest = stats['latest_date']
         
         # Calculate number of months
         months = (latest.year - earliest.year) * 12 + (latest.month - earliest.month) + 1
         
-        return len(self.journal.dreams) / months if months > 0 else 0.0
+        return stats['total_dreams'] / months if months > 0 else 0.0
     
     def analyze_content_patterns(self) -> Dict[str, Any]:
         """Analyze patterns in dream content"""
-        if not self.journal.dreams:
+        if not self.journal.get_statistics()['total_dreams']:
             return {}
         
-        # Word frequency analysis
-        word_freq = self._analyze_word_frequency()
-        
-        # Dream length analysis
-        lengths = [len(dream.content.split()) for dream in self.journal.dreams]
-        avg_length = statistics.mean(lengths) if lengths else 0
-        
-        # Common settings/locations
-        settings = self._extract_settings()
-        
-        # Time-related patterns
-        time_patterns = self._analyze_time_patterns()
-        
+        return self._build_content_patterns(self._run(self._content_accumulators()))
+    
+    def _build_content_patterns(self, results: Dict[str, Any]) -> Dict[str, Any]:
+        """Pick the content pattern metrics out of pipeline results"""
         return {
-            'common_words': word_freq,
-            'avg_dream_length': avg_length,
-            'common_settings': settings,
-            'time_patterns': time_patterns
+            'common_words': results['common_words'],
+            'avg_dream_length': results['avg_dream_length'],
+            'common_settings': results['common_settings'],
+            'time_patterns': results['time_patterns']
         }
     
     def _analyze_word_frequency(self) -> List[Tuple[str, int]]:
         """Analyze word frequency in dream content"""
-        # Common words to exclude
-        stop_words = {
-            'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by',
-            'is', 'was', 'were', 'are', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did',
-            'i', 'me', 'my', 'mine', 'you', 'your', 'yours', 'he', 'him', 'his', 'she', 'her', 'hers',
-            'it', 'its', 'we', 'us', 'our', 'ours', 'they', 'them', 'their', 'theirs'
-        }
-        
-        word_count = Counter()
-        
-        for dream in self.journal.dreams:
-            # Extract words and clean them
-            words = re.findall(r'\b\w+\b', dream.content.lower())
-            filtered_words = [word for word in words if word not in stop_words and len(word) > 2]
-            word_count.update(filtered_words)
-        
-        return word_count.most_common(20)
+        return self._run([self._word_frequency()])['common_words']
     
     def _extract_settings(self) -> List[str]:
         """Extract common settings/locations from dreams"""
-        settings = []
-        location_keywords = ['house', 'school', 'work', 'forest', 'beach', 'city', 'room', 'car', 'street']
-        
-        for dream in self.journal.dreams:
-            content_lower = dream.content.lower()
-            for keyword in location_keywords:
-                if keyword in content_lower:
-                    settings.append(keyword)
-        
-        return [setting for setting, count in Counter(settings).most_common(10)]
+        return self._run([self._setting_counts()])['common_settings']
     
     def _analyze_time_patterns(self) -> Dict[str, Any]:
         """Analyze time-related patterns in dreams"""
-        # Group dreams by day of week
-        day_counts = defaultdict(int)
-        
-        for dream in self.journal.dreams:
-            day_of_week = dream.date.strftime('%A')
-            day_counts[day_of_week] += 1
-        
-        most_common_day = max(day_counts, key=day_counts.get) if day_counts else "Unknown"
-        
-        return {
-            'dreams_by_day': dict(day_counts),
-            'most_common_day': most_common_day
-        }
+        return self._run([DayOfWeekCounts()])['time_patterns']
     
     def generate_report(self) -> str:
         """Generate a comprehensive dream analysis report"""
-        insights = self.analyze_patterns()
-        content_patterns = self.analyze_content_patterns()
+        stats = self.journal.get_statistics()
+        
+        if stats['total_dreams'] == 0:
+            insights = self.analyze_patterns()
+            content_patterns = self.analyze_content_patterns()
+        else:
+            # Every report metric comes out of a single pass over the journal
+            results = self._run(self._pattern_accumulators(stats) + self._content_accumulators())
+            insights = self._build_insights(stats, results)
+            content_patterns = self._build_content_patterns(results)
         
         report = []
         report.append("🌙 DREAM JOURNAL ANALYSIS REPORT 🌙")
@@ -256,6 +237,9 @@ class DreamAnalyzer:
         report.append("-" * 20)
         report.append(f"Top themes: {', '.join(insights['top_themes'])}")
         report.append(f"Recurring themes: {', '.join(insights['recurring_themes'])}")
+        if insights['theme_associations']:
+            linked = [f"{theme} ↔ {', '.join(others)}" for theme, others in insights['theme_associations'].items()]
+            report.append(f"Linked themes: {'; '.join(linked)}")
         report.append("")
         
         # Characters
@@ -0,0 +1,60 @@
+"""
+Crash-safe file replacement
+
+Files are written beside their destination and renamed over it only once
+complete, so a crash leaves either the old or the new version, never a
+truncated one. With ``fsync`` the data and the rename are also flushed to
+disk before returning, which survives power loss as well.
+"""
+
+import os
+from contextlib import contextmanager
+from typing import IO, Iterator
+
+
+def temp_path(path: str) -> str:
+    """Scratch name beside ``path``; per process so concurrent writers never share one"""
+    return f'{path}.{os.getpid()}.tmp'
+
+
+def _fsync_directory(path: str):
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        # Directories cannot be opened on Windows, where renames need no flush
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def replace_file(source: str, path: str, fsync: bool = False):
+    """Move a finished file over ``path``"""
+    if fsync:
+        with open(source, 'rb') as f:
+            os.fsync(f.fileno())
+    os.replace(source, path)
+    if fsync:
+        _fsync_directory(path)
+
+
+@contextmanager
+def atomic_write(path: str, mode: str = 'wb', fsync: bool = False) -> Iterator[IO]:
+    """Open a temporary file that replaces ``path`` when the block finishes without error"""
+    scratch = temp_path(path)
+    try:
+        with open(scratch, mode) as f:
+            yield f
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(scratch, path)
+    except BaseException:
+        try:
+            os.unlink(scratch)
+        except OSError:
+            pass
+        raise
+    if fsync:
+        _fsync_directory(path)
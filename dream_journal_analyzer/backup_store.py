@@ -0,0 +1,176 @@
+"""
+Incremental backups built from content-addressed chunks
+
+Each backup records, for every journal file, its signature and the list of
+chunks that make it up. Chunks are stored once under ``chunks/``, named by
+their digest, so data that an earlier backup already holds is never
+written again. A file whose signature has not changed is not read at all,
+and an append-only file such as the operation log is only read from its
+last stored chunk onwards, so between compactions a backup costs about as
+much as the changes since the previous one. All backups are listed in one
+catalog file, so pruning never has to scan the backup directory.
+"""
+
+import hashlib
+import os
+from datetime import datetime
+from typing import Any, Collection, Dict, List, Optional, Tuple
+
+from atomic_file import atomic_write
+from indexes import file_signature
+from serialization import dumpb, loads
+
+
+CHUNK_SIZE = 1 << 20
+CATALOG_FORMAT = 1
+
+
+def chunk_digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+class BackupStore:
+    """Backups of a set of files in one directory, sharing chunks between backups"""
+    
+    def __init__(self, directory: str, fsync: bool = False):
+        self.directory = directory
+        self.fsync = fsync
+        self._catalog_file = os.path.join(directory, 'catalog.json')
+        self.backups: List[Dict[str, Any]] = self._read_catalog()
+    
+    def _read_catalog(self) -> List[Dict[str, Any]]:
+        try:
+            with open(self._catalog_file, 'rb') as f:
+                catalog = loads(f.read())
+        except FileNotFoundError:
+            return []
+        if catalog.get('format') != CATALOG_FORMAT:
+            raise ValueError(f"Unsupported backup catalog format in {self._catalog_file}")
+        return catalog['backups']
+    
+    def _write_catalog(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with atomic_write(self._catalog_file, fsync=self.fsync) as f:
+            f.write(dumpb({'format': CATALOG_FORMAT, 'backups': self.backups}, indent=True))
+    
+    def _chunk_path(self, digest: str) -> str:
+        return os.path.join(self.directory, 'chunks', digest[:2], digest)
+    
+    def _store_chunk(self, data: bytes) -> Tuple[List[Any], int]:
+        """Store a chunk unless it is already present; returns its entry and the bytes written"""
+        digest = chunk_digest(data)
+        path = self._chunk_path(digest)
+        if os.path.exists(path):
+            return [digest, len(data)], 0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with atomic_write(path, fsync=self.fsync) as f:
+            f.write(data)
+        return [digest, len(data)], len(data)
+    
+    def _backup_file(self, path: str, previous: Optional[Dict[str, Any]],
+                     append_only: bool) -> Tuple[Optional[Dict[str, Any]], int, int]:
+        """Chunk list of one file, reading only what changed since the previous backup
+        
+        Returns the file's entry, or None if it does not exist, with the
+        bytes read and written.
+        """
+        signature = file_signature(path)
+        if signature is None:
+            return None, 0, 0
+        if previous is not None and tuple(previous['signature']) == signature:
+            return previous, 0, 0
+        
+        chunks: List[List[Any]] = []
+        offset = read = written = 0
+        with open(path, 'rb') as f:
+            if append_only and previous is not None and previous['chunks']:
+                # Appends leave everything before the last stored chunk as it was;
+                # re-reading that chunk confirms the file was not rewritten meanwhile
+                chunks = previous['chunks'][:-1]
+                offset = sum(length for _, length in chunks)
+                digest, length = previous['chunks'][-1]
+                f.seek(offset)
+                data = f.read(length)
+                read += len(data)
+                if chunk_digest(data) != digest:
+                    chunks, offset = [], 0
+                f.seek(offset)
+            
+            while True:
+                data = f.read(CHUNK_SIZE)
+                if not data:
+                    break
+                read += len(data)
+                chunk, stored = self._store_chunk(data)
+                chunks.append(chunk)
+                written += stored
+        return {'signature': list(signature), 'chunks': chunks}, read, written
+    
+    def create(self, files: List[str], append_only: Collection[str] = ()) -> Dict[str, Any]:
+        """Back up the given files and return the backup's name with what it cost"""
+        previous = self.backups[-1]['files'] if self.backups else {}
+        entries = {}
+        read = written = size = 0
+        for path in files:
+            entry, file_read, file_written = self._backup_file(path, previous.get(path), path in append_only)
+            if entry is None:
+                continue
+            entries[path] = entry
+            read += file_read
+            written += file_written
+            size += entry['signature'][0]
+        
+        now = datetime.now()
+        name = f"dreams_backup_{now.strftime('%Y%m%d_%H%M%S')}"
+        names = {backup['name'] for backup in self.backups}
+        suffix = 1
+        while name in names:
+            suffix += 1
+            name = f"dreams_backup_{now.strftime('%Y%m%d_%H%M%S')}_{suffix}"
+        
+        # Chunks are written before the catalog names them, so a crash never leaves a backup with missing data
+        self.backups.append({'name': name, 'created': now.isoformat(), 'files': entries})
+        self._write_catalog()
+        return {'name': name, 'read': read, 'written': written, 'size': size}
+    
+    def prune(self, keep: int) -> List[str]:
+        """Drop all but the newest ``keep`` backups and delete chunks no remaining backup uses"""
+        if len(self.backups) <= keep:
+            return []
+        dropped = self.backups[:len(self.backups) - keep]
+        self.backups = self.backups[len(self.backups) - keep:]
+        self._write_catalog()
+        
+        live = {digest for backup in self.backups
+                for entry in backup['files'].values() for digest, _ in entry['chunks']}
+        for backup in dropped:
+            for entry in backup['files'].values():
+                for digest, _ in entry['chunks']:
+                    if digest in live:
+                        continue
+                    live.add(digest)
+                    try:
+                        os.unlink(self._chunk_path(digest))
+                    except FileNotFoundError:
+                        pass
+        return [backup['name'] for backup in dropped]
+    
+    def restore(self, name: str, destination: str) -> List[str]:
+        """Reassemble every file of a backup into a directory, verifying each chunk"""
+        backup = next((backup for backup in self.backups if backup['name'] == name), None)
+        if backup is None:
+            raise ValueError(f"No backup named {name}")
+        
+        os.makedirs(destination, exist_ok=True)
+        restored = []
+        for path, entry in backup['files'].items():
+            target = os.path.join(destination, os.path.basename(path))
+            with atomic_write(target, fsync=self.fsync) as f:
+                for digest, length in entry['chunks']:
+                    with open(self._chunk_path(digest), 'rb') as chunk:
+                        data = chunk.read()
+                    if len(data) != length or chunk_digest(data) != digest:
+                        raise ValueError(f"Backup chunk {digest} is corrupt")
+                    f.write(data)
+            restored.append(target)
+        return restored
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for Dream (de)serialization
+
+Compares the previous dataclasses.asdict / json path with the hand-rolled
+to_dict and from_dict, with and without the optional JSON accelerator.
+
+    python benchmarks/serialization_benchmark.py [--dreams 50000]
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import serialization
+from dream_models import Dream
+
+
+def make_dreams(count: int):
+    """Synthetic dreams of a realistic size"""
+    base = datetime(2020, 1, 1)
+    return [
+        Dream(
+            title=f'Dream {i}',
+            content=f'I was flying over the city at night number {i} and the lights below were shimmering. ' * 3,
+            emotions=['joy', 'wonder', 'free'],
+            characters=['myself', 'a stranger'],
+            themes=['flight', 'city'],
+            lucid=i % 4 == 0,
+            nightmare=i % 9 == 0,
+            date=base + timedelta(minutes=i * 37),
+            id=f'{i:08x}'
+        )
+        for i in range(count)
+    ]
+
+
+def legacy_to_dict(dream: Dream):
+    data = asdict(dream)
+    data['date'] = dream.date.isoformat()
+    return data
+
+
+def legacy_from_dict(data):
+    data = dict(data)
+    data['date'] = datetime.fromisoformat(data['date'])
+    return Dream(**data)
+
+
+def timed(label: str, count: int, func, repeat: int = 3):
+    """Best wall time of a few runs, each starting from a collected heap"""
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    print(f"  {label:<38} {best * 1000:9.1f} ms  {count / best:12,.0f} dreams/s")
+    return best
+
+
+def run(count: int):
+    dreams = make_dreams(count)
+    records = [dream.to_dict() for dream in dreams]
+    path = os.path.join(tempfile.mkdtemp(), 'dreams.json')
+    accelerator = serialization.ACCELERATOR
+    
+    print(f"\nto_dict / from_dict ({count:,} dreams)")
+    timed('to_dict (dataclasses.asdict)', count, lambda: [legacy_to_dict(d) for d in dreams])
+    timed('to_dict (hand-rolled)', count, lambda: [d.to_dict() for d in dreams])
+    timed('from_dict (copy + mutate)', count, lambda: [legacy_from_dict(r) for r in records])
+    timed('from_dict (non-mutating)', count, lambda: [Dream.from_dict(r) for r in records])
+    
+    print(f"\nSnapshot round trip ({count:,} dreams)")
+    
+    def legacy_save():
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump([legacy_to_dict(d) for d in dreams], f, indent=2, ensure_ascii=False)
+    
+    def legacy_load():
+        with open(path, 'r', encoding='utf-8') as f:
+            return [legacy_from_dict(r) for r in json.load(f)]
+    
+    def save():
+        with open(path, 'wb') as f:
+            f.write(serialization.dumpb([d.to_dict() for d in dreams], indent=True))
+    
+    def load():
+        return [Dream.from_dict(r) for r in serialization.iter_array_file(path)]
+    
+    def load_raw():
+        # JsonStorage keeps snapshot records raw until a dream is read
+        return list(serialization.iter_array_file(path))
+    
+    baseline = timed('save (asdict + json)', count, legacy_save)
+    baseline += timed('load (json + copy + mutate)', count, legacy_load)
+    
+    serialization.ACCELERATOR = None
+    stdlib = timed('save (hand-rolled + json)', count, save)
+    stdlib += timed('load (streamed json)', count, load)
+    timed('load raw records (streamed json)', count, load_raw)
+    
+    if accelerator is not None:
+        serialization.ACCELERATOR = accelerator
+        fast = timed(f'save (hand-rolled + {accelerator})', count, save)
+        fast += timed(f'load ({accelerator})', count, load)
+        timed(f'load raw records ({accelerator})', count, load_raw)
+    else:
+        fast = None
+        print("  (install orjson or msgspec to measure the accelerated path)")
+    
+    print(f"\nRound trip speed-up vs. previous: stdlib {baseline / stdlib:.1f}x", end='')
+    if fast is not None:
+        print(f", {accelerator} {baseline / fast:.1f}x")
+    else:
+        print()
+    
+    os.unlink(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Dream serialization micro-benchmark')
+    parser.add_argument('--dreams', type=int, default=50000, help='Number of synthetic dreams')
+    args = parser.parse_args()
+    run(args.dreams)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Start-up time regression check for the command line interface
+
+Runs each subcommand under ``python -X importtime`` against a scratch
+journal, reports import and wall time, and fails when a command goes over
+its import-time budget or loads a module it should not need (matplotlib
+for everything but charts).
+
+    python benchmarks/startup_benchmark.py [--runs 5] [--scale 1.5]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, Set, Tuple
+
+MAIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'main.py')
+
+# Import-time budget per command, in milliseconds
+BUDGETS = {
+    'add': 120,
+    'list': 120,
+    'view': 120,
+    'export': 150,
+    'import': 150,
+    'analyze': 180,
+    'report': 180,
+}
+
+# Only chart generation may load these
+HEAVY_MODULES = ('matplotlib', 'numpy')
+
+COMMANDS = {
+    'add': ['add', 'Benchmark dream', 'Flying over a quiet city', '--emotions', 'calm'],
+    'list': ['list', '--limit', '5'],
+    'view': ['view', '1'],
+    'export': ['export', '--format', 'jsonl', '--output', 'export.jsonl'],
+    'import': ['import', 'export.jsonl'],
+    'analyze': ['analyze'],
+    'report': ['report'],
+}
+
+
+def parse_importtime(stderr: str) -> Tuple[float, Set[str]]:
+    """Total import time in ms and the set of top-level packages imported"""
+    total_us = 0
+    modules = set()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = line.split('|')
+        modules.add(name.strip().split('.')[0])
+        # Unindented entries are imported directly, so their cumulative times add up to the total
+        if not name.startswith('  '):
+            total_us += int(cumulative_us)
+    return total_us / 1000, modules
+
+
+def check_command(name: str, import_ms: float, modules: Set[str], scale: float = 1.0) -> List[str]:
+    """Budget and heavy-module violations of one command's start-up"""
+    failures = []
+    budget = BUDGETS[name] * scale
+    if import_ms > budget:
+        failures.append(f"{name}: imports took {import_ms:.1f} ms, budget {budget:.0f} ms")
+    loaded = sorted(set(HEAVY_MODULES) & modules)
+    if loaded:
+        failures.append(f"{name}: imported {', '.join(loaded)}")
+    return failures
+
+
+def run_command(argv: List[str], cwd: str) -> Tuple[float, float, Set[str]]:
+    env = dict(os.environ)
+    # Measure with cached bytecode, as an installed copy would run
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', MAIN] + argv,
+        cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+    )
+    wall = (time.perf_counter() - start) * 1000
+    if result.returncode:
+        raise RuntimeError(f"{' '.join(argv)} exited with status {result.returncode}")
+    import_ms, modules = parse_importtime(result.stderr)
+    return import_ms, wall, modules
+
+
+def run(runs: int, scale: float) -> bool:
+    workdir = tempfile.mkdtemp()
+    # Seed the journal and warm the bytecode cache
+    for command in COMMANDS.values():
+        run_command(command, workdir)
+    
+    failures = []
+    print(f"\n{'command':<10} {'imports':>10} {'wall':>10} {'budget':>10}")
+    for name, argv in COMMANDS.items():
+        best_import = best_wall = float('inf')
+        modules: Set[str] = set()
+        for _ in range(runs):
+            import_ms, wall, modules = run_command(argv, workdir)
+            best_import = min(best_import, import_ms)
+            best_wall = min(best_wall, wall)
+        
+        print(f"{name:<10} {best_import:8.1f}ms {best_wall:8.1f}ms {BUDGETS[name] * scale:8.0f}ms")
+        failures.extend(check_command(name, best_import, modules, scale))
+    
+    if failures:
+        print("\nStart-up regressions:")
+        for failure in failures:
+            print(f"  {failure}")
+        return False
+    print("\nAll commands within budget")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='CLI start-up time regression check')
+    parser.add_argument('--runs', type=int, default=5, help='Runs per command; the best is kept')
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiply every budget, for slower machines')
+    args = parser.parse_args()
+    sys.exit(0 if run(args.runs, args.scale) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,566 @@
+"""
+Memory-mapped binary snapshot format for the dream journal
+"""
+
+import heapq
+import json
+import mmap
+import struct
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Type
+
+import numpy as np
+
+from dream_models import Dream
+from dream_records import FLAG_FIELDS, LUCID, NIGHTMARE
+from emotion_trends import EmotionBuckets
+from indexes import DateIndex, StatisticsIndex, newest_first
+
+
+MAGIC = b'DJSNAP\x00\x01'
+# Magic, then the offset and length of the JSON header written at the end
+_PREAMBLE = struct.Struct('<8sQQ')
+
+TAG_FIELDS = ('emotions', 'characters', 'themes')
+
+# One fixed-width row per dream, kept sorted by date and then insertion order
+RECORD_DTYPE = np.dtype([
+    ('date', '<i8'),
+    ('text', '<u8'),
+    ('emotions', '<u8'),
+    ('characters', '<u8'),
+    ('themes', '<u8'),
+    ('id_len', '<u4'),
+    ('title_len', '<u4'),
+    ('content_len', '<u4'),
+    ('utc_offset', '<i4'),
+    ('n_emotions', '<u2'),
+    ('n_characters', '<u2'),
+    ('n_themes', '<u2'),
+    ('flags', 'u1'),
+    ('reserved', 'u1')
+])
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+# utc_offset value for dates without a timezone
+_NAIVE = -(2 ** 31)
+
+
+def _to_micros(date: datetime) -> int:
+    """Wall-clock microseconds since the epoch, ignoring any timezone"""
+    return (date.replace(tzinfo=None) - _EPOCH) // _MICROSECOND
+
+
+def write_snapshot(path: str, dreams: Iterable[Dream]):
+    """Write dreams, given in insertion order, as a binary snapshot
+    
+    Text is streamed straight to the file; only the fixed-width rows, tag
+    references and ids are held in memory until the end, where the rows are
+    sorted by date and the remaining sections and header are appended.
+    """
+    rows: List[tuple] = []
+    ids: List[str] = []
+    refs = {field: array('I') for field in TAG_FIELDS}
+    pool: Dict[str, int] = {}
+    
+    with open(path, 'wb') as f:
+        f.write(_PREAMBLE.pack(MAGIC, 0, 0))
+        text_start = f.tell()
+        position = 0
+        
+        for dream in dreams:
+            id_bytes = dream.id.encode('utf-8')
+            title = dream.title.encode('utf-8')
+            content = dream.content.encode('utf-8')
+            f.write(id_bytes)
+            f.write(title)
+            f.write(content)
+            
+            starts = []
+            for field in TAG_FIELDS:
+                starts.append(len(refs[field]))
+                for tag in getattr(dream, field):
+                    refs[field].append(pool.setdefault(tag, len(pool)))
+            
+            utc_offset = dream.date.utcoffset()
+            rows.append((
+                _to_micros(dream.date), position, starts[0], starts[1], starts[2],
+                len(id_bytes), len(title), len(content),
+                _NAIVE if utc_offset is None else int(utc_offset.total_seconds()),
+                len(dream.emotions), len(dream.characters), len(dream.themes),
+                (LUCID if dream.lucid else 0) | (NIGHTMARE if dream.nightmare else 0), 0
+            ))
+            ids.append(dream.id)
+            position += len(id_bytes) + len(title) + len(content)
+        
+        count = len(rows)
+        records = np.array(rows, dtype=RECORD_DTYPE)
+        del rows
+        
+        # Sort rows by date, equal dates in insertion order to match DateIndex; remember both orders
+        by_id_insertion = sorted(range(count), key=ids.__getitem__)
+        row_order = np.argsort(records['date'], kind='stable')
+        records = records[row_order]
+        insertion_to_row = np.empty(count, dtype='<u8')
+        insertion_to_row[row_order] = np.arange(count, dtype='<u8')
+        by_id = insertion_to_row[np.asarray(by_id_insertion, dtype=np.int64)] if count else insertion_to_row
+        
+        pool_bytes = [tag.encode('utf-8') for tag in pool]
+        pool_offsets = np.zeros(len(pool_bytes) + 1, dtype='<u8')
+        np.cumsum([len(data) for data in pool_bytes], out=pool_offsets[1:])
+        
+        sections = {'text': [text_start, position]}
+        
+        def write_section(name: str, data: bytes):
+            padding = -f.tell() % 8
+            f.write(b'\0' * padding)
+            sections[name] = [f.tell(), len(data)]
+            f.write(data)
+        
+        write_section('records', records.tobytes())
+        write_section('order', insertion_to_row.tobytes())
+        write_section('by_id', np.asarray(by_id, dtype='<u8').tobytes())
+        for field in TAG_FIELDS:
+            write_section(field, np.frombuffer(refs[field], dtype=np.uint32).astype('<u4').tobytes())
+        write_section('pool_offsets', pool_offsets.tobytes())
+        write_section('pool', b''.join(pool_bytes))
+        
+        header = json.dumps({'count': count, 'pool': len(pool_bytes), 'sections': sections}).encode('utf-8')
+        header_offset = f.tell()
+        f.write(header)
+        f.seek(0)
+        f.write(_PREAMBLE.pack(MAGIC, header_offset, len(header)))
+
+
+class BinarySnapshot:
+    """Read-only view of a binary snapshot mapped into memory
+    
+    Opening the file only maps it and wraps the sections in numpy arrays;
+    nothing is parsed per dream until a row is actually read.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        buffer = self._mmap
+        if len(buffer) < _PREAMBLE.size:
+            raise ValueError("Truncated snapshot")
+        magic, header_offset, header_len = _PREAMBLE.unpack_from(buffer, 0)
+        if magic != MAGIC or header_offset + header_len > len(buffer):
+            raise ValueError("Not a dream journal snapshot")
+        header = json.loads(buffer[header_offset:header_offset + header_len])
+        
+        self.count: int = header['count']
+        sections = header['sections']
+        
+        def view(name: str, dtype) -> np.ndarray:
+            offset, length = sections[name]
+            return np.frombuffer(buffer, dtype=dtype, count=length // np.dtype(dtype).itemsize, offset=offset)
+        
+        self.records = view('records', RECORD_DTYPE)
+        self.dates = self.records['date']
+        self.flags = self.records['flags']
+        self.order = view('order', '<u8')
+        self.by_id = view('by_id', '<u8')
+        self._positions: Optional[np.ndarray] = None
+        self.refs = {field: view(field, '<u4') for field in TAG_FIELDS}
+        self._text_start = sections['text'][0]
+        
+        offsets = view('pool_offsets', '<u8')
+        pool_start = sections['pool'][0]
+        self.pool: List[str] = [
+            bytes(buffer[pool_start + int(offsets[i]):pool_start + int(offsets[i + 1])]).decode('utf-8')
+            for i in range(header['pool'])
+        ]
+    
+    def row_id(self, row: int) -> str:
+        record = self.records[row]
+        start = self._text_start + int(record['text'])
+        return self._mmap[start:start + int(record['id_len'])].decode('utf-8')
+    
+    def row_date(self, row: int) -> datetime:
+        record = self.records[row]
+        return self._date(int(record['date']), int(record['utc_offset']))
+    
+    @staticmethod
+    def _date(micros: int, utc_offset: int) -> datetime:
+        date = _EPOCH + micros * _MICROSECOND
+        if utc_offset != _NAIVE:
+            date = date.replace(tzinfo=timezone(timedelta(seconds=utc_offset)))
+        return date
+    
+    @property
+    def positions(self) -> np.ndarray:
+        """Insertion position of every row, the inverse of ``order``"""
+        if self._positions is None:
+            self._positions = np.empty(self.count, dtype=np.int64)
+            self._positions[self.order.astype(np.int64)] = np.arange(self.count)
+        return self._positions
+    
+    def row_key(self, row: int) -> Tuple[str, int, str]:
+        """The ``(iso_timestamp, seq, id)`` key DateIndex would use for a row"""
+        return self.row_date(row).isoformat(), int(self.positions[row]), self.row_id(row)
+    
+    def row_dream(self, row: int) -> Dream:
+        """Materialize the dream stored in a row"""
+        (date, text, emotions, characters, themes, id_len, title_len, content_len,
+         utc_offset, n_emotions, n_characters, n_themes, flags, _) = self.records[row].item()
+        start = self._text_start + text
+        id_end = start + id_len
+        title_end = id_end + title_len
+        data = self._mmap[start:title_end + content_len]
+        pool = self.pool
+        refs = self.refs
+        
+        return Dream(
+            data[id_len:id_len + title_len].decode('utf-8'),
+            data[id_len + title_len:].decode('utf-8'),
+            [pool[ref] for ref in refs['emotions'][emotions:emotions + n_emotions].tolist()],
+            [pool[ref] for ref in refs['characters'][characters:characters + n_characters].tolist()],
+            [pool[ref] for ref in refs['themes'][themes:themes + n_themes].tolist()],
+            bool(flags & LUCID),
+            bool(flags & NIGHTMARE),
+            self._date(date, utc_offset),
+            data[:id_len].decode('utf-8')
+        )
+    
+    def tagged_rows(self, field: str, tag: str) -> np.ndarray:
+        """Rows whose tags in ``field`` include a tag, ignoring case"""
+        tag = tag.lower()
+        tag_ids = [tag_id for tag_id, value in enumerate(self.pool) if value.lower() == tag]
+        if not tag_ids:
+            return np.empty(0, dtype=np.int64)
+        # Tag references were written in insertion order, so the owner of each follows from the row counts
+        rows = self.order.astype(np.int64)
+        owners = np.repeat(rows, self.records[f'n_{field}'][rows].astype(np.int64))
+        return np.unique(owners[np.isin(self.refs[field], tag_ids)])
+    
+    def find_row(self, dream_id: str) -> Optional[int]:
+        """Row holding an id, found by bisecting the id-sorted permutation"""
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.row_id(int(self.by_id[middle])) < dream_id:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.count:
+            row = int(self.by_id[low])
+            if self.row_id(row) == dream_id:
+                return row
+        return None
+
+
+class MappedDateIndex(DateIndex):
+    """DateIndex over a snapshot's sorted rows plus the changes made since
+    
+    Snapshot rows are already in date and then insertion order, numbered by
+    their insertion position, so lookups bisect the mapped date column and
+    merge in a small in-memory DateIndex holding the dreams added since.
+    Removed snapshot rows are skipped. It is rebuilt from the mapping on
+    every load, so it is never checkpointed.
+    """
+    
+    persistent = False
+    
+    def __init__(self, snapshot: BinarySnapshot):
+        super().__init__()
+        self.snapshot = snapshot
+        self._excluded = set()
+        self._next_seq = snapshot.count
+    
+    def __len__(self) -> int:
+        return self.snapshot.count - len(self._excluded) + len(self._keys)
+    
+    def _snapshot_row(self, date: str, dream_id: str) -> Optional[int]:
+        row = self.snapshot.find_row(dream_id)
+        if row is not None and row not in self._excluded and self.snapshot.row_date(row).isoformat() == date:
+            return row
+        return None
+    
+    def _pop(self, dream: Dream) -> Optional[int]:
+        seq = super()._pop(dream)
+        if seq is not None:
+            return seq
+        row = self._snapshot_row(dream.date.isoformat(), dream.id)
+        if row is None:
+            return None
+        self._excluded.add(row)
+        return int(self.snapshot.positions[row])
+    
+    def seq(self, date: str, dream_id: str) -> Optional[int]:
+        seq = super().seq(date, dream_id)
+        if seq is not None:
+            return seq
+        row = self._snapshot_row(date, dream_id)
+        return int(self.snapshot.positions[row]) if row is not None else None
+    
+    def _mapped_keys(self, low: int, high: int, reverse: bool = False) -> Iterator[Tuple[str, int, str]]:
+        rows = range(high - 1, low - 1, -1) if reverse else range(low, high)
+        for row in rows:
+            if row not in self._excluded:
+                yield self.snapshot.row_key(row)
+    
+    def _ascending(self, low: int = 0, high: int = None,
+                   keys: List[Tuple[str, int, str]] = None) -> Iterator[Tuple[str, int, str]]:
+        high = self.snapshot.count if high is None else high
+        return heapq.merge(self._mapped_keys(low, high), self._keys if keys is None else keys)
+    
+    def _descending(self) -> Iterator[Tuple[str, int, str]]:
+        return heapq.merge(self._mapped_keys(0, self.snapshot.count, reverse=True), reversed(self._keys), reverse=True)
+    
+    def newest(self, limit: int = None) -> List[str]:
+        return [dream_id for _, _, dream_id in islice(newest_first(self._descending()), limit or None)]
+    
+    def oldest(self) -> List[str]:
+        return [dream_id for _, _, dream_id in self._ascending()]
+    
+    def bounds(self) -> Optional[Tuple[str, str]]:
+        first = next(self._ascending(), None)
+        if first is None:
+            return None
+        return first[0], next(self._descending())[0]
+    
+    def nth_newest(self, position: int) -> Optional[str]:
+        if position < 1:
+            return None
+        key = next(islice(newest_first(self._descending()), position - 1, None), None)
+        return key[2] if key is not None else None
+    
+    def between(self, start_date: datetime, end_date: datetime) -> List[str]:
+        low = int(np.searchsorted(self.snapshot.dates, _to_micros(start_date), side='left'))
+        high = int(np.searchsorted(self.snapshot.dates, _to_micros(end_date), side='right'))
+        extra_low = bisect_left(self._keys, (start_date.isoformat(),))
+        extra_high = bisect_right(self._keys, (end_date.isoformat(), float('inf')))
+        keys = self._ascending(low, high, self._keys[extra_low:extra_high])
+        return [dream_id for _, _, dream_id in keys]
+
+
+class MappedRecords:
+    """Dreams served from a mapped snapshot, with changes kept in memory
+    
+    Implements the ``DreamRecords`` interface. Rows in the snapshot are read
+    on demand; dreams added or replaced since it was written live in an
+    overlay that preserves insertion order, and deleted or replaced rows are
+    shadowed.
+    """
+    
+    def __init__(self, snapshot: Optional[BinarySnapshot] = None):
+        self.snapshot = snapshot
+        self._shadowed = set()
+        # Snapshot rows whose position is now held by a replacement dream
+        self._slot_ids: Dict[int, str] = {}
+        self._live: Dict[str, Dream] = {}
+        # Row a live dream occupies, or None for dreams appended after the snapshot
+        self._position: Dict[str, Optional[int]] = {}
+        self._appended: Dict[str, None] = {}
+    
+    @property
+    def _count(self) -> int:
+        return self.snapshot.count if self.snapshot is not None else 0
+    
+    def _row(self, dream_id: str) -> Optional[int]:
+        if self.snapshot is None:
+            return None
+        row = self.snapshot.find_row(dream_id)
+        return row if row is not None and row not in self._shadowed else None
+    
+    def __len__(self) -> int:
+        return self._count - len(self._shadowed) + len(self._slot_ids) + len(self._appended)
+    
+    def __contains__(self, dream_id: str) -> bool:
+        return dream_id in self._live or self._row(dream_id) is not None
+    
+    def __iter__(self) -> Iterator[Dream]:
+        for dream_id in list(self.ids()):
+            yield self.get(dream_id)
+    
+    def ids(self) -> Iterator[str]:
+        """Iterate over dream ids in insertion order"""
+        for row in (self.snapshot.order.tolist() if self.snapshot is not None else ()):
+            if row in self._shadowed:
+                if row in self._slot_ids:
+                    yield self._slot_ids[row]
+            else:
+                yield self.snapshot.row_id(row)
+        yield from list(self._appended)
+    
+    def get(self, dream_id: str) -> Optional[Dream]:
+        """Return the dream with the given id, reading it from the snapshot if needed"""
+        dream = self._live.get(dream_id)
+        if dream is not None:
+            return dream
+        row = self._row(dream_id)
+        return self.snapshot.row_dream(row) if row is not None else None
+    
+    def get_record(self, dream_id: str) -> Optional[Dict[str, Any]]:
+        """Return the dictionary form of a dream"""
+        dream = self.get(dream_id)
+        return dream.to_dict() if dream is not None else None
+    
+    def date_key(self, dream_id: str) -> str:
+        """ISO timestamp of a dream, in the form written by ``Dream.to_dict``"""
+        dream = self._live.get(dream_id)
+        if dream is not None:
+            return dream.date.isoformat()
+        return self.snapshot.row_date(self._row(dream_id)).isoformat()
+    
+    def put(self, dream: Dream, replaces: str = None):
+        """Insert a dream, or replace an existing one in place"""
+        key = dream.id
+        if replaces is not None and replaces != dream.id and replaces in self:
+            key = replaces
+        
+        if key in self._live:
+            position = self._position.pop(key)
+            del self._live[key]
+            if position is None:
+                if key != dream.id:
+                    # Re-key while keeping the dream's place among the appended ones
+                    self._appended = {(dream.id if k == key else k): None for k in self._appended}
+            else:
+                self._slot_ids[position] = dream.id
+        else:
+            row = self._row(key)
+            if row is None:
+                position = None
+                self._appended[dream.id] = None
+            else:
+                position = row
+                self._shadowed.add(row)
+                self._slot_ids[row] = dream.id
+        
+        self._live[dream.id] = dream
+        self._position[dream.id] = position
+    
+    def put_raw(self, record: Dict[str, Any], replaces: str = None):
+        """Insert a dream from its dictionary form"""
+        self.put(Dream.from_dict(record), replaces)
+    
+    def discard(self, dream_id: str):
+        """Remove a dream if it is present"""
+        if dream_id in self._live:
+            position = self._position.pop(dream_id)
+            del self._live[dream_id]
+            if position is None:
+                del self._appended[dream_id]
+            else:
+                del self._slot_ids[position]
+            return
+        
+        row = self._row(dream_id)
+        if row is not None:
+            self._shadowed.add(row)
+    
+    def to_dicts(self) -> Iterator[Dict[str, Any]]:
+        """Yield every record in dictionary form"""
+        for dream_id in list(self.ids()):
+            yield self.get_record(dream_id)
+    
+    def _select(self, rows: Optional[np.ndarray], matches: Callable[[Dream], bool]) -> List[Dream]:
+        """Snapshot ``rows`` that are still current plus live dreams passing ``matches``, in insertion order"""
+        selected: List[Tuple[int, Any]] = []
+        if self.snapshot is not None:
+            for position, row in zip(self.snapshot.positions[rows].tolist(), rows.tolist()):
+                if row not in self._shadowed:
+                    selected.append((position, row))
+        
+        for row, dream_id in self._slot_ids.items():
+            if matches(self._live[dream_id]):
+                selected.append((int(self.snapshot.positions[row]), self._live[dream_id]))
+        for offset, dream_id in enumerate(self._appended):
+            if matches(self._live[dream_id]):
+                selected.append((self._count + offset, self._live[dream_id]))
+        
+        selected.sort(key=lambda match: match[0])
+        return [self.snapshot.row_dream(item) if isinstance(item, int) else item for _, item in selected]
+    
+    def flagged(self, flag: int) -> List[Dream]:
+        """Dreams with a flag bit set, in insertion order"""
+        rows = np.flatnonzero(self.snapshot.flags & flag) if self.snapshot is not None else None
+        field = FLAG_FIELDS[flag]
+        return self._select(rows, lambda dream: getattr(dream, field))
+    
+    def tagged(self, field: str, tag: str) -> List[Dream]:
+        """Dreams whose ``emotions``, ``characters`` or ``themes`` include a tag, ignoring case"""
+        rows = self.snapshot.tagged_rows(field, tag) if self.snapshot is not None else None
+        tag = tag.lower()
+        return self._select(rows, lambda dream: any(value.lower() == tag for value in getattr(dream, field)))
+    
+    def snapshot_statistics(self) -> StatisticsIndex:
+        """Statistics over the snapshot alone, computed on the mapped columns"""
+        index = StatisticsIndex()
+        snapshot = self.snapshot
+        if snapshot is None or not snapshot.count:
+            return index
+        
+        index.total = snapshot.count
+        index.lucid = int(np.count_nonzero(snapshot.flags & LUCID))
+        index.nightmares = int(np.count_nonzero(snapshot.flags & NIGHTMARE))
+        index.earliest = snapshot.row_date(0).isoformat()
+        index.latest = snapshot.row_date(snapshot.count - 1).isoformat()
+        
+        for field, counts in (('emotions', index.emotion_counts),
+                              ('characters', index.character_counts),
+                              ('themes', index.theme_counts)):
+            tallies = np.bincount(snapshot.refs[field], minlength=len(snapshot.pool))
+            for ref in np.flatnonzero(tallies).tolist():
+                counts[snapshot.pool[ref]] = int(tallies[ref])
+        return index
+    
+    def snapshot_emotions(self, index_type: Type[EmotionBuckets]) -> EmotionBuckets:
+        """Emotion buckets over the snapshot alone, computed on the mapped columns"""
+        index = index_type()
+        snapshot = self.snapshot
+        if snapshot is None or not snapshot.count:
+            return index
+        
+        days = snapshot.dates.astype('datetime64[us]').astype('datetime64[D]')
+        if index_type.bucket == 'week':
+            # The epoch was a Thursday; step back to each Monday
+            ordinals = days.astype(np.int64)
+            buckets = (ordinals - (ordinals + 3) % 7).astype('datetime64[D]')
+        else:
+            buckets = days.astype('datetime64[M]')
+        keys, row_bucket = np.unique(buckets, return_inverse=True)
+        labels = [str(key) for key in keys]
+        for bucket, total in enumerate(np.bincount(row_bucket).tolist()):
+            index.totals[labels[bucket]] = total
+        
+        # Tag references are stored in insertion order, so expand rows in that order
+        rows_in_order = snapshot.order.astype(np.int64)
+        ref_row = np.repeat(rows_in_order, snapshot.records['n_emotions'][rows_in_order])
+        pool_size = len(snapshot.pool)
+        # Count each emotion once per dream
+        pairs = np.unique(ref_row * pool_size + snapshot.refs['emotions'])
+        cells, tallies = np.unique(row_bucket[pairs // pool_size] * pool_size + pairs % pool_size, return_counts=True)
+        for cell, tally in zip(cells.tolist(), tallies.tolist()):
+            bucket, ref = divmod(cell, pool_size)
+            index.counts.setdefault(labels[bucket], Counter())[snapshot.pool[ref]] = tally
+        return index
+    
+    def date_index(self) -> DateIndex:
+        """Date index over the snapshot rows; later changes must still be applied to it"""
+        if self.snapshot is None:
+            return DateIndex()
+        return MappedDateIndex(self.snapshot)
+    
+    def date_array(self) -> np.ndarray:
+        """Wall-clock dates of every current dream as ``datetime64[us]``"""
+        parts = []
+        if self.snapshot is not None:
+            dates = self.snapshot.dates
+            if self._shadowed:
+                keep = np.ones(self._count, dtype=bool)
+                keep[list(self._shadowed)] = False
+                dates = dates[keep]
+            parts.append(dates.astype(np.int64))
+        parts.append(np.array([_to_micros(dream.date) for dream in self._live.values()], dtype=np.int64))
+        return np.concatenate(parts).view('datetime64[us]')
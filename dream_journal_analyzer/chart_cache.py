@@ -0,0 +1,87 @@
+"""
+Least-recently-used cache of rendered chart images
+"""
+
+import hashlib
+import os
+import shutil
+from typing import Any, Dict, Optional
+
+from config import VisualizationSettings
+from serialization import dumpb
+
+
+class ChartCache:
+    """Rendered PNGs kept in a directory, keyed by what they were drawn from
+    
+    Entries are named by a digest of the chart, its parameters and the data
+    it shows, so a hit is always up to date. Reading an entry refreshes its
+    modification time; once the directory grows past ``max_bytes`` the
+    least recently used entries are deleted. Writes go through a temporary
+    file, so several rendering processes can share one cache.
+    """
+    
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+    
+    @staticmethod
+    def key(chart: str, params: Dict[str, Any], data_digest: str) -> str:
+        """Digest identifying one rendering of a chart"""
+        payload = dumpb({'chart': chart, 'params': params, 'data': data_digest})
+        return hashlib.sha256(payload).hexdigest()
+    
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}.png')
+    
+    def fetch(self, key: str, save_path: str) -> bool:
+        """Copy a cached chart to ``save_path``; return False on a miss"""
+        path = self._path(key)
+        try:
+            shutil.copyfile(path, save_path)
+            os.utime(path)
+        except FileNotFoundError:
+            return False
+        return True
+    
+    def store(self, key: str, rendered_path: str):
+        """Add a freshly rendered chart, evicting old entries past the size cap"""
+        os.makedirs(self.directory, exist_ok=True)
+        temp_path = f'{self._path(key)}.{os.getpid()}.tmp'
+        shutil.copyfile(rendered_path, temp_path)
+        os.replace(temp_path, self._path(key))
+        self.evict()
+    
+    def evict(self):
+        """Delete least recently used entries until the cache fits its cap"""
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if not entry.name.endswith('.png'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+                total += stat.st_size
+        
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                # Another process evicted it first
+                pass
+            total -= size
+
+
+def create_cache(settings: VisualizationSettings) -> Optional[ChartCache]:
+    """Cache configured by the visualization settings, or None when disabled"""
+    max_mb = settings.cache_max_mb
+    if not max_mb:
+        return None
+    directory = os.path.join(settings.chart_directory, '.cache')
+    return ChartCache(directory, int(max_mb * 1024 * 1024))
@@ -0,0 +1,231 @@
+"""
+Compact columnar storage for large dream collections
+"""
+
+from array import array
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+from dream_models import Dream
+from dream_records import LUCID
+
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+TAG_FIELDS = ('emotions', 'characters', 'themes')
+
+
+class _BitSet:
+    """Growable bit array, one bit per slot"""
+    
+    def __init__(self):
+        self._bits = bytearray()
+    
+    def set(self, slot: int, value: bool):
+        byte, bit = divmod(slot, 8)
+        if byte >= len(self._bits):
+            self._bits.extend(bytes(byte - len(self._bits) + 1))
+        if value:
+            self._bits[byte] |= 1 << bit
+        else:
+            self._bits[byte] &= ~(1 << bit) & 0xFF
+    
+    def get(self, slot: int) -> bool:
+        byte, bit = divmod(slot, 8)
+        return byte < len(self._bits) and bool(self._bits[byte] >> bit & 1)
+
+
+class _TextColumn:
+    """Strings stored back to back in one UTF-8 buffer with an offset array"""
+    
+    def __init__(self):
+        self._buffer = bytearray()
+        self._offsets = array('Q', [0])
+    
+    def append(self, text: str):
+        self._buffer += text.encode('utf-8')
+        self._offsets.append(len(self._buffer))
+    
+    def get(self, slot: int) -> str:
+        return self._buffer[self._offsets[slot]:self._offsets[slot + 1]].decode('utf-8')
+
+
+class _TagColumn:
+    """Interned tag lists in CSR layout: one flat id array plus row offsets"""
+    
+    def __init__(self, vocabulary: List[str], lookup: Dict[str, int]):
+        self._vocabulary = vocabulary
+        self._lookup = lookup
+        self._values = array('I')
+        self._offsets = array('Q', [0])
+    
+    def append(self, tags: List[str]):
+        for tag in tags:
+            tag_id = self._lookup.get(tag)
+            if tag_id is None:
+                tag_id = self._lookup[tag] = len(self._vocabulary)
+                self._vocabulary.append(tag)
+            self._values.append(tag_id)
+        self._offsets.append(len(self._values))
+    
+    def get(self, slot: int) -> List[str]:
+        vocabulary = self._vocabulary
+        return [vocabulary[tag_id] for tag_id in self._values[self._offsets[slot]:self._offsets[slot + 1]]]
+    
+    def has_any(self, slot: int, tag_ids: Set[int]) -> bool:
+        """Whether a row holds any of the given tag ids"""
+        return not tag_ids.isdisjoint(self._values[self._offsets[slot]:self._offsets[slot + 1]])
+
+
+class ColumnarRecords:
+    """Insertion-ordered dreams keyed by id, kept in typed columns
+    
+    A drop-in replacement for ``DreamRecords`` when the journal is too large
+    to hold as Python objects. Dates are epoch microseconds in an ``array``,
+    the lucid and nightmare flags are bitsets, tags are interned into one
+    shared vocabulary and stored in CSR offset arrays, and titles and
+    contents live in contiguous UTF-8 buffers. ``get`` materializes a fresh
+    ``Dream`` each time it is called, so changes must go back through
+    ``put``.
+    
+    Columns are append-only: replacing or removing a dream leaves a dead
+    slot behind, and the columns are rewritten once dead slots outnumber
+    live ones.
+    """
+    
+    def __init__(self):
+        self._slots: Dict[str, int] = {}
+        self._dead = 0
+        self._reset_columns()
+    
+    def _reset_columns(self):
+        self._ids: List[str] = []
+        self._dates = array('q')
+        # Timezone-aware dates are rare enough to keep as objects
+        self._aware_dates: Dict[int, datetime] = {}
+        self._lucid = _BitSet()
+        self._nightmare = _BitSet()
+        self._titles = _TextColumn()
+        self._contents = _TextColumn()
+        self._vocabulary: List[str] = []
+        lookup: Dict[str, int] = {}
+        self._tags = {field: _TagColumn(self._vocabulary, lookup) for field in TAG_FIELDS}
+    
+    def __len__(self) -> int:
+        return len(self._slots)
+    
+    def __contains__(self, dream_id: str) -> bool:
+        return dream_id in self._slots
+    
+    def __iter__(self) -> Iterator[Dream]:
+        for dream_id in list(self._slots):
+            yield self.get(dream_id)
+    
+    def ids(self) -> Iterator[str]:
+        """Iterate over dream ids in insertion order"""
+        return iter(self._slots)
+    
+    def _date(self, slot: int) -> datetime:
+        aware = self._aware_dates.get(slot)
+        if aware is not None:
+            return aware
+        return _EPOCH + self._dates[slot] * _MICROSECOND
+    
+    def get(self, dream_id: str) -> Optional[Dream]:
+        """Materialize the dream with the given id"""
+        slot = self._slots.get(dream_id)
+        if slot is None:
+            return None
+        return Dream(
+            title=self._titles.get(slot),
+            content=self._contents.get(slot),
+            emotions=self._tags['emotions'].get(slot),
+            characters=self._tags['characters'].get(slot),
+            themes=self._tags['themes'].get(slot),
+            lucid=self._lucid.get(slot),
+            nightmare=self._nightmare.get(slot),
+            date=self._date(slot),
+            id=self._ids[slot]
+        )
+    
+    def get_record(self, dream_id: str) -> Optional[Dict[str, Any]]:
+        """Return the dictionary form of a dream"""
+        dream = self.get(dream_id)
+        return dream.to_dict() if dream is not None else None
+    
+    def date_key(self, dream_id: str) -> str:
+        """ISO timestamp of a dream, in the form written by ``Dream.to_dict``"""
+        return self._date(self._slots[dream_id]).isoformat()
+    
+    def put(self, dream: Dream, replaces: str = None):
+        """Insert a dream, or replace an existing one in place"""
+        slot = self._append(dream)
+        if replaces is not None and replaces != dream.id and replaces in self._slots:
+            # Re-key while keeping the record's position in insertion order
+            self._slots = {
+                (dream.id if key == replaces else key): (slot if key == replaces else value)
+                for key, value in self._slots.items()
+            }
+            self._dead += 1
+        else:
+            if dream.id in self._slots:
+                self._dead += 1
+            self._slots[dream.id] = slot
+        self._maybe_compact()
+    
+    def put_raw(self, record: Dict[str, Any], replaces: str = None):
+        """Insert a dream from its dictionary form"""
+        self.put(Dream.from_dict(record), replaces)
+    
+    def discard(self, dream_id: str):
+        """Remove a dream if it is present"""
+        if self._slots.pop(dream_id, None) is not None:
+            self._dead += 1
+            self._maybe_compact()
+    
+    def to_dicts(self) -> Iterator[Dict[str, Any]]:
+        """Yield every record in dictionary form"""
+        for dream_id in list(self._slots):
+            yield self.get_record(dream_id)
+    
+    def flagged(self, flag: int) -> List[Dream]:
+        """Dreams with a flag bit set, in insertion order, read off the bitset"""
+        bits = self._lucid if flag == LUCID else self._nightmare
+        return [self.get(dream_id) for dream_id, slot in list(self._slots.items()) if bits.get(slot)]
+    
+    def tagged(self, field: str, tag: str) -> List[Dream]:
+        """Dreams whose ``emotions``, ``characters`` or ``themes`` include a tag, ignoring case"""
+        tag = tag.lower()
+        tag_ids = {tag_id for tag_id, value in enumerate(self._vocabulary) if value.lower() == tag}
+        if not tag_ids:
+            return []
+        column = self._tags[field]
+        return [self.get(dream_id) for dream_id, slot in list(self._slots.items()) if column.has_any(slot, tag_ids)]
+    
+    def _append(self, dream: Dream) -> int:
+        slot = len(self._ids)
+        self._ids.append(dream.id)
+        if dream.date.tzinfo is None:
+            self._dates.append((dream.date - _EPOCH) // _MICROSECOND)
+        else:
+            self._dates.append(0)
+            self._aware_dates[slot] = dream.date
+        self._lucid.set(slot, dream.lucid)
+        self._nightmare.set(slot, dream.nightmare)
+        self._titles.append(dream.title)
+        self._contents.append(dream.content)
+        for field, column in self._tags.items():
+            column.append(getattr(dream, field))
+        return slot
+    
+    def _maybe_compact(self):
+        """Rewrite the columns without dead slots once they dominate"""
+        if self._dead < 1024 or self._dead <= len(self._slots):
+            return
+        
+        # Copy live dreams one at a time so only the new columns are held twice
+        compacted = ColumnarRecords()
+        for dream in self:
+            compacted._slots[dream.id] = compacted._append(dream)
+        self.__dict__.update(compacted.__dict__)
@@ -1,69 +1,302 @@
 """
 Configuration management for Dream Journal Analyzer
+
+``Config`` compiles config.json into an immutable ``ConfigSnapshot``
+once per version of the file: the user's settings are merged with the
+defaults, validated, and turned into frozen sections read by attribute.
+Dotted keys are resolved ahead of time, so ``Config.get`` is one dict
+lookup. A long-running process calls ``reload_if_changed`` (or starts a
+watcher thread) to swap in a new snapshot when the file changes; an
+invalid edit is reported and the previous snapshot stays in use.
 """
 
+import copy
 import json
 import os
-from pathlib import Path
-from typing import Dict, Any
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Callable, Collection, Dict, List, Mapping, Optional, Tuple
+
+from atomic_file import atomic_write
+from indexes import file_signature
+
+
+DEFAULT_CONFIG = {
+    'data_file': 'dreams.json',
+    'backup_enabled': True,
+    'backup_frequency': 'daily',
+    'max_backups': 7,
+    'backup_directory': 'backups',
+    'export_format': 'json',
+    'date_format': '%Y-%m-%d %H:%M:%S',
+    'storage': {
+        'backend': 'json',
+        'sqlite_file': None,
+        'binary_file': None,
+        'compact_threshold': 1000,
+        'fsync': False,
+        'record_store': 'dict'
+    },
+    'service': {
+        'socket': None
+    },
+    'ingestion': {
+        'socket': None,
+        'batch_size': 500,
+        'flush_ms': 50,
+        'queue_size': 10000,
+        'fsync': True
+    },
+    'visualization': {
+        'default_chart_size': [12, 8],
+        'color_scheme': 'default',
+        'save_charts': True,
+        'chart_directory': 'charts',
+        'render_workers': None,
+        'cache_max_mb': 64
+    },
+    'analysis': {
+        'min_dreams_for_analysis': 5,
+        'pattern_threshold': 0.3,
+        'parallel_workers': 0,
+        'parallel_chunk_size': 500,
+        'location_keywords': ['house', 'school', 'work', 'forest', 'beach', 'city', 'room', 'car', 'street'],
+        'trend_bucket': 'month',
+        'trend_window': 12,
+        'emotion_categories': {
+            'positive': ['happy', 'joy', 'excited', 'peaceful', 'love', 'content'],
+            'negative': ['sad', 'fear', 'angry', 'anxious', 'confused', 'frustrated'],
+            'neutral': ['curious', 'calm', 'indifferent', 'focused']
+        }
+    },
+    'ui': {
+        'show_colors': True,
+        'show_emojis': True,
+        'page_size': 10,
+        'auto_save': True
+    }
+}
+
+
+def _lookup(config: Dict[str, Any], key: str, default=None):
+    """Walk nested dicts along a dotted key"""
+    value = config
+    for k in key.split('.'):
+        if isinstance(value, dict) and k in value:
+            value = value[k]
+        else:
+            return default
+    return value
+
+
+def _flatten(config: Dict[str, Any], prefix: str = '', values: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Every dotted key of a nested config mapped to a frozen copy of its value"""
+    values = {} if values is None else values
+    for key, value in config.items():
+        path = f'{prefix}{key}'
+        values[path] = _freeze(value)
+        if isinstance(value, dict):
+            _flatten(value, f'{path}.', values)
+    return values
+
+
+def _freeze(value: Any) -> Any:
+    """Immutable copy of a JSON value: lists become tuples and objects read-only mappings"""
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    return value
+
+
+def _thaw(value: Any) -> Any:
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    if isinstance(value, MappingProxyType):
+        return {key: _thaw(item) for key, item in value.items()}
+    return value
+
+
+class _Settings:
+    """Base of the frozen settings sections, built from one section of the merged config"""
+    
+    __slots__ = ()
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]):
+        return cls(**{name: _freeze(data[name]) for name in cls.__slots__})
+    
+    def __reduce__(self):
+        # Settings are sent to worker processes; frozen slots cannot be restored attribute by attribute
+        return type(self).from_dict, ({name: _thaw(getattr(self, name)) for name in self.__slots__},)
+
+
+@dataclass(frozen=True)
+class StorageSettings(_Settings):
+    __slots__ = ('backend', 'sqlite_file', 'binary_file', 'compact_threshold', 'fsync', 'record_store')
+    backend: str
+    sqlite_file: Optional[str]
+    binary_file: Optional[str]
+    compact_threshold: int
+    fsync: bool
+    record_store: str
+
+
+@dataclass(frozen=True)
+class ServiceSettings(_Settings):
+    __slots__ = ('socket',)
+    socket: Optional[str]
+
+
+@dataclass(frozen=True)
+class IngestionSettings(_Settings):
+    __slots__ = ('socket', 'batch_size', 'flush_ms', 'queue_size', 'fsync')
+    socket: Optional[str]
+    batch_size: int
+    flush_ms: float
+    queue_size: int
+    fsync: bool
+
+
+@dataclass(frozen=True)
+class VisualizationSettings(_Settings):
+    __slots__ = ('default_chart_size', 'color_scheme', 'save_charts', 'chart_directory', 'render_workers',
+                 'cache_max_mb')
+    default_chart_size: Tuple[float, float]
+    color_scheme: str
+    save_charts: bool
+    chart_directory: str
+    render_workers: Optional[int]
+    cache_max_mb: float
+
+
+@dataclass(frozen=True)
+class AnalysisSettings(_Settings):
+    __slots__ = ('min_dreams_for_analysis', 'pattern_threshold', 'parallel_workers', 'parallel_chunk_size',
+                 'location_keywords', 'trend_bucket', 'trend_window', 'emotion_categories')
+    min_dreams_for_analysis: int
+    pattern_threshold: float
+    parallel_workers: int
+    parallel_chunk_size: int
+    location_keywords: Tuple[str, ...]
+    trend_bucket: str
+    trend_window: int
+    emotion_categories: Mapping[str, Tuple[str, ...]]
+
+
+@dataclass(frozen=True)
+class UISettings(_Settings):
+    __slots__ = ('show_colors', 'show_emojis', 'page_size', 'auto_save')
+    show_colors: bool
+    show_emojis: bool
+    page_size: int
+    auto_save: bool
+
+
+SECTIONS = {
+    'storage': StorageSettings,
+    'service': ServiceSettings,
+    'ingestion': IngestionSettings,
+    'visualization': VisualizationSettings,
+    'analysis': AnalysisSettings,
+    'ui': UISettings
+}
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """One validated version of the configuration"""
+    
+    __slots__ = ('data_file', 'backup_enabled', 'backup_frequency', 'max_backups', 'backup_directory',
+                 'export_format', 'date_format', 'storage', 'service', 'ingestion', 'visualization',
+                 'analysis', 'ui', 'values')
+    data_file: str
+    backup_enabled: bool
+    backup_frequency: str
+    max_backups: int
+    backup_directory: str
+    export_format: str
+    date_format: str
+    storage: StorageSettings
+    service: ServiceSettings
+    ingestion: IngestionSettings
+    visualization: VisualizationSettings
+    analysis: AnalysisSettings
+    ui: UISettings
+    # Every dotted key of the merged config, for Config.get
+    values: Mapping[str, Any]
+    
+    @classmethod
+    def from_dict(cls, config: Dict[str, Any]) -> 'ConfigSnapshot':
+        fields = {name: section.from_dict(config[name]) for name, section in SECTIONS.items()}
+        for name in cls.__slots__:
+            if name not in fields and name != 'values':
+                fields[name] = _freeze(config[name])
+        return cls(values=MappingProxyType(_flatten(config)), **fields)
+
+
+@lru_cache(maxsize=None)
+def default_settings() -> ConfigSnapshot:
+    """Snapshot of the built-in defaults, for components used without a config file"""
+    return ConfigSnapshot.from_dict(DEFAULT_CONFIG)
 
 
 class Config:
-    """Manages application configuration"""
+    """Manages application configuration
+    
+    Settings are read from the current ``ConfigSnapshot``; ``config`` holds
+    the merged dictionary it was compiled from.
+    """
     
     def __init__(self, config_file: str = 'config.json'):
-        self.config_file = config_file
-        self.default_config = {
-            'data_file': 'dreams.json',
-            'backup_enabled': True,
-            'backup_frequency': 'daily',
-            'max_backups': 7,
-            'export_format': 'json',
-            'date_format': '%Y-%m-%d %H:%M:%S',
-            'visualization': {
-                'default_chart_size': [12, 8],
-                'color_scheme': 'default',
-                'save_charts': True,
-                'chart_directory': 'charts'
-            },
-            'analysis': {
-                'min_dreams_for_analysis': 5,
-                'pattern_threshold': 0.3,
-                'emotion_categories': {
-                    'positive': ['happy', 'joy', 'excited', 'peaceful', 'love', 'content'],
-                    'negative': ['sad', 'fear', 'angry', 'anxious', 'confused', 'frustrated'],
-                    'neutral': ['curious', 'calm', 'indifferent', 'focused']
-                }
-            },
-            'ui': {
-                'show_colors': True,
-                'show_emojis': True,
-                'page_size': 10,
-                'auto_save': True
-            }
-        }
+        self.config_file = os.path.abspath(config_file)
+        self.default_config = copy.deepcopy(DEFAULT_CONFIG)
+        self._listeners: List[Callable[[ConfigSnapshot], None]] = []
+        self._watcher: Optional[threading.Event] = None
+        self._signature = None
         
-        self.config = self.load_config()
+        config = self.load_config()
+        snapshot, errors = self._compile(config)
+        if errors:
+            print(f"Warning: Invalid configuration in {self.config_file}:")
+            for error in errors:
+                print(f"  - {error}")
+            print("Using default configuration.")
+            config = copy.deepcopy(self.default_config)
+            snapshot, _ = self._compile(config)
+        self.config = config
+        self._snapshot = snapshot
+    
+    def _read_config_file(self) -> Dict[str, Any]:
+        """Read the config file and merge it with the defaults"""
+        with open(self.config_file, 'r') as f:
+            config = json.load(f)
+        if not isinstance(config, dict):
+            raise ValueError("configuration must be a JSON object")
+        # Merge with defaults to ensure all keys exist
+        return self._merge_config(self.default_config, config)
     
     def load_config(self) -> Dict[str, Any]:
         """Load configuration from file or create default"""
         if os.path.exists(self.config_file):
+            # Taken before reading, so a change made meanwhile is picked up by the next check
+            self._signature = file_signature(self.config_file)
             try:
-                with open(self.config_file, 'r') as f:
-                    config = json.load(f)
-                    # Merge with defaults to ensure all keys exist
-                    return self._merge_config(self.default_config, config)
-            except (json.JSONDecodeError, IOError) as e:
+                return self._read_config_file()
+            except (json.JSONDecodeError, IOError, ValueError) as e:
                 print(f"Warning: Could not load config file {self.config_file}: {e}")
                 print("Using default configuration.")
         
         # Create default config file
         self.save_config(self.default_config)
-        return self.default_config.copy()
+        return copy.deepcopy(self.default_config)
     
     def _merge_config(self, default: Dict[str, Any], user: Dict[str, Any]) -> Dict[str, Any]:
         """Recursively merge user config with default config"""
-        result = default.copy()
+        # Deep, so editing the merged config never reaches into the defaults
+        result = copy.deepcopy(default)
         
         for key, value in user.items():
             if key in result and isinstance(result[key], dict) and isinstance(value, dict):
@@ -73,34 +306,96 @@ class Config:
         
         return result
     
+    def _compile(self, config: Dict[str, Any]) -> Tuple[Optional[ConfigSnapshot], List[str]]:
+        """Validate a merged config and build its snapshot, or return what is wrong with it"""
+        errors = self._validation_errors(config)
+        if errors:
+            return None, errors
+        return ConfigSnapshot.from_dict(config), []
+    
+    def _install(self, config: Dict[str, Any], rejected: str = "❌ Configuration validation errors:") -> bool:
+        """Make a merged config current, unless it is invalid"""
+        snapshot, errors = self._compile(config)
+        if errors:
+            print(rejected)
+            for error in errors:
+                print(f"  - {error}")
+            return False
+        
+        self.config = config
+        # A single assignment, so readers on other threads see the old snapshot or the new one
+        self._snapshot = snapshot
+        for listener in self._listeners:
+            listener(snapshot)
+        return True
+    
     def save_config(self, config: Dict[str, Any] = None):
         """Save configuration to file"""
         if config is None:
             config = self.config
         
         try:
-            with open(self.config_file, 'w') as f:
+            with atomic_write(self.config_file, 'w') as f:
                 json.dump(config, f, indent=2)
+            # Our own write is not a change to reload
+            self._signature = file_signature(self.config_file)
         except IOError as e:
             print(f"Error saving config: {e}")
     
-    def get(self, key: str, default=None):
-        """Get configuration value with dot notation support"""
-        keys = key.split('.')
-        value = self.config
+    def reload_if_changed(self) -> bool:
+        """Swap in a new snapshot if the config file changed since it was last read
         
-        for k in keys:
-            if isinstance(value, dict) and k in value:
-                value = value[k]
-            else:
-                return default
+        Costs one ``stat`` when nothing changed. An unreadable or invalid
+        file is reported once and the current snapshot is kept.
+        """
+        signature = file_signature(self.config_file)
+        if signature == self._signature or signature is None:
+            return False
+        self._signature = signature
+        
+        try:
+            config = self._read_config_file()
+        except (json.JSONDecodeError, IOError, ValueError) as e:
+            print(f"Warning: Keeping the current configuration; could not load {self.config_file}: {e}")
+            return False
+        return self._install(config, f"Warning: Keeping the current configuration; {self.config_file} is invalid:")
+    
+    def add_listener(self, listener: Callable[[ConfigSnapshot], None]):
+        """Call ``listener`` with every new snapshot, from the thread that swapped it in"""
+        self._listeners.append(listener)
+    
+    def start_watching(self, interval: float = 1.0):
+        """Check the config file for changes every ``interval`` seconds on a background thread"""
+        if self._watcher is not None:
+            return
+        stopped = threading.Event()
+        
+        def watch():
+            while not stopped.wait(interval):
+                self.reload_if_changed()
         
-        return value
+        threading.Thread(target=watch, name='config-watcher', daemon=True).start()
+        self._watcher = stopped
+    
+    def stop_watching(self):
+        if self._watcher is not None:
+            self._watcher.set()
+            self._watcher = None
+    
+    @property
+    def snapshot(self) -> ConfigSnapshot:
+        """The current configuration, validated and immutable"""
+        return self._snapshot
+    
+    def get(self, key: str, default=None):
+        """Get configuration value with dot notation support"""
+        return self._snapshot.values.get(key, default)
     
     def set(self, key: str, value: Any):
         """Set configuration value with dot notation support"""
         keys = key.split('.')
-        config = self.config
+        updated = copy.deepcopy(self.config)
+        config = updated
         
         for k in keys[:-1]:
             if k not in config:
@@ -108,82 +403,92 @@ class Config:
             config = config[k]
         
         config[keys[-1]] = value
-        self.save_config()
+        if self._install(updated):
+            self.save_config()
     
     @property
     def data_file(self) -> str:
         """Get the data file path"""
-        return self.get('data_file', 'dreams.json')
+        return self._snapshot.data_file
+    
+    @property
+    def backup_directory(self) -> str:
+        """Get backup directory"""
+        return self._snapshot.backup_directory
     
     @property
     def backup_enabled(self) -> bool:
         """Check if backup is enabled"""
-        return self.get('backup_enabled', True)
+        return self._snapshot.backup_enabled
+    
+    @property
+    def storage_settings(self) -> StorageSettings:
+        """Get storage settings"""
+        return self._snapshot.storage
     
     @property
-    def visualization_settings(self) -> Dict[str, Any]:
+    def service_settings(self) -> ServiceSettings:
+        """Get journal service settings"""
+        return self._snapshot.service
+    
+    @property
+    def ingestion_settings(self) -> IngestionSettings:
+        """Get ingestion service settings"""
+        return self._snapshot.ingestion
+    
+    @property
+    def visualization_settings(self) -> VisualizationSettings:
         """Get visualization settings"""
-        return self.get('visualization', {})
+        return self._snapshot.visualization
     
     @property
-    def analysis_settings(self) -> Dict[str, Any]:
+    def analysis_settings(self) -> AnalysisSettings:
         """Get analysis settings"""
-        return self.get('analysis', {})
+        return self._snapshot.analysis
     
     @property
-    def ui_settings(self) -> Dict[str, Any]:
+    def ui_settings(self) -> UISettings:
         """Get UI settings"""
-        return self.get('ui', {})
+        return self._snapshot.ui
     
-    def create_backup(self):
-        """Create a backup of the current data file"""
+    def create_backup(self, files: List[str] = None, append_only: Collection[str] = ()):
+        """Back up the journal files, storing only the data that changed since the last backup
+        
+        ``files`` defaults to the JSON data file and its operation log;
+        files in ``append_only`` are only read past what the previous
+        backup already holds.
+        """
         if not self.backup_enabled:
             return
         
-        data_file = self.data_file
-        if not os.path.exists(data_file):
+        if files is None:
+            log_file = f'{self.data_file}.log'
+            files, append_only = [self.data_file, log_file], [log_file]
+        if not any(os.path.exists(path) for path in files):
             return
         
-        # Create backup directory
-        backup_dir = Path('backups')
-        backup_dir.mkdir(exist_ok=True)
-        
-        # Create backup filename with timestamp
-        from datetime import datetime
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        backup_file = backup_dir / f'dreams_backup_{timestamp}.json'
+        from backup_store import BackupStore
         
         try:
-            # Copy the data file
-            import shutil
-            shutil.copy2(data_file, backup_file)
+            store = BackupStore(self.backup_directory, fsync=self.storage_settings.fsync)
+            backup = store.create(files, append_only=set(append_only))
             
             # Clean up old backups
-            self._cleanup_old_backups(backup_dir)
+            self._cleanup_old_backups(store)
             
-            print(f"Backup created: {backup_file}")
+            print(f"Backup created: {backup['name']} ({backup['written']:,} new bytes of {backup['size']:,})")
         except Exception as e:
             print(f"Error creating backup: {e}")
     
-    def _cleanup_old_backups(self, backup_dir: Path):
-        """Remove old backup files"""
-        max_backups = self.get('max_backups', 7)
-        
-        # Get all backup files
-        backup_files = sorted(backup_dir.glob('dreams_backup_*.json'))
-        
-        # Remove excess files
-        while len(backup_files) > max_backups:
-            oldest_backup = backup_files.pop(0)
-            try:
-                oldest_backup.unlink()
-                print(f"Removed old backup: {oldest_backup}")
-            except Exception as e:
-                print(f"Error removing old backup: {e}")
+    def _cleanup_old_backups(self, store):
+        """Remove old backups and the chunks only they used"""
+        max_backups = self._snapshot.max_backups
+        for name in store.prune(max_backups):
+            print(f"Removed old backup: {name}")
     
     def reset_to_defaults(self):
         """Reset configuration to default values"""
-        self.config = self.default_config.copy()
+        self._install(copy.deepcopy(self.default_config))
         self.save_config()
         print("Configuration reset to defaults.")
     
@@ -202,7 +507,8 @@ class Config:
             with open(filename, 'r') as f:
                 imported_config = json.load(f)
             
-            self.config = self._merge_config(self.default_config, imported_config)
+            if not self._install(self._merge_config(self.default_config, imported_config)):
+                return
             self.save_config()
             print(f"Configuration imported from {filename}")
         except Exception as e:
@@ -223,31 +529,114 @@ class Config:
             else:
                 print("  " * indent + f"{key}: {value}")
     
-    def validate_config(self) -> bool:
-        """Validate configuration settings"""
+    def _validation_errors(self, config: Dict[str, Any]) -> List[str]:
+        """Problems with a merged configuration, as messages"""
         errors = []
         
+        def get(key: str, default=None):
+            return _lookup(config, key, default)
+        
+        for name in SECTIONS:
+            if not isinstance(config.get(name), dict):
+                errors.append(f"{name} must be an object")
+        
         # Check data file
-        data_file = self.data_file
-        if not data_file.endswith('.json'):
+        data_file = get('data_file', 'dreams.json')
+        if not isinstance(data_file, str) or not data_file.endswith('.json'):
             errors.append("Data file must be a .json file")
         
         # Check backup settings
-        if self.backup_enabled:
-            max_backups = self.get('max_backups', 7)
+        if get('backup_enabled', True):
+            max_backups = get('max_backups', 7)
             if not isinstance(max_backups, int) or max_backups < 1:
                 errors.append("max_backups must be a positive integer")
+            
+            backup_directory = get('backup_directory', 'backups')
+            if not isinstance(backup_directory, str) or not backup_directory:
+                errors.append("backup_directory must be a path")
+        
+        # Check storage settings
+        backend = get('storage.backend', 'json')
+        if backend not in ('json', 'sqlite', 'binary'):
+            errors.append("storage.backend must be 'json', 'sqlite' or 'binary'")
+        
+        compact_threshold = get('storage.compact_threshold', 1000)
+        if not isinstance(compact_threshold, int) or compact_threshold < 1:
+            errors.append("storage.compact_threshold must be a positive integer")
+        
+        record_store = get('storage.record_store', 'dict')
+        if record_store not in ('dict', 'columnar'):
+            errors.append("storage.record_store must be 'dict' or 'columnar'")
+        
+        # Check service settings
+        socket_path = get('service.socket')
+        if socket_path is not None and not isinstance(socket_path, str):
+            errors.append("service.socket must be a path or null")
+        
+        # Check ingestion settings
+        ingestion_socket = get('ingestion.socket')
+        if ingestion_socket is not None and not isinstance(ingestion_socket, str):
+            errors.append("ingestion.socket must be a path or null")
+        
+        batch_size = get('ingestion.batch_size', 500)
+        if not isinstance(batch_size, int) or batch_size < 1:
+            errors.append("ingestion.batch_size must be a positive integer")
+        
+        queue_size = get('ingestion.queue_size', 10000)
+        if not isinstance(queue_size, int) or queue_size < 1:
+            errors.append("ingestion.queue_size must be a positive integer")
+        
+        flush_ms = get('ingestion.flush_ms', 50)
+        if not isinstance(flush_ms, (int, float)) or flush_ms < 0:
+            errors.append("ingestion.flush_ms must be a non-negative number")
+        
+        if not isinstance(get('ingestion.fsync', True), bool):
+            errors.append("ingestion.fsync must be true or false")
         
         # Check visualization settings
-        chart_size = self.get('visualization.default_chart_size', [12, 8])
+        chart_size = get('visualization.default_chart_size', [12, 8])
         if not isinstance(chart_size, list) or len(chart_size) != 2:
             errors.append("visualization.default_chart_size must be a list of 2 numbers")
         
+        render_workers = get('visualization.render_workers')
+        if render_workers is not None and (not isinstance(render_workers, int) or render_workers < 1):
+            errors.append("visualization.render_workers must be a positive integer or null")
+        
+        cache_max_mb = get('visualization.cache_max_mb', 64)
+        if not isinstance(cache_max_mb, (int, float)) or cache_max_mb < 0:
+            errors.append("visualization.cache_max_mb must be a non-negative number")
+        
         # Check analysis settings
-        min_dreams = self.get('analysis.min_dreams_for_analysis', 5)
+        min_dreams = get('analysis.min_dreams_for_analysis', 5)
         if not isinstance(min_dreams, int) or min_dreams < 1:
             errors.append("analysis.min_dreams_for_analysis must be a positive integer")
         
+        parallel_workers = get('analysis.parallel_workers', 0)
+        if not isinstance(parallel_workers, int) or parallel_workers < 0:
+            errors.append("analysis.parallel_workers must be a non-negative integer")
+        
+        parallel_chunk_size = get('analysis.parallel_chunk_size', 500)
+        if not isinstance(parallel_chunk_size, int) or parallel_chunk_size < 1:
+            errors.append("analysis.parallel_chunk_size must be a positive integer")
+        
+        location_keywords = get('analysis.location_keywords', [])
+        if not isinstance(location_keywords, list) or not all(isinstance(k, str) for k in location_keywords):
+            errors.append("analysis.location_keywords must be a list of strings")
+        
+        trend_bucket = get('analysis.trend_bucket', 'month')
+        if trend_bucket not in ('week', 'month'):
+            errors.append("analysis.trend_bucket must be 'week' or 'month'")
+        
+        trend_window = get('analysis.trend_window', 12)
+        if not isinstance(trend_window, int) or trend_window < 2:
+            errors.append("analysis.trend_window must be an integer of at least 2")
+        
+        return errors
+    
+    def validate_config(self) -> bool:
+        """Validate configuration settings"""
+        errors = self._validation_errors(self.config)
+        
         if errors:
             print("❌ Configuration validation errors:")
             for error in errors:
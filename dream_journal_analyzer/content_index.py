@@ -0,0 +1,274 @@
+"""
+TF-IDF index over dream text for keywords and content similarity
+"""
+
+import io
+from array import array
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+from dream_models import Dream
+from indexes import CHECKPOINT_FORMAT, JournalIndex
+from search_index import STOP_WORDS, tokenize
+
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def content_terms(dream: Dream) -> Counter:
+    """Counts of the content words in a dream's title and text"""
+    words = tokenize(dream.title)
+    words.extend(tokenize(dream.content))
+    return Counter(word for word in words if len(word) > 2 and word not in STOP_WORDS)
+
+
+def _micros(date: datetime) -> int:
+    """Wall-clock microseconds since the epoch, ignoring any timezone"""
+    return (date.replace(tzinfo=None) - _EPOCH) // _MICROSECOND
+
+
+def _pack_strings(strings: List[str]):
+    """Strings as one UTF-8 byte array plus end offsets, so any character (even a newline) survives"""
+    import numpy as np
+    
+    encoded = [string.encode('utf-8') for string in strings]
+    offsets = np.cumsum([len(data) for data in encoded], dtype=np.int64)
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+
+def _unpack_strings(blob, offsets) -> List[str]:
+    data = blob.tobytes()
+    starts = [0] + offsets.tolist()
+    return [data[start:end].decode('utf-8') for start, end in zip(starts, starts[1:])]
+
+
+class ContentIndex(JournalIndex):
+    """Term counts of every dream as a sparse matrix, weighted by TF-IDF on demand
+    
+    Rows are appended in CSR layout to plain ``array`` buffers, so keeping
+    the index current never needs numpy. Removed dreams leave a dead row
+    that is dropped the next time the matrix is used. Queries view the
+    buffers as numpy arrays and score every dream with a handful of
+    vectorized passes over the non-zero entries: term frequencies are
+    damped with ``1 + log(count)``, weighted by smoothed inverse document
+    frequency and compared by cosine similarity.
+    """
+    
+    name = 'content'
+    checkpoint_suffix = 'npz'
+    
+    def __init__(self):
+        self.vocabulary: Dict[str, int] = {}
+        self.terms: List[str] = []
+        self.document_frequency = array('q')
+        self.ids: List[Optional[str]] = []
+        self.rows: Dict[str, int] = {}
+        self.dates = array('q')
+        self.indptr = array('q', [0])
+        self.indices = array('q')
+        self.counts = array('q')
+        self._dead = 0
+        # Weights derived from the buffers, dropped whenever they change
+        self._matrix = None
+    
+    def _term_ids(self, terms: Counter, create: bool) -> Tuple[List[int], List[int]]:
+        ids, counts = [], []
+        for term, count in terms.items():
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                if not create:
+                    continue
+                term_id = self.vocabulary[term] = len(self.terms)
+                self.terms.append(term)
+                self.document_frequency.append(0)
+            ids.append(term_id)
+            counts.append(count)
+        return ids, counts
+    
+    def add(self, dream: Dream):
+        term_ids, counts = self._term_ids(content_terms(dream), create=True)
+        for term_id in term_ids:
+            self.document_frequency[term_id] += 1
+        self.rows[dream.id] = len(self.ids)
+        self.ids.append(dream.id)
+        self.dates.append(_micros(dream.date))
+        self.indices.extend(term_ids)
+        self.counts.extend(counts)
+        self.indptr.append(len(self.indices))
+        self._matrix = None
+    
+    def remove(self, dream: Dream):
+        row = self.rows.pop(dream.id, None)
+        if row is None:
+            return
+        for term_id in self.indices[self.indptr[row]:self.indptr[row + 1]]:
+            self.document_frequency[term_id] -= 1
+        self.ids[row] = None
+        self._dead += 1
+        self._matrix = None
+    
+    def __len__(self) -> int:
+        return len(self.rows)
+    
+    def _compact(self):
+        """Drop dead rows from the buffers"""
+        import numpy as np
+        
+        indptr = np.frombuffer(self.indptr, dtype=np.int64)
+        keep = np.array([dream_id is not None for dream_id in self.ids], dtype=bool)
+        lengths = np.diff(indptr)[keep]
+        entries = np.repeat(keep, np.diff(indptr))
+        
+        self.indices = array('q', np.frombuffer(self.indices, dtype=np.int64)[entries].tobytes())
+        self.counts = array('q', np.frombuffer(self.counts, dtype=np.int64)[entries].tobytes())
+        self.dates = array('q', np.frombuffer(self.dates, dtype=np.int64)[keep].tobytes())
+        self.indptr = array('q', [0])
+        self.indptr.frombytes(np.cumsum(lengths, dtype=np.int64).tobytes())
+        self.ids = [dream_id for dream_id in self.ids if dream_id is not None]
+        self.rows = {dream_id: row for row, dream_id in enumerate(self.ids)}
+        self._dead = 0
+    
+    def _weights(self) -> Dict[str, Any]:
+        """TF-IDF weights of every non-zero entry, with row lookups and norms"""
+        import numpy as np
+        
+        if self._matrix is not None:
+            return self._matrix
+        if self._dead:
+            self._compact()
+        
+        # Copies, since a live view would stop the buffers from growing
+        indptr = np.frombuffer(self.indptr, dtype=np.int64).copy()
+        indices = np.frombuffer(self.indices, dtype=np.int64).copy()
+        counts = np.frombuffer(self.counts, dtype=np.int64)
+        frequency = np.frombuffer(self.document_frequency, dtype=np.int64)
+        idf = np.log((1 + len(self.ids)) / (1 + frequency)) + 1
+        
+        row_of_entry = np.repeat(np.arange(len(self.ids)), np.diff(indptr))
+        weights = (1 + np.log(counts)) * idf[indices]
+        norms = np.sqrt(np.bincount(row_of_entry, weights=weights * weights, minlength=len(self.ids)))
+        self._matrix = {
+            'indptr': indptr,
+            'indices': indices,
+            'weights': weights,
+            'row_of_entry': row_of_entry,
+            'norms': norms,
+            'idf': idf
+        }
+        return self._matrix
+    
+    def _query_vector(self, dream: Dream):
+        """TF-IDF vector of a dream over the vocabulary, unit length"""
+        import numpy as np
+        
+        matrix = self._weights()
+        term_ids, counts = self._term_ids(content_terms(dream), create=False)
+        vector = np.zeros(len(self.terms))
+        if term_ids:
+            vector[term_ids] = (1 + np.log(counts)) * matrix['idf'][term_ids]
+            vector /= np.linalg.norm(vector)
+        return vector
+    
+    def keywords(self, dream: Dream, limit: int = 10) -> List[Tuple[str, float]]:
+        """Terms that best characterize a dream against the rest of the journal"""
+        import numpy as np
+        
+        vector = self._query_vector(dream)
+        ranked = np.flatnonzero(vector)
+        ranked = ranked[np.lexsort((ranked, -vector[ranked]))][:limit]
+        return [(self.terms[term_id], float(vector[term_id])) for term_id in ranked.tolist()]
+    
+    def similar(self, dream: Dream, limit: int = 5) -> List[Tuple[str, float]]:
+        """``(id, cosine similarity)`` of the dreams whose text is closest to a dream's"""
+        import numpy as np
+        
+        vector = self._query_vector(dream)
+        if limit < 1 or not vector.any():
+            return []
+        
+        # One sparse matrix-vector product scores every dream at once
+        matrix = self._weights()
+        dots = np.bincount(matrix['row_of_entry'], weights=matrix['weights'] * vector[matrix['indices']],
+                           minlength=len(self.ids))
+        norms = matrix['norms']
+        scores = np.divide(dots, norms, out=np.zeros_like(dots), where=norms > 0)
+        own_row = self.rows.get(dream.id)
+        if own_row is not None:
+            scores[own_row] = 0
+        
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+        candidates = candidates[np.lexsort((candidates, -scores[candidates]))]
+        return [(self.ids[row], float(scores[row])) for row in candidates.tolist()]
+    
+    def corpus_keywords(self, start_date: datetime = None, end_date: datetime = None,
+                        limit: int = 20) -> List[Tuple[str, float]]:
+        """Terms with the highest total TF-IDF weight among dreams dated within the window"""
+        import numpy as np
+        
+        matrix = self._weights()
+        dates = np.frombuffer(self.dates, dtype=np.int64)
+        in_window = np.ones(len(self.ids), dtype=bool)
+        if start_date is not None:
+            in_window &= dates >= _micros(start_date)
+        if end_date is not None:
+            in_window &= dates <= _micros(end_date)
+        
+        # Each dream contributes its unit-length vector, so long dreams do not dominate
+        norms = matrix['norms']
+        scale = np.divide(1.0, norms, out=np.zeros_like(norms), where=(norms > 0) & in_window)
+        totals = np.bincount(matrix['indices'], weights=matrix['weights'] * scale[matrix['row_of_entry']],
+                             minlength=len(self.terms))
+        ranked = np.flatnonzero(totals)
+        ranked = ranked[np.lexsort((ranked, -totals[ranked]))][:limit]
+        return [(self.terms[term_id], float(totals[term_id])) for term_id in ranked.tolist()]
+    
+    def write_checkpoint(self, f: BinaryIO, signature: Tuple[int, int]):
+        import numpy as np
+        
+        if self._dead:
+            self._compact()
+        terms, term_offsets = _pack_strings(self.terms)
+        ids, id_offsets = _pack_strings(self.ids)
+        np.savez(
+            f,
+            format=np.array(CHECKPOINT_FORMAT),
+            snapshot=np.array(signature, dtype=np.int64),
+            terms=terms,
+            term_offsets=term_offsets,
+            ids=ids,
+            id_offsets=id_offsets,
+            document_frequency=np.frombuffer(self.document_frequency, dtype=np.int64),
+            dates=np.frombuffer(self.dates, dtype=np.int64),
+            indptr=np.frombuffer(self.indptr, dtype=np.int64),
+            # Term ids and counts fit in 32 bits and make up most of the file
+            indices=np.frombuffer(self.indices, dtype=np.int64).astype('<u4'),
+            counts=np.frombuffer(self.counts, dtype=np.int64).astype('<u4')
+        )
+    
+    @classmethod
+    def read_checkpoint(cls, f: BinaryIO, signature: Tuple[int, int]) -> Optional['ContentIndex']:
+        import zipfile
+        import numpy as np
+        
+        try:
+            data = np.load(io.BytesIO(f.read()), allow_pickle=False)
+        except (OSError, zipfile.BadZipFile) as e:
+            raise ValueError(e)
+        if int(data['format']) != CHECKPOINT_FORMAT or tuple(data['snapshot'].tolist()) != signature:
+            return None
+        if 'id_offsets' not in data.files:
+            # Written before strings were stored with offsets; rebuild
+            return None
+        
+        index = cls()
+        index.terms = _unpack_strings(data['terms'], data['term_offsets'])
+        index.vocabulary = {term: term_id for term_id, term in enumerate(index.terms)}
+        index.ids = _unpack_strings(data['ids'], data['id_offsets'])
+        index.rows = {dream_id: row for row, dream_id in enumerate(index.ids)}
+        for name in ('document_frequency', 'dates', 'indptr', 'indices', 'counts'):
+            setattr(index, name, array('q', data[name].astype(np.int64).tobytes()))
+        return index
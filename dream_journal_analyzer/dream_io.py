@@ -0,0 +1,423 @@
+"""
+Streaming import and export of dreams
+"""
+
+import csv
+import gzip
+import io
+import json
+import struct
+import sys
+from array import array
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Set, TextIO, Tuple
+
+from dream_models import Dream
+from json_stream import iter_json_array
+from serialization import dumps, loads
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+CSV_FIELDS = ['id', 'title', 'content', 'date', 'emotions', 'characters', 'themes', 'lucid', 'nightmare']
+IMPORT_FORMATS = ('json', 'jsonl', 'csv', 'columnar')
+EXPORT_FORMATS = ('json', 'jsonl', 'csv', 'columnar')
+COMPRESSIONS = ('gzip', 'zstd')
+TAG_FIELDS = ('emotions', 'characters', 'themes')
+
+COLUMNAR_MAGIC = b'DJCOL\x01'
+COLUMNAR_GROUP_SIZE = 10000
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+# Offset column value for dates without a timezone
+_NAIVE = -(2 ** 31)
+
+
+def detect_format(path: str) -> str:
+    """Guess the import format from a file extension"""
+    suffixes = [suffix.lower() for suffix in Path(path).suffixes if suffix.lower() not in ('.gz', '.zst')]
+    suffix = suffixes[-1] if suffixes else ''
+    if suffix == '.csv':
+        return 'csv'
+    if suffix == '.json':
+        return 'json'
+    if suffix in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    if suffix == '.djcol':
+        return 'columnar'
+    raise ValueError(f"Cannot tell the format of {path}; use --format")
+
+
+def _compression_of(path: str) -> Optional[str]:
+    suffix = Path(path).suffix.lower()
+    return {'.gz': 'gzip', '.zst': 'zstd'}.get(suffix)
+
+
+def open_binary(path: str, mode: str, compression: str = None) -> BinaryIO:
+    """Open a file for binary reading or writing, optionally through gzip or zstd"""
+    if compression is None:
+        return open(path, mode + 'b')
+    if compression == 'gzip':
+        return gzip.open(path, mode + 'b')
+    if compression == 'zstd':
+        if zstandard is None:
+            raise ValueError("zstd compression requires the 'zstandard' package")
+        return zstandard.open(path, mode + 'b')
+    raise ValueError(f"Unsupported compression: {compression}")
+
+
+def open_text(path: str, mode: str, compression: str = None) -> TextIO:
+    """Open a UTF-8 text file, optionally through gzip or zstd"""
+    return io.TextIOWrapper(open_binary(path, mode, compression), encoding='utf-8', newline='')
+
+
+def iter_jsonl(path: str) -> Iterator[Tuple[int, Any]]:
+    """Yield ``(line_number, record)`` for each non-blank line of a JSON Lines file"""
+    with open_text(path, 'r', _compression_of(path)) as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield number, loads(line)
+            except ValueError as e:
+                yield number, e
+
+
+def iter_json(path: str) -> Iterator[Tuple[int, Any]]:
+    """Yield ``(element_number, record)`` from a JSON array such as ``export --format json`` writes
+    
+    The array is parsed incrementally, so memory stays bounded by the
+    largest dream. A ``.json`` file that does not start with ``[`` is read
+    as JSON Lines.
+    """
+    with open_text(path, 'r', _compression_of(path)) as f:
+        first = f.read(1)
+        while first and first in ' \t\r\n':
+            first = f.read(1)
+    if first != '[':
+        yield from iter_jsonl(path)
+        return
+    
+    with open_text(path, 'r', _compression_of(path)) as f:
+        yield from enumerate(iter_json_array(f), 1)
+
+
+def iter_csv(path: str) -> Iterator[Tuple[int, Any]]:
+    """Yield ``(line_number, record)`` for each row written by ``export_to_csv``"""
+    with open_text(path, 'r', _compression_of(path)) as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            record: Dict[str, Any] = dict(row)
+            for field in TAG_FIELDS:
+                value = record.get(field)
+                if isinstance(value, str):
+                    record[field] = [tag.strip() for tag in value.split(';') if tag.strip()]
+            for field in ('lucid', 'nightmare'):
+                value = record.get(field)
+                if isinstance(value, str):
+                    record[field] = value.strip().lower() in ('true', '1', 'yes')
+            if not record.get('id'):
+                record.pop('id', None)
+            yield reader.line_num, record
+
+
+def iter_records(path: str, format: str = None) -> Iterator[Tuple[int, Any]]:
+    """Stream raw records from an import file"""
+    format = format or detect_format(path)
+    if format == 'json':
+        return iter_json(path)
+    if format == 'jsonl':
+        return iter_jsonl(path)
+    if format == 'csv':
+        return iter_csv(path)
+    if format == 'columnar':
+        return iter_columnar(path)
+    raise ValueError(f"Unsupported import format: {format}")
+
+
+def dream_from_record(record: Any) -> Dream:
+    """Validate an imported record and build a Dream from it"""
+    if isinstance(record, Exception):
+        raise ValueError(f"invalid JSON: {record}")
+    if not isinstance(record, dict):
+        raise ValueError("record must be an object")
+    
+    title = record.get('title')
+    content = record.get('content')
+    if not isinstance(title, str) or not title.strip():
+        raise ValueError("missing title")
+    if not isinstance(content, str):
+        raise ValueError("missing content")
+    
+    tags: Dict[str, List[str]] = {}
+    for field in TAG_FIELDS:
+        value = record.get(field) or []
+        if not isinstance(value, list) or not all(isinstance(tag, str) for tag in value):
+            raise ValueError(f"{field} must be a list of strings")
+        tags[field] = value
+    
+    date: Optional[datetime] = None
+    if record.get('date'):
+        try:
+            date = datetime.fromisoformat(record['date'])
+        except (TypeError, ValueError):
+            raise ValueError(f"invalid date: {record['date']!r}")
+    
+    dream_id = record.get('id')
+    if dream_id is not None and not isinstance(dream_id, str):
+        dream_id = str(dream_id)
+    
+    return Dream(
+        title=title,
+        content=content,
+        lucid=bool(record.get('lucid', False)),
+        nightmare=bool(record.get('nightmare', False)),
+        date=date,
+        id=dream_id or None,
+        **tags
+    )
+
+
+def write_json(dreams: Iterable[Dream], f: TextIO):
+    """Write dreams as an indented JSON array, one element at a time
+    
+    The output is byte-for-byte what ``json.dump(records, f, indent=2,
+    ensure_ascii=False)`` would produce, without holding the list.
+    """
+    first = True
+    for dream in dreams:
+        element = dumps(dream.to_dict(), indent=True)
+        f.write('[\n  ' if first else ',\n  ')
+        f.write(element.replace('\n', '\n  '))
+        first = False
+    f.write('[]' if first else '\n]')
+
+
+def write_jsonl(dreams: Iterable[Dream], f: TextIO):
+    """Write one compact JSON object per line"""
+    for dream in dreams:
+        f.write(dumps(dream.to_dict()))
+        f.write('\n')
+
+
+def write_csv(dreams: Iterable[Dream], f: TextIO):
+    """Write dreams in the CSV layout read back by ``iter_csv``"""
+    writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+    writer.writeheader()
+    for dream in dreams:
+        row = dream.to_dict()
+        for field in TAG_FIELDS:
+            row[field] = '; '.join(row[field])
+        writer.writerow(row)
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_little_endian(typecode: str, data: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def _encode_strings(strings: List[str]) -> Tuple[bytes, bytes]:
+    offsets = array('Q', [0])
+    chunks = []
+    size = 0
+    for string in strings:
+        data = string.encode('utf-8')
+        chunks.append(data)
+        size += len(data)
+        offsets.append(size)
+    return _little_endian(offsets), b''.join(chunks)
+
+
+def _decode_strings(offsets: bytes, data: bytes) -> List[str]:
+    bounds = _from_little_endian('Q', offsets)
+    return [data[bounds[i]:bounds[i + 1]].decode('utf-8') for i in range(len(bounds) - 1)]
+
+
+def _encode_bits(flags: List[bool]) -> bytes:
+    bits = bytearray((len(flags) + 7) // 8)
+    for i, flag in enumerate(flags):
+        if flag:
+            bits[i >> 3] |= 1 << (i & 7)
+    return bytes(bits)
+
+
+def _decode_bits(data: bytes, count: int) -> List[bool]:
+    return [bool(data[i >> 3] >> (i & 7) & 1) for i in range(count)]
+
+
+def _encode_group(dreams: List[Dream]) -> bytes:
+    """Encode a row group: a JSON header followed by the raw column buffers"""
+    columns: List[Tuple[str, bytes]] = []
+    
+    for field in ('id', 'title', 'content'):
+        offsets, data = _encode_strings([getattr(dream, field) for dream in dreams])
+        columns.append((f'{field}.offsets', offsets))
+        columns.append((f'{field}.data', data))
+    
+    dates = array('q')
+    offsets = array('i')
+    for dream in dreams:
+        utc_offset = dream.date.utcoffset()
+        naive = dream.date.replace(tzinfo=None)
+        dates.append((naive - _EPOCH) // _MICROSECOND)
+        offsets.append(_NAIVE if utc_offset is None else int(utc_offset.total_seconds()))
+    columns.append(('date', _little_endian(dates)))
+    columns.append(('date.utc_offset', _little_endian(offsets)))
+    
+    columns.append(('lucid', _encode_bits([dream.lucid for dream in dreams])))
+    columns.append(('nightmare', _encode_bits([dream.nightmare for dream in dreams])))
+    
+    vocabulary: Dict[str, int] = {}
+    for field in TAG_FIELDS:
+        tag_offsets = array('Q', [0])
+        values = array('I')
+        for dream in dreams:
+            for tag in getattr(dream, field):
+                values.append(vocabulary.setdefault(tag, len(vocabulary)))
+            tag_offsets.append(len(values))
+        columns.append((f'{field}.offsets', _little_endian(tag_offsets)))
+        columns.append((f'{field}.values', _little_endian(values)))
+    
+    header = json.dumps({
+        'count': len(dreams),
+        'vocabulary': list(vocabulary),
+        'columns': [[name, len(data)] for name, data in columns]
+    }, ensure_ascii=False).encode('utf-8')
+    return struct.pack('<I', len(header)) + header + b''.join(data for _, data in columns)
+
+
+def write_columnar(dreams: Iterable[Dream], f: BinaryIO, group_size: int = COLUMNAR_GROUP_SIZE):
+    """Write dreams in the binary columnar format, one row group at a time
+    
+    Each group stores ids, titles and contents as UTF-8 buffers with offset
+    arrays, dates as int64 epoch microseconds, flags as bitmaps and tags as
+    CSR offsets into a per-group vocabulary, so memory use is bounded by the
+    group size.
+    """
+    f.write(COLUMNAR_MAGIC)
+    group: List[Dream] = []
+    for dream in dreams:
+        group.append(dream)
+        if len(group) >= group_size:
+            f.write(_encode_group(group))
+            group = []
+    if group:
+        f.write(_encode_group(group))
+
+
+def _read_exact(f: BinaryIO, size: int) -> bytes:
+    data = f.read(size)
+    if len(data) != size:
+        raise ValueError("Truncated columnar file")
+    return data
+
+
+def read_columnar(f: BinaryIO) -> Iterator[Dict[str, Any]]:
+    """Yield records from a file written by ``write_columnar``"""
+    if f.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+        raise ValueError("Not a dream columnar file")
+    
+    while True:
+        prefix = f.read(4)
+        if not prefix:
+            return
+        if len(prefix) != 4:
+            raise ValueError("Truncated columnar file")
+        header = json.loads(_read_exact(f, struct.unpack('<I', prefix)[0]))
+        columns = {name: _read_exact(f, size) for name, size in header['columns']}
+        count = header['count']
+        vocabulary = header['vocabulary']
+        
+        strings = {field: _decode_strings(columns[f'{field}.offsets'], columns[f'{field}.data'])
+                   for field in ('id', 'title', 'content')}
+        dates = _from_little_endian('q', columns['date'])
+        utc_offsets = _from_little_endian('i', columns['date.utc_offset'])
+        flags = {field: _decode_bits(columns[field], count) for field in ('lucid', 'nightmare')}
+        tags = {}
+        for field in TAG_FIELDS:
+            offsets = _from_little_endian('Q', columns[f'{field}.offsets'])
+            values = _from_little_endian('I', columns[f'{field}.values'])
+            tags[field] = [[vocabulary[value] for value in values[offsets[i]:offsets[i + 1]]] for i in range(count)]
+        
+        for i in range(count):
+            date = _EPOCH + dates[i] * _MICROSECOND
+            if utc_offsets[i] != _NAIVE:
+                date = date.replace(tzinfo=timezone(timedelta(seconds=utc_offsets[i])))
+            yield {
+                'title': strings['title'][i],
+                'content': strings['content'][i],
+                'emotions': tags['emotions'][i],
+                'characters': tags['characters'][i],
+                'themes': tags['themes'][i],
+                'lucid': flags['lucid'][i],
+                'nightmare': flags['nightmare'][i],
+                'date': date.isoformat(),
+                'id': strings['id'][i]
+            }
+
+
+def iter_columnar(path: str) -> Iterator[Tuple[int, Any]]:
+    """Yield ``(row_number, record)`` for each dream in a columnar file"""
+    with open_binary(path, 'r', _compression_of(path)) as f:
+        yield from enumerate(read_columnar(f), 1)
+
+
+def export_dreams(dreams: Iterable[Dream], path: str, format: str = 'json', compression: str = None):
+    """Stream dreams to a file in one of ``EXPORT_FORMATS``"""
+    if format == 'columnar':
+        with open_binary(path, 'w', compression) as f:
+            write_columnar(dreams, f)
+        return
+    
+    writers = {'json': write_json, 'jsonl': write_jsonl, 'csv': write_csv}
+    if format not in writers:
+        raise ValueError(f"Unsupported export format: {format}")
+    with open_text(path, 'w', compression) as f:
+        writers[format](dreams, f)
+
+
+def select_dreams(journal, start_date: datetime = None, end_date: datetime = None,
+                  emotion: str = None, theme: str = None, lucid: bool = None,
+                  nightmare: bool = None, search: str = None) -> Iterator[Dream]:
+    """Stream the dreams matching every given filter
+    
+    Without a date range dreams come in insertion order; with one, only the
+    dreams inside it are read, oldest first, through the date index.
+    """
+    if start_date is None and end_date is None:
+        dreams = journal.iter_dreams()
+    else:
+        dreams = journal.iter_dreams_by_date(start_date, end_date)
+    
+    matching_ids: Optional[Set[str]] = None
+    if search:
+        matching_ids = {dream.id for dream in journal.get_dreams(search=search)}
+    emotion = emotion.lower() if emotion else None
+    theme = theme.lower() if theme else None
+    
+    for dream in dreams:
+        if matching_ids is not None and dream.id not in matching_ids:
+            continue
+        if emotion and emotion not in (e.lower() for e in dream.emotions):
+            continue
+        if theme and theme not in (t.lower() for t in dream.themes):
+            continue
+        if lucid is not None and dream.lucid != lucid:
+            continue
+        if nightmare is not None and dream.nightmare != nightmare:
+            continue
+        yield dream
@@ -2,16 +2,18 @@
 Dream data models for the Dream Journal Analyzer
 """
 
-import json
-import csv
+import sys
 import uuid
 from datetime import datetime
-from typing import List, Dict, Optional, Any
-from dataclasses import dataclass, asdict
-from pathlib import Path
+from typing import List, Dict, Optional, Any, Iterable, Iterator, Tuple
+from dataclasses import dataclass
 
 
-@dataclass
+# Slotted dataclasses need Python 3.10; older interpreters fall back to __dict__
+_DATACLASS_OPTIONS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**_DATACLASS_OPTIONS)
 class Dream:
     """Represents a single dream entry"""
     title: str
@@ -28,19 +30,40 @@ class Dream:
         if self.date is None:
             self.date = datetime.now()
         if self.id is None:
-            self.id = str(uuid.uuid4())[:8]
+            # Full width: imports deduplicate by id, and a truncated id collides
+            # by the birthday bound within a few hundred thousand dreams
+            self.id = uuid.uuid4().hex
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert dream to dictionary format"""
-        data = asdict(self)
-        data['date'] = self.date.isoformat()
-        return data
+        # Built by hand: dataclasses.asdict deep-copies every field
+        return {
+            'title': self.title,
+            'content': self.content,
+            'emotions': list(self.emotions),
+            'characters': list(self.characters),
+            'themes': list(self.themes),
+            'lucid': self.lucid,
+            'nightmare': self.nightmare,
+            'date': self.date.isoformat(),
+            'id': self.id
+        }
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'Dream':
-        """Create dream from dictionary"""
-        data['date'] = datetime.fromisoformat(data['date'])
-        return cls(**data)
+        """Create dream from dictionary, leaving the dictionary untouched"""
+        # Positional arguments in field order are the cheapest way into __init__
+        return cls(
+            data['title'],
+            data['content'],
+            data['emotions'],
+            data['characters'],
+            data['themes'],
+            data.get('lucid', False),
+            data.get('nightmare', False),
+            datetime.fromisoformat(data['date']),
+            data.get('id')
+        )
     
     def matches_search(self, search_term: str) -> bool:
         """Check if dream matches search term"""
@@ -57,95 +80,91 @@ class Dream:
 class DreamJournal:
     """Manages a collection of dreams with persistence"""
     
-    def __init__(self, data_file: str = 'dreams.json'):
+    def __init__(self, data_file: str = 'dreams.json', backend: str = 'json', **storage_options):
+        from storage import create_storage
+        
         self.data_file = data_file
-        self.dreams: List[Dream] = []
-        self.load_dreams()
+        self.storage = create_storage(data_file, backend, **storage_options)
+    
+    @property
+    def dreams(self) -> List[Dream]:
+        """All dreams in the journal, in insertion order"""
+        return self.storage.dreams
     
     def load_dreams(self):
-        """Load dreams from file"""
-        if Path(self.data_file).exists():
-            try:
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    self.dreams = [Dream.from_dict(dream_data) for dream_data in data]
-            except (json.JSONDecodeError, KeyError, ValueError) as e:
-                print(f"Warning: Could not load dreams from {self.data_file}: {e}")
-                self.dreams = []
+        """Load dreams from storage"""
+        self.storage.load()
     
     def save_dreams(self):
-        """Save dreams to file"""
-        try:
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump([dream.to_dict() for dream in self.dreams], f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            print(f"Error saving dreams: {e}")
+        """Save dreams to storage"""
+        self.storage.save()
     
     def add_dream(self, dream: Dream):
         """Add a new dream to the journal"""
-        self.dreams.append(dream)
-        self.save_dreams()
+        self.storage.add(dream)
+    
+    def add_dreams(self, dreams: Iterable[Dream], batch_size: int = 10000) -> int:
+        """Bulk-add dreams, committing one batch at a time
+        
+        Dreams whose id is already in the journal (or earlier in the stream)
+        are skipped. Returns the number of dreams added.
+        """
+        added = 0
+        batch: List[Dream] = []
+        for dream in dreams:
+            batch.append(dream)
+            if len(batch) >= batch_size:
+                added += self.storage.add_batch(batch)
+                batch = []
+        if batch:
+            added += self.storage.add_batch(batch)
+        return added
     
     def get_dreams(self, limit: int = None, search: str = None) -> List[Dream]:
         """Get dreams with optional limit and search"""
-        dreams = self.dreams
-        
-        if search:
-            dreams = [dream for dream in dreams if dream.matches_search(search)]
-        
-        # Sort by date (newest first)
-        dreams = sorted(dreams, key=lambda d: d.date, reverse=True)
-        
-        if limit:
-            dreams = dreams[:limit]
-        
-        return dreams
+        return self.storage.get_dreams(limit=limit, search=search)
     
     def get_dream_by_id(self, dream_id: int) -> Optional[Dream]:
         """Get a dream by its position in the list (1-indexed)"""
         try:
-            sorted_dreams = sorted(self.dreams, key=lambda d: d.date, reverse=True)
-            if 1 <= dream_id <= len(sorted_dreams):
-                return sorted_dreams[dream_id - 1]
+            return self.storage.get_dream_at(dream_id)
         except (IndexError, ValueError):
             pass
         return None
     
     def get_dreams_by_date_range(self, start_date: datetime, end_date: datetime) -> List[Dream]:
-        """Get dreams within a date range"""
-        return [
-            dream for dream in self.dreams
-            if start_date <= dream.date <= end_date
-        ]
+        """Get dreams within a date range, oldest first"""
+        return self.storage.get_dreams_by_date_range(start_date, end_date)
+    
+    def iter_dreams(self) -> Iterator[Dream]:
+        """Stream every dream in insertion order"""
+        return self.storage.iter_dreams()
+    
+    def iter_dreams_by_date(self, start_date: datetime = None, end_date: datetime = None) -> Iterator[Dream]:
+        """Stream dreams in chronological order, optionally within a date range"""
+        return self.storage.iter_dreams_by_date(start_date, end_date)
     
     def get_dreams_by_emotion(self, emotion: str) -> List[Dream]:
         """Get dreams containing a specific emotion"""
-        return [
-            dream for dream in self.dreams
-            if emotion.lower() in [e.lower() for e in dream.emotions]
-        ]
+        return self.storage.get_dreams_by_emotion(emotion)
     
     def get_dreams_by_theme(self, theme: str) -> List[Dream]:
         """Get dreams containing a specific theme"""
-        return [
-            dream for dream in self.dreams
-            if theme.lower() in [t.lower() for t in dream.themes]
-        ]
+        return self.storage.get_dreams_by_theme(theme)
     
     def get_lucid_dreams(self) -> List[Dream]:
         """Get all lucid dreams"""
-        return [dream for dream in self.dreams if dream.lucid]
+        return self.storage.get_lucid_dreams()
     
     def get_nightmares(self) -> List[Dream]:
         """Get all nightmares"""
-        return [dream for dream in self.dreams if dream.nightmare]
+        return self.storage.get_nightmares()
     
     def delete_dream(self, dream_id: int) -> bool:
         """Delete a dream by ID"""
         dream = self.get_dream_by_id(dream_id)
         if dream:
-            self.dreams.remove(dream)
-            self.save_dreams()
+            self.storage.delete(dream)
             return True
         return False
     
@@ -153,85 +172,54 @@ class DreamJournal:
         """Update a dream with new data"""
         dream = self.get_dream_by_id(dream_id)
         if dream:
-            for key, value in updates.items():
-                if hasattr(dream, key):
-                    setattr(dream, key, value)
-            self.save_dreams()
+            changes = {key: value for key, value in updates.items() if hasattr(dream, key)}
+            self.storage.update(dream, changes)
             return True
         return False
     
     def export_to_json(self, filename: str):
         """Export dreams to JSON file"""
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump([dream.to_dict() for dream in self.dreams], f, indent=2, ensure_ascii=False)
+        from dream_io import export_dreams
+        export_dreams(self.iter_dreams(), filename, 'json')
     
     def export_to_csv(self, filename: str):
         """Export dreams to CSV file"""
-        if not self.dreams:
+        from dream_io import export_dreams
+        if not self.get_statistics()['total_dreams']:
             return
-        
-        fieldnames = ['id', 'title', 'content', 'date', 'emotions', 'characters', 'themes', 'lucid', 'nightmare']
-        
-        with open(filename, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            
-            for dream in self.dreams:
-                row = dream.to_dict()
-                row['emotions'] = '; '.join(row['emotions'])
-                row['characters'] = '; '.join(row['characters'])
-                row['themes'] = '; '.join(row['themes'])
-                writer.writerow(row)
+        export_dreams(self.iter_dreams(), filename, 'csv')
     
     def get_statistics(self) -> Dict[str, Any]:
         """Get basic statistics about the dream journal"""
-        if not self.dreams:
-            return {'total_dreams': 0}
-        
-        total_dreams = len(self.dreams)
-        lucid_dreams = len(self.get_lucid_dreams())
-        nightmares = len(self.get_nightmares())
-        
-        # Get date range
-        dates = [dream.date for dream in self.dreams]
-        earliest_date = min(dates)
-        latest_date = max(dates)
-        
-        # Count emotions and themes
-        all_emotions = []
-        all_themes = []
-        all_characters = []
-        
-        for dream in self.dreams:
-            all_emotions.extend(dream.emotions)
-            all_themes.extend(dream.themes)
-            all_characters.extend(dream.characters)
-        
-        emotion_counts = {}
-        theme_counts = {}
-        character_counts = {}
-        
-        for emotion in all_emotions:
-            emotion_counts[emotion] = emotion_counts.get(emotion, 0) + 1
-        
-        for theme in all_themes:
-            theme_counts[theme] = theme_counts.get(theme, 0) + 1
-        
-        for character in all_characters:
-            character_counts[character] = character_counts.get(character, 0) + 1
-        
-        return {
-            'total_dreams': total_dreams,
-            'lucid_dreams': lucid_dreams,
-            'nightmares': nightmares,
-            'lucid_percentage': (lucid_dreams / total_dreams) * 100 if total_dreams > 0 else 0,
-            'nightmare_percentage': (nightmares / total_dreams) * 100 if total_dreams > 0 else 0,
-            'earliest_date': earliest_date,
-            'latest_date': latest_date,
-            'emotion_counts': emotion_counts,
-            'theme_counts': theme_counts,
-            'character_counts': character_counts,
-            'total_emotions': len(emotion_counts),
-            'total_themes': len(theme_counts),
-            'total_characters': len(character_counts)
-        }
\ No newline at end of file
+        return self.storage.get_statistics()
+    
+    def get_date_array(self):
+        """Dates of every dream as a numpy ``datetime64[us]`` array, without loading the dreams"""
+        return self.storage.get_date_array()
+    
+    def get_emotion_buckets(self, bucket: str = 'month'):
+        """Dreams and emotions counted per ``'week'`` or ``'month'``, kept current as dreams change"""
+        return self.storage.get_emotion_buckets(bucket)
+    
+    def get_cooccurring_tags(self, kind: str, tag: str, limit: int = 10) -> List[Tuple[str, str, int]]:
+        """``(kind, tag, dreams)`` for the tags most often recorded with an emotion, character or theme"""
+        return self.storage.get_cooccurring_tags(kind, tag, limit)
+    
+    def get_similar_dreams(self, dream: Dream, limit: int = 5) -> List[Tuple[Dream, float]]:
+        """Dreams with the most similar emotions, characters and themes, best first"""
+        return self.storage.get_similar_dreams(dream, limit)
+    
+    def get_similar_content(self, dream: Dream, limit: int = 5) -> List[Tuple[Dream, float]]:
+        """Dreams whose title and content read most like a dream's, with their cosine similarity"""
+        matches = self.storage.get_content_index().similar(dream, limit)
+        scores = dict(matches)
+        return [(match, scores[match.id]) for match in self.storage.get_dreams_by_ids([dream_id for dream_id, _ in matches])]
+    
+    def get_dream_keywords(self, dream: Dream, limit: int = 10) -> List[Tuple[str, float]]:
+        """Words that set a dream apart from the rest of the journal, by TF-IDF weight"""
+        return self.storage.get_content_index().keywords(dream, limit)
+    
+    def get_corpus_keywords(self, start_date: datetime = None, end_date: datetime = None,
+                            limit: int = 20) -> List[Tuple[str, float]]:
+        """Most characteristic words of the dreams dated within ``[start_date, end_date]``"""
+        return self.storage.get_content_index().corpus_keywords(start_date, end_date, limit)
@@ -0,0 +1,112 @@
+"""
+Lazily hydrated dream collections
+"""
+
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from dream_models import Dream
+
+
+# Flag bits accepted by ``flagged``; the binary snapshot stores them as-is
+LUCID = 1
+NIGHTMARE = 2
+FLAG_FIELDS = {LUCID: 'lucid', NIGHTMARE: 'nightmare'}
+
+
+class DreamRecords:
+    """Insertion-ordered dreams keyed by id, hydrated on first access
+    
+    Records loaded from disk are kept as the plain dictionaries produced by
+    the JSON parser. A ``Dream`` (including its ``datetime`` parse) is only
+    built when that record is actually read, and the result is cached in
+    place of the raw dictionary.
+    """
+    
+    def __init__(self):
+        self._items: Dict[str, Union[Dict[str, Any], Dream]] = {}
+    
+    def __len__(self) -> int:
+        return len(self._items)
+    
+    def __contains__(self, dream_id: str) -> bool:
+        return dream_id in self._items
+    
+    def __iter__(self) -> Iterator[Dream]:
+        for dream_id in list(self._items):
+            yield self.get(dream_id)
+    
+    def ids(self) -> Iterator[str]:
+        """Iterate over dream ids in insertion order"""
+        return iter(self._items)
+    
+    def get(self, dream_id: str) -> Optional[Dream]:
+        """Return the dream with the given id, hydrating it if necessary"""
+        item = self._items.get(dream_id)
+        if isinstance(item, dict):
+            item = Dream.from_dict(item)
+            self._items[dream_id] = item
+        return item
+    
+    def get_record(self, dream_id: str) -> Optional[Dict[str, Any]]:
+        """Return the dictionary form of a dream without hydrating it"""
+        item = self._items.get(dream_id)
+        if isinstance(item, Dream):
+            return item.to_dict()
+        return item
+    
+    def date_key(self, dream_id: str) -> str:
+        """ISO timestamp of a dream, read without hydrating it
+        
+        Timestamps written by ``Dream.to_dict`` sort lexicographically in
+        date order, so callers can order records by this key directly.
+        """
+        item = self._items[dream_id]
+        if isinstance(item, dict):
+            return item['date']
+        return item.date.isoformat()
+    
+    def put(self, dream: Dream, replaces: str = None):
+        """Insert a dream, or replace an existing one in place"""
+        self._put(dream.id, dream, replaces)
+    
+    def put_raw(self, record: Dict[str, Any], replaces: str = None):
+        """Insert a dream from its dictionary form without hydrating it"""
+        if 'id' not in record or 'date' not in record:
+            self.put(Dream.from_dict(record), replaces)
+        else:
+            self._put(record['id'], record, replaces)
+    
+    def _put(self, dream_id: str, item: Union[Dict[str, Any], Dream], replaces: str = None):
+        if replaces is not None and replaces != dream_id and replaces in self._items:
+            # Re-key while keeping the record's position in insertion order
+            self._items = {
+                (dream_id if key == replaces else key): (item if key == replaces else value)
+                for key, value in self._items.items()
+            }
+        else:
+            self._items[dream_id] = item
+    
+    def discard(self, dream_id: str):
+        """Remove a dream if it is present"""
+        self._items.pop(dream_id, None)
+    
+    def flagged(self, flag: int) -> List[Dream]:
+        """Dreams with a flag bit set, in insertion order, hydrating only those"""
+        field = FLAG_FIELDS[flag]
+        return [
+            self.get(dream_id) for dream_id, item in list(self._items.items())
+            if (item.get(field, False) if isinstance(item, dict) else getattr(item, field))
+        ]
+    
+    def tagged(self, field: str, tag: str) -> List[Dream]:
+        """Dreams whose ``emotions``, ``characters`` or ``themes`` include a tag, ignoring case"""
+        tag = tag.lower()
+        return [
+            self.get(dream_id) for dream_id, item in list(self._items.items())
+            if any(value.lower() == tag for value in (item[field] if isinstance(item, dict) else getattr(item, field)))
+        ]
+    
+    def to_dicts(self) -> Iterator[Dict[str, Any]]:
+        """Yield every record in dictionary form, hydrating nothing"""
+        for item in self._items.values():
+            yield item if isinstance(item, dict) else item.to_dict()
@@ -0,0 +1,206 @@
+"""
+Emotion counts per time bucket and rolling-window trend detection
+"""
+
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from dream_models import Dream
+from indexes import JournalIndex
+
+
+# Smallest change in an emotion's share of dreams, across the window, reported as a trend
+MIN_TREND = 0.1
+# Smallest jump in an emotion's mean share reported as a shift
+MIN_SHIFT = 0.25
+# Buckets needed on each side of a shift
+MIN_SEGMENT = 2
+
+
+def bucket_key(when: datetime, bucket: str) -> str:
+    """Key of the week (its Monday) or month a date falls in; keys sort in time order"""
+    if bucket == 'week':
+        return (when.date() - timedelta(days=when.weekday())).isoformat()
+    return when.strftime('%Y-%m')
+
+
+def bucket_range(last: str, bucket: str, count: int) -> List[str]:
+    """The ``count`` consecutive bucket keys ending with ``last``, oldest first"""
+    if bucket == 'week':
+        end = date.fromisoformat(last)
+        return [(end - timedelta(weeks=weeks)).isoformat() for weeks in range(count - 1, -1, -1)]
+    
+    year, month = map(int, last.split('-'))
+    end = year * 12 + month - 1
+    return [f'{months // 12:04d}-{months % 12 + 1:02d}' for months in range(end - count + 1, end + 1)]
+
+
+class EmotionBuckets(JournalIndex):
+    """Dreams and emotions counted per week or month
+    
+    Each bucket holds how many dreams fall in it and in how many of those
+    each emotion was recorded. Adding or removing a dream touches one
+    bucket, so trends over the latest buckets cost O(window x emotions)
+    however long the journal is.
+    """
+    
+    bucket = ''
+    
+    def __init__(self):
+        self.totals: Dict[str, int] = {}
+        self.counts: Dict[str, Counter] = {}
+    
+    def add(self, dream: Dream):
+        key = bucket_key(dream.date, self.bucket)
+        self.totals[key] = self.totals.get(key, 0) + 1
+        # An emotion listed twice still marks one dream
+        self.counts.setdefault(key, Counter()).update(dict.fromkeys(dream.emotions, 1))
+    
+    def remove(self, dream: Dream):
+        key = bucket_key(dream.date, self.bucket)
+        total = self.totals.get(key, 0) - 1
+        if total <= 0:
+            self.totals.pop(key, None)
+            self.counts.pop(key, None)
+            return
+        
+        self.totals[key] = total
+        counts = self.counts[key]
+        for emotion in dict.fromkeys(dream.emotions):
+            counts[emotion] -= 1
+            if counts[emotion] <= 0:
+                del counts[emotion]
+    
+    def window(self, size: int) -> List[Tuple[str, int, Counter]]:
+        """``(key, dreams, emotion counts)`` for the ``size`` buckets ending at the newest dream"""
+        if not self.totals:
+            return []
+        keys = bucket_range(max(self.totals), self.bucket, size)
+        return [(key, self.totals.get(key, 0), self.counts.get(key, Counter())) for key in keys]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'totals': self.totals,
+            'counts': {key: dict(counts) for key, counts in self.counts.items()}
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'EmotionBuckets':
+        index = cls()
+        index.totals = dict(data['totals'])
+        index.counts = {key: Counter(counts) for key, counts in data['counts'].items()}
+        return index
+
+
+class WeeklyEmotions(EmotionBuckets):
+    name = 'emotions_week'
+    bucket = 'week'
+
+
+class MonthlyEmotions(EmotionBuckets):
+    name = 'emotions_month'
+    bucket = 'month'
+
+
+EMOTION_BUCKETS = {index_type.bucket: index_type for index_type in (WeeklyEmotions, MonthlyEmotions)}
+
+
+@dataclass
+class EmotionTrend:
+    """How one emotion's share of dreams moved across the window"""
+    
+    emotion: str
+    # Change in the share of dreams featuring the emotion, per bucket
+    slope: float
+    # First bucket after the largest shift in the share, if it is big enough
+    change_point: Optional[str] = None
+    before: float = 0.0
+    after: float = 0.0
+
+
+def _largest_shift(shares: List[float]) -> Tuple[int, float, float]:
+    """Split maximizing the difference between segment means, found with prefix sums
+    
+    Returns the index where the second segment starts and both means; the
+    split scored by ``k * (n - k) * (mean_before - mean_after) ** 2`` is the
+    one that best explains the series as two flat levels.
+    """
+    n = len(shares)
+    total = sum(shares)
+    best = (0, 0.0, 0.0)
+    best_score = -1.0
+    running = 0.0
+    for k in range(1, n):
+        running += shares[k - 1]
+        if k < MIN_SEGMENT or n - k < MIN_SEGMENT:
+            continue
+        before = running / k
+        after = (total - running) / (n - k)
+        score = k * (n - k) * (before - after) ** 2
+        if score > best_score:
+            best, best_score = (k, before, after), score
+    return best
+
+
+def emotion_trends(window: List[Tuple[str, int, Counter]]) -> List[EmotionTrend]:
+    """Least-squares slope and largest shift of each emotion's share of dreams
+    
+    Buckets without dreams carry no information and are skipped; slopes are
+    still measured per bucket of elapsed time.
+    """
+    observed = [(position, key, total, counts)
+                for position, (key, total, counts) in enumerate(window) if total]
+    if len(observed) < 2:
+        return []
+    
+    positions = [position for position, _, _, _ in observed]
+    mean_position = sum(positions) / len(positions)
+    spread = sum((position - mean_position) ** 2 for position in positions)
+    emotions = dict.fromkeys(emotion for _, _, _, counts in observed for emotion in counts)
+    
+    trends = []
+    for emotion in emotions:
+        shares = [counts.get(emotion, 0) / total for _, _, total, counts in observed]
+        mean_share = sum(shares) / len(shares)
+        slope = sum((position - mean_position) * (share - mean_share)
+                    for position, share in zip(positions, shares)) / spread
+        
+        trend = EmotionTrend(emotion, slope)
+        split, before, after = _largest_shift(shares)
+        if split and abs(after - before) >= MIN_SHIFT:
+            trend.change_point = observed[split][1]
+            trend.before = before
+            trend.after = after
+        trends.append(trend)
+    
+    trends.sort(key=lambda trend: -abs(trend.slope))
+    return trends
+
+
+def describe_trends(trends: List[EmotionTrend], window: List[Tuple[str, int, Counter]], bucket: str) -> str:
+    """One-line summary of the rising, falling and shifting emotions"""
+    if sum(1 for _, total, _ in window if total) < 2:
+        return "Not enough data for trend analysis"
+    
+    span = len(window) - 1
+    increasing = [trend for trend in trends if trend.slope * span >= MIN_TREND]
+    decreasing = [trend for trend in trends if -trend.slope * span >= MIN_TREND]
+    shifts = [trend for trend in trends if trend.change_point]
+    
+    def rates(selected: List[EmotionTrend]) -> str:
+        return ', '.join(f"{trend.emotion} ({trend.slope * 100:+.1f}%/{bucket})" for trend in selected[:3])
+    
+    parts = []
+    if increasing:
+        parts.append(f"Increasing: {rates(increasing)}")
+    if decreasing:
+        parts.append(f"Decreasing: {rates(decreasing)}")
+    if shifts:
+        parts.append("Shifts: " + ', '.join(
+            f"{trend.emotion} {trend.before:.0%} → {trend.after:.0%} from {trend.change_point}"
+            for trend in shifts[:3]
+        ))
+    
+    return "; ".join(parts) if parts else "No significant trends detected"
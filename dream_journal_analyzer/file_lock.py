@@ -0,0 +1,48 @@
+"""
+Advisory file lock shared by every process writing a journal
+"""
+
+import os
+from contextlib import contextmanager
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:
+    # Windows has no flock; a single writer is assumed there
+    fcntl = None
+
+
+class FileLock:
+    """``flock`` on a lock file next to the journal, reentrant within one process
+
+    Writers hold it exclusively; readers hold it shared so they never see a
+    snapshot half written. Nested holds reuse the outer one, so a shared
+    hold taken inside an exclusive one is free, but an exclusive hold must
+    not be nested inside a shared one.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = None
+        self._depth = 0
+
+    @contextmanager
+    def hold(self, shared: bool = False) -> Iterator[None]:
+        if self._depth == 0 and fcntl is not None:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            except BaseException:
+                os.close(fd)
+                raise
+            self._fd = fd
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            if self._depth == 0 and self._fd is not None:
+                # Closing the descriptor releases the lock
+                os.close(self._fd)
+                self._fd = None
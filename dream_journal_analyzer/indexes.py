@@ -0,0 +1,317 @@
+"""
+Persistent derived indexes over the dream journal
+"""
+
+import os
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from datetime import datetime
+from itertools import groupby, islice
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Type
+
+from atomic_file import atomic_write
+from dream_models import Dream
+from serialization import dumpb, loads
+
+
+CHECKPOINT_FORMAT = 2
+
+
+class JournalIndex:
+    """Base class for structures derived from the journal
+    
+    Storage backends keep an index current by calling ``add`` after a dream
+    is stored and ``remove`` with the dream's previous state before it
+    changes, or ``replace`` when a dream changes in place. Indexes can be
+    checkpointed next to the data file so they do not have to be rebuilt
+    from every dream on the next run.
+    """
+    
+    name = ''
+    persistent = True
+    checkpoint_suffix = 'json'
+    
+    def add(self, dream: Dream):
+        raise NotImplementedError
+    
+    def remove(self, dream: Dream):
+        raise NotImplementedError
+    
+    def replace(self, old: Dream, new: Dream):
+        """Move a dream that keeps its place in insertion order from its old state to its new one"""
+        self.remove(old)
+        self.add(new)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        raise NotImplementedError
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'JournalIndex':
+        raise NotImplementedError
+    
+    def write_checkpoint(self, f: BinaryIO, signature: Tuple[int, int]):
+        """Write the index, tagged with the snapshot version it matches"""
+        f.write(dumpb({
+            'format': CHECKPOINT_FORMAT,
+            'snapshot': list(signature),
+            'index': self.to_dict()
+        }))
+    
+    @classmethod
+    def read_checkpoint(cls, f: BinaryIO, signature: Tuple[int, int]) -> Optional['JournalIndex']:
+        """Read an index written by ``write_checkpoint``, or None if it is for another snapshot"""
+        data = loads(f.read())
+        if data.get('format') != CHECKPOINT_FORMAT or tuple(data.get('snapshot', ())) != signature:
+            return None
+        return cls.from_dict(data['index'])
+
+
+def checkpoint_path(data_file: str, index_type: Type[JournalIndex]) -> str:
+    """Path of the checkpoint file for an index"""
+    return f'{data_file}.{index_type.name}.{index_type.checkpoint_suffix}'
+
+
+def file_signature(path: str) -> Optional[Tuple[int, int]]:
+    """Size and modification time identifying one version of a file"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+def load_checkpoint(index_type: Type[JournalIndex], data_file: str,
+                    signature: Optional[Tuple[int, int]]) -> Optional[JournalIndex]:
+    """Load an index checkpoint taken against the given snapshot version"""
+    if signature is None:
+        return None
+    
+    path = checkpoint_path(data_file, index_type)
+    try:
+        with open(path, 'rb') as f:
+            return index_type.read_checkpoint(f, signature)
+    except FileNotFoundError:
+        return None
+    except (KeyError, TypeError, ValueError) as e:
+        print(f"Warning: Ignoring unreadable index checkpoint {path}: {e}")
+        return None
+
+
+def save_checkpoint(index: JournalIndex, data_file: str, signature: Tuple[int, int]):
+    """Persist an index as of the given snapshot version"""
+    path = checkpoint_path(data_file, type(index))
+    try:
+        with atomic_write(path) as f:
+            index.write_checkpoint(f, signature)
+    except OSError as e:
+        print(f"Error saving index checkpoint {path}: {e}")
+
+
+def newest_first(keys: Iterable[Tuple[str, int, str]]) -> Iterator[Tuple[str, int, str]]:
+    """Date index keys given newest first, with each run of equal dates put back in insertion order"""
+    for _, group in groupby(keys, key=lambda key: key[0]):
+        yield from reversed(list(group))
+
+
+class DateIndex(JournalIndex):
+    """Dream ids kept sorted by date with bisection
+    
+    Keys are ``(iso_timestamp, seq, id)`` triples, where ``seq`` numbers
+    dreams in insertion order so dreams with equal dates keep the order
+    they were added in, as the other backends do. Timestamps written by
+    ``Dream.to_dict`` compare lexicographically in date order, so the index
+    can be built straight from raw records without parsing any dates. It is
+    checkpointed like the other indexes, so a run that only lists the newest
+    dreams does not sort the whole journal first.
+    """
+    
+    name = 'dates'
+    
+    def __init__(self, keys: List[Tuple[str, str]] = None):
+        """Index ``(iso_timestamp, id)`` pairs given in insertion order"""
+        self._keys: List[Tuple[str, int, str]] = sorted(
+            (date, seq, dream_id) for seq, (date, dream_id) in enumerate(keys or [])
+        )
+        self._next_seq = len(self._keys)
+    
+    def __len__(self) -> int:
+        return len(self._keys)
+    
+    def add(self, dream: Dream):
+        insort(self._keys, (dream.date.isoformat(), self._next_seq, dream.id))
+        self._next_seq += 1
+    
+    def _find(self, date: str, dream_id: str) -> Optional[int]:
+        """Position of a dream's key, scanning the dreams that share its date"""
+        position = bisect_left(self._keys, (date,))
+        while position < len(self._keys) and self._keys[position][0] == date:
+            if self._keys[position][2] == dream_id:
+                return position
+            position += 1
+        return None
+    
+    def _pop(self, dream: Dream) -> Optional[int]:
+        """Remove a dream's key, returning its sequence number"""
+        position = self._find(dream.date.isoformat(), dream.id)
+        if position is None:
+            return None
+        return self._keys.pop(position)[1]
+    
+    def remove(self, dream: Dream):
+        self._pop(dream)
+    
+    def replace(self, old: Dream, new: Dream):
+        seq = self._pop(old)
+        if seq is None:
+            self.add(new)
+        else:
+            insort(self._keys, (new.date.isoformat(), seq, new.id))
+    
+    def seq(self, date: str, dream_id: str) -> Optional[int]:
+        """Insertion sequence number of a dream, given its timestamp"""
+        position = self._find(date, dream_id)
+        return self._keys[position][1] if position is not None else None
+    
+    def sort_newest(self, dream_ids: Iterable[str], date_key: Callable[[str], str]) -> List[str]:
+        """Order some indexed dreams newest first, equal dates in insertion order"""
+        keys = []
+        for dream_id in dream_ids:
+            date = date_key(dream_id)
+            keys.append((date, self.seq(date, dream_id), dream_id))
+        keys.sort(key=lambda key: (key[0], key[1]), reverse=True)
+        return [dream_id for _, _, dream_id in newest_first(keys)]
+    
+    def newest(self, limit: int = None) -> List[str]:
+        """Ids of the newest dreams, newest first"""
+        keys = islice(newest_first(reversed(self._keys)), limit or None)
+        return [dream_id for _, _, dream_id in keys]
+    
+    def oldest(self) -> List[str]:
+        """All ids, oldest first"""
+        return [dream_id for _, _, dream_id in self._keys]
+    
+    def bounds(self) -> Optional[Tuple[str, str]]:
+        """Timestamps of the oldest and newest dreams"""
+        if not self._keys:
+            return None
+        return self._keys[0][0], self._keys[-1][0]
+    
+    def nth_newest(self, position: int) -> Optional[str]:
+        """Id of the dream at a 1-indexed newest-first position"""
+        count = len(self._keys)
+        if not 1 <= position <= count:
+            return None
+        # Equal dates are listed oldest-added first, so find the run holding the position
+        date = self._keys[count - position][0]
+        low = bisect_left(self._keys, (date,))
+        high = bisect_right(self._keys, (date, float('inf')))
+        return self._keys[low + position - (count - high) - 1][2]
+    
+    def between(self, start_date: datetime, end_date: datetime) -> List[str]:
+        """Ids of dreams dated within ``[start_date, end_date]``, oldest first"""
+        low = bisect_left(self._keys, (start_date.isoformat(),))
+        high = bisect_right(self._keys, (end_date.isoformat(), float('inf')))
+        return [dream_id for _, _, dream_id in self._keys[low:high]]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        # Flat columns parse faster than a list of triples
+        return {
+            'dates': [date for date, _, _ in self._keys],
+            'seqs': [seq for _, seq, _ in self._keys],
+            'ids': [dream_id for _, _, dream_id in self._keys],
+            'next_seq': self._next_seq
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'DateIndex':
+        index = cls()
+        # Written in sorted order, so nothing needs sorting again
+        index._keys = list(zip(data['dates'], data['seqs'], data['ids']))
+        index._next_seq = data['next_seq']
+        return index
+
+
+class StatisticsIndex(JournalIndex):
+    """Running totals behind ``get_statistics``
+    
+    Tag counts, flag counts and the date range are adjusted per dream as it
+    is added or removed, so statistics cost O(distinct tags) to report
+    instead of a pass over the whole journal. Removing the oldest or newest
+    dream marks the date range stale; the owner refreshes it from a
+    ``DateIndex`` before reporting.
+    """
+    
+    name = 'stats'
+    
+    def __init__(self):
+        self.total = 0
+        self.lucid = 0
+        self.nightmares = 0
+        self.earliest: Optional[str] = None
+        self.latest: Optional[str] = None
+        self.bounds_stale = False
+        self.emotion_counts: Counter = Counter()
+        self.theme_counts: Counter = Counter()
+        self.character_counts: Counter = Counter()
+    
+    def add(self, dream: Dream):
+        self.total += 1
+        self.lucid += dream.lucid
+        self.nightmares += dream.nightmare
+        self.emotion_counts.update(dream.emotions)
+        self.theme_counts.update(dream.themes)
+        self.character_counts.update(dream.characters)
+        
+        date_key = dream.date.isoformat()
+        if self.earliest is None or date_key < self.earliest:
+            self.earliest = date_key
+        if self.latest is None or date_key > self.latest:
+            self.latest = date_key
+    
+    def remove(self, dream: Dream):
+        self.total -= 1
+        self.lucid -= dream.lucid
+        self.nightmares -= dream.nightmare
+        for counts, tags in ((self.emotion_counts, dream.emotions),
+                             (self.theme_counts, dream.themes),
+                             (self.character_counts, dream.characters)):
+            counts.subtract(tags)
+            for tag in tags:
+                if counts[tag] <= 0:
+                    del counts[tag]
+        
+        date_key = dream.date.isoformat()
+        if date_key in (self.earliest, self.latest):
+            self.bounds_stale = True
+    
+    def set_bounds(self, bounds: Optional[Tuple[str, str]]):
+        """Replace a stale date range with the true oldest/newest timestamps"""
+        self.earliest, self.latest = bounds if bounds else (None, None)
+        self.bounds_stale = False
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'total': self.total,
+            'lucid': self.lucid,
+            'nightmares': self.nightmares,
+            'earliest': self.earliest,
+            'latest': self.latest,
+            'bounds_stale': self.bounds_stale,
+            'emotion_counts': dict(self.emotion_counts),
+            'theme_counts': dict(self.theme_counts),
+            'character_counts': dict(self.character_counts)
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'StatisticsIndex':
+        index = cls()
+        index.total = data['total']
+        index.lucid = data['lucid']
+        index.nightmares = data['nightmares']
+        index.earliest = data['earliest']
+        index.latest = data['latest']
+        index.bounds_stale = data['bounds_stale']
+        index.emotion_counts = Counter(data['emotion_counts'])
+        index.theme_counts = Counter(data['theme_counts'])
+        index.character_counts = Counter(data['character_counts'])
+        return index
@@ -0,0 +1,325 @@
+"""
+Asynchronous ingestion queue with group commit
+
+Producers hand dreams to an ``IngestionQueue``; one committer task drains
+it and writes whole batches through ``DreamJournal.add_dreams``, so a
+single log append and lock round-trip covers up to ``batch_size`` dreams.
+A batch is committed once it is full or ``flush_ms`` after its first dream
+arrived, and each producer is answered only after its dream is on disk.
+The queue is bounded: when the journal cannot keep up, producers wait, and
+that wait is reported as backpressure.
+
+``main.py ingest`` exposes the queue on a Unix socket. Clients send one
+JSON object per line, ``{"op": "add", "dream": {...}}`` or
+``{"op": "metrics"}``, and get one reply line per request, in order.
+"""
+
+import asyncio
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from dream_models import Dream, DreamJournal
+from serialization import dumpb, loads
+
+
+@dataclass
+class IngestionMetrics:
+    """Counters describing throughput and backpressure of an ingestion queue"""
+    
+    submitted: int = 0
+    committed: int = 0
+    duplicates: int = 0
+    failed: int = 0
+    batches: int = 0
+    largest_batch: int = 0
+    commit_seconds: float = 0.0
+    slowest_commit_seconds: float = 0.0
+    deepest_queue: int = 0
+    # Submissions that found the queue full, and how long they waited for room
+    blocked: int = 0
+    blocked_seconds: float = 0.0
+    
+    def to_dict(self, queue_depth: int = 0) -> Dict[str, Any]:
+        batches = self.batches or 1
+        return {
+            'submitted': self.submitted,
+            'committed': self.committed,
+            'duplicates': self.duplicates,
+            'failed': self.failed,
+            'batches': self.batches,
+            'mean_batch': (self.committed + self.duplicates) / batches,
+            'largest_batch': self.largest_batch,
+            'mean_commit_ms': self.commit_seconds * 1000 / batches,
+            'slowest_commit_ms': self.slowest_commit_seconds * 1000,
+            'queue_depth': queue_depth,
+            'deepest_queue': self.deepest_queue,
+            'blocked': self.blocked,
+            'blocked_ms': self.blocked_seconds * 1000
+        }
+
+
+def describe_metrics(metrics: Dict[str, Any]) -> str:
+    return (
+        f"{metrics['committed']} committed, {metrics['duplicates']} duplicates, {metrics['failed']} failed "
+        f"in {metrics['batches']} batches (mean {metrics['mean_batch']:.1f}, largest {metrics['largest_batch']}); "
+        f"commit {metrics['mean_commit_ms']:.1f} ms mean, {metrics['slowest_commit_ms']:.1f} ms slowest; "
+        f"queue depth {metrics['queue_depth']} (deepest {metrics['deepest_queue']}); "
+        f"producers blocked {metrics['blocked']} times for {metrics['blocked_ms']:.0f} ms"
+    )
+
+
+class IngestionQueue:
+    """Bounded queue of dreams committed to a journal in batches
+    
+    Only the committer touches the journal, on a single worker thread so the
+    event loop keeps accepting dreams while a batch is written. Dreams that
+    arrive during a commit simply make the next batch larger.
+    """
+    
+    def __init__(self, journal: DreamJournal, batch_size: int = 500, flush_ms: float = 50,
+                 queue_size: int = 10000):
+        if batch_size < 1 or queue_size < 1 or flush_ms < 0:
+            raise ValueError("batch_size and queue_size must be positive and flush_ms non-negative")
+        self.journal = journal
+        self.batch_size = batch_size
+        self.flush_seconds = flush_ms / 1000
+        self.metrics = IngestionMetrics()
+        self._queue: Optional[asyncio.Queue] = None
+        self._queue_size = queue_size
+        self._committer: Optional[asyncio.Task] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ingestion')
+    
+    def configure(self, batch_size: int, flush_ms: float):
+        """Change the batching of dreams queued from now on"""
+        self.batch_size = batch_size
+        self.flush_seconds = flush_ms / 1000
+    
+    def start(self):
+        """Start the committer; must be called from the running event loop"""
+        self._queue = asyncio.Queue(maxsize=self._queue_size)
+        self._committer = asyncio.get_running_loop().create_task(self._commit_loop())
+    
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+    
+    async def enqueue(self, dream: Dream) -> asyncio.Future:
+        """Queue a dream, waiting for room, and return a future resolved once it is committed"""
+        future = asyncio.get_running_loop().create_future()
+        self.metrics.submitted += 1
+        if self._queue.full():
+            self.metrics.blocked += 1
+            started = time.perf_counter()
+            await self._queue.put((dream, future))
+            self.metrics.blocked_seconds += time.perf_counter() - started
+        else:
+            self._queue.put_nowait((dream, future))
+        self.metrics.deepest_queue = max(self.metrics.deepest_queue, self._queue.qsize())
+        return future
+    
+    async def submit(self, dream: Dream):
+        """Queue a dream and wait until it is committed"""
+        return await (await self.enqueue(dream))
+    
+    async def _next_batch(self) -> Tuple[List[Tuple[Dream, asyncio.Future]], bool]:
+        """Wait for a dream, then gather more until the batch is full or the flush interval ends"""
+        loop = asyncio.get_running_loop()
+        batch = []
+        item = await self._queue.get()
+        deadline = loop.time() + self.flush_seconds
+        while item is not None:
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                return batch, False
+            if not self._queue.empty():
+                item = self._queue.get_nowait()
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return batch, False
+            try:
+                item = await asyncio.wait_for(self._queue.get(), remaining)
+            except asyncio.TimeoutError:
+                return batch, False
+        # None is queued by close() behind every dream still waiting
+        return batch, True
+    
+    def _commit(self, dreams: List[Dream]) -> Tuple[int, float]:
+        """Write one batch and return how many dreams were new and how long it took"""
+        started = time.perf_counter()
+        added = self.journal.add_dreams(dreams, batch_size=len(dreams))
+        return added, time.perf_counter() - started
+    
+    async def _commit_loop(self):
+        loop = asyncio.get_running_loop()
+        closing = False
+        while not closing:
+            batch, closing = await self._next_batch()
+            if not batch:
+                continue
+            
+            dreams = [dream for dream, _ in batch]
+            try:
+                added, elapsed = await loop.run_in_executor(self._executor, self._commit, dreams)
+            except Exception as e:
+                self.metrics.failed += len(batch)
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            
+            self.metrics.batches += 1
+            self.metrics.largest_batch = max(self.metrics.largest_batch, len(batch))
+            self.metrics.commit_seconds += elapsed
+            self.metrics.slowest_commit_seconds = max(self.metrics.slowest_commit_seconds, elapsed)
+            self.metrics.committed += added
+            self.metrics.duplicates += len(batch) - added
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(None)
+    
+    async def close(self):
+        """Commit every dream already queued, then stop the committer"""
+        if self._committer is None:
+            return
+        await self._queue.put(None)
+        await self._committer
+        self._committer = None
+        self._executor.shutdown()
+
+
+def _acknowledge(reply: asyncio.Future, dream_id: str):
+    """Callback answering an add request once its dream's batch is committed"""
+    def done(committed: asyncio.Future):
+        error = committed.exception()
+        reply.set_result({'ok': False, 'error': str(error)} if error else {'ok': True, 'id': dream_id})
+    return done
+
+
+class IngestionServer:
+    """Accepts dreams from other processes on a Unix socket and feeds them to a queue
+    
+    Each connection is read as fast as the queue has room, so a client can
+    pipeline many dreams without waiting for each reply; replies are written
+    in request order as the dreams are committed. A full queue stops the
+    reader, which in turn stops the client once the socket buffers fill.
+    """
+    
+    def __init__(self, queue: IngestionQueue, socket_path: str):
+        self.queue = queue
+        self.socket_path = socket_path
+        self._server: Optional[asyncio.AbstractServer] = None
+    
+    async def start(self):
+        from dream_io import dream_from_record
+        
+        self._dream_from_record = dream_from_record
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self.queue.start()
+        self._server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        # Anything that connects can write to the journal, so only the owner may
+        os.chmod(self.socket_path, 0o600)
+    
+    async def _request(self, line: bytes) -> asyncio.Future:
+        """Start handling one request line; the returned future holds its reply"""
+        loop = asyncio.get_running_loop()
+        reply = loop.create_future()
+        try:
+            request = loads(line)
+            op = request['op']
+            if op == 'add':
+                dream = self._dream_from_record(request['dream'])
+                committed = await self.queue.enqueue(dream)
+                committed.add_done_callback(_acknowledge(reply, dream.id))
+                return reply
+            if op == 'metrics':
+                reply.set_result({'ok': True, 'metrics': self.queue.metrics.to_dict(self.queue.depth)})
+                return reply
+            raise ValueError(f"unknown op: {op!r}")
+        except (KeyError, TypeError, ValueError) as e:
+            reply.set_result({'ok': False, 'error': f"invalid request: {e}"})
+        return reply
+    
+    async def _write_replies(self, pending: asyncio.Queue, writer: asyncio.StreamWriter):
+        while True:
+            reply = await pending.get()
+            if reply is None:
+                break
+            writer.write(dumpb(await reply) + b'\n')
+            if pending.empty():
+                await writer.drain()
+    
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        pending: asyncio.Queue = asyncio.Queue()
+        replies = asyncio.get_running_loop().create_task(self._write_replies(pending, writer))
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip():
+                    pending.put_nowait(await self._request(line))
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            pending.put_nowait(None)
+            try:
+                await replies
+                await writer.drain()
+            except ConnectionError:
+                pass
+            writer.close()
+    
+    async def close(self):
+        """Stop accepting connections and commit everything already queued"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        await self.queue.close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+def send_dreams(socket_path: str, records: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Send dream records to an ingestion server and return its replies, one per record
+    
+    Records are written from a background thread while replies are read,
+    so neither side ever waits for the other's socket buffer to drain.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(socket_path)
+    
+    def produce():
+        try:
+            with sock.makefile('wb') as out:
+                for record in records:
+                    out.write(dumpb({'op': 'add', 'dream': record}) + b'\n')
+        finally:
+            sock.shutdown(socket.SHUT_WR)
+    
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        with sock.makefile('rb') as replies:
+            result = [loads(line) for line in replies]
+    finally:
+        producer.join()
+        sock.close()
+    return result
+
+
+def request_metrics(socket_path: str) -> Dict[str, Any]:
+    """Current metrics of a running ingestion server"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall(dumpb({'op': 'metrics'}) + b'\n')
+        sock.shutdown(socket.SHUT_WR)
+        with sock.makefile('rb') as replies:
+            return loads(replies.readline())['metrics']
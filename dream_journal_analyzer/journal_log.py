@@ -0,0 +1,119 @@
+"""
+Append-only operation log for the Dream Journal Analyzer
+"""
+
+import os
+from pathlib import Path
+from typing import Dict, Any, Iterator, List
+
+from serialization import dumpb, loads
+
+
+class JournalLog:
+    """Append-only JSON Lines log of journal operations
+    
+    Every add, update and delete is written as one line, so a change costs a
+    single small append no matter how large the journal is. Replaying the log
+    over the last snapshot reproduces the current journal; a torn final line
+    left behind by a crash is discarded during replay.
+    """
+    
+    def __init__(self, log_file: str, fsync: bool = False):
+        self.log_file = log_file
+        self.fsync = fsync
+        self.record_count = 0
+        # Bytes of log this process has read or written; more on disk means another writer appended
+        self.size = 0
+    
+    def append(self, op: str, **payload: Any):
+        """Append a single operation record to the log"""
+        self.append_many(op, [payload])
+    
+    def append_many(self, op: str, payloads: List[Dict[str, Any]]):
+        """Append a batch of operation records with a single write
+        
+        If the write fails part way, the partial record is cut off again and
+        the error is raised, so the next append still starts on a new line.
+        """
+        lines = []
+        for payload in payloads:
+            record = {'op': op}
+            record.update(payload)
+            lines.append(dumpb(record) + b'\n')
+        data = b''.join(lines)
+        
+        # Unbuffered, so nothing is left to be flushed again when a failed write closes the file
+        with open(self.log_file, 'ab', buffering=0) as f:
+            start = f.seek(0, os.SEEK_END)
+            try:
+                view = memoryview(data)
+                while view:
+                    view = view[f.write(view):]
+                if self.fsync:
+                    os.fsync(f.fileno())
+            except BaseException:
+                try:
+                    f.truncate(start)
+                except OSError:
+                    pass
+                raise
+            self.size = start + len(data)
+        
+        self.record_count += len(lines)
+    
+    def replay(self) -> Iterator[Dict[str, Any]]:
+        """Yield logged operations in the order they were written"""
+        path = Path(self.log_file)
+        self.record_count = 0
+        self.size = 0
+        if not path.exists():
+            return
+        
+        with open(path, 'rb') as f:
+            lines = f.readlines()
+        
+        valid_end = 0
+        for number, line in enumerate(lines, 1):
+            is_last = number == len(lines)
+            try:
+                if not line.endswith(b'\n'):
+                    raise ValueError("incomplete record")
+                record = loads(line)
+            except ValueError as e:
+                if is_last:
+                    # A crash mid-append leaves a partial tail; drop it
+                    print(f"Warning: Discarding incomplete record at end of {self.log_file}")
+                    self._truncate(valid_end)
+                    self.size = valid_end
+                    return
+                print(f"Warning: Skipping corrupt record {number} in {self.log_file}: {e}")
+                valid_end += len(line)
+                continue
+            
+            valid_end += len(line)
+            self.record_count += 1
+            yield record
+        self.size = valid_end
+    
+    def clear(self):
+        """Drop all records once they have been folded into a snapshot"""
+        path = Path(self.log_file)
+        if path.exists():
+            path.unlink()
+        self.record_count = 0
+        self.size = 0
+    
+    def disk_size(self) -> int:
+        """Current size of the log file, including records other processes appended"""
+        try:
+            return os.path.getsize(self.log_file)
+        except OSError:
+            return 0
+    
+    def _truncate(self, size: int):
+        """Cut the log back to the last complete record"""
+        try:
+            with open(self.log_file, 'r+b') as f:
+                f.truncate(size)
+        except OSError as e:
+            print(f"Warning: Could not truncate {self.log_file}: {e}")
@@ -0,0 +1,136 @@
+"""
+Long-running journal service on a Unix socket
+
+``main.py serve`` keeps one ``DreamJournalApp`` warm in a daemon. Other
+``main.py`` invocations send their command line over the socket, the
+daemon runs it against the loaded journal and sends back the printed
+output. When no daemon is listening the CLI simply runs in-process.
+"""
+
+import contextlib
+import io
+import os
+import socket
+import socketserver
+from typing import Callable, List, Optional, Tuple
+
+from indexes import file_signature
+from serialization import dumpb, loads
+
+
+# Longest a client waits for a reply; reports on large journals can be slow
+REQUEST_TIMEOUT = 600
+CONNECT_TIMEOUT = 1.0
+
+
+def available() -> bool:
+    """Whether this platform supports the Unix sockets the service uses"""
+    return hasattr(socket, 'AF_UNIX')
+
+
+def _read_message(sock: socket.socket) -> bytes:
+    """Read one newline-terminated message"""
+    chunks = []
+    while True:
+        chunk = sock.recv(65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        if chunk.endswith(b'\n'):
+            break
+    return b''.join(chunks)
+
+
+def send_command(socket_path: str, argv: List[str]) -> Optional[Tuple[str, int]]:
+    """Run a command line in the daemon and return its output and exit status
+    
+    Returns None when no daemon is listening on ``socket_path``, so the
+    caller can fall back to running the command itself.
+    """
+    if not available() or not os.path.exists(socket_path):
+        return None
+    
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(CONNECT_TIMEOUT)
+        try:
+            sock.connect(socket_path)
+        except OSError:
+            # A socket file left behind by a daemon that is gone
+            return None
+        sock.settimeout(REQUEST_TIMEOUT)
+        sock.sendall(dumpb({'argv': argv, 'cwd': os.getcwd()}) + b'\n')
+        reply = loads(_read_message(sock))
+    finally:
+        sock.close()
+    return reply['output'], reply['status']
+
+
+class _CommandHandler(socketserver.StreamRequestHandler):
+    # A client that never finishes its request must not stall the daemon
+    timeout = 10
+    
+    def handle(self):
+        try:
+            request = loads(self.rfile.readline())
+            output, status = self.server.execute(request['argv'], request.get('cwd'))
+        except (KeyError, TypeError, ValueError) as e:
+            output, status = f"❌ Invalid request: {e}\n", 2
+        self.wfile.write(dumpb({'output': output, 'status': status}) + b'\n')
+
+
+class JournalServer(socketserver.UnixStreamServer):
+    """Serves CLI commands one at a time against a warm journal
+    
+    ``run`` executes a parsed command line in-process and returns its exit
+    status. Requests are handled serially, so commands never interleave and
+    the journal needs no locking. Before each command the files in
+    ``watched_files`` are checked and ``reload`` is called if another
+    process changed them.
+    """
+    
+    def __init__(self, socket_path: str, run: Callable[[List[str]], int],
+                 watched_files: Callable[[], List[str]], reload: Callable[[], None]):
+        self.socket_path = socket_path
+        self._run = run
+        self._watched_files = watched_files
+        self._reload = reload
+        if os.path.exists(socket_path):
+            # Only reached when no daemon answered, so the file is stale
+            os.unlink(socket_path)
+        super().__init__(socket_path, _CommandHandler)
+        # Commands can write files, so only the owner may connect
+        os.chmod(socket_path, 0o600)
+        self._signatures = self._file_signatures()
+    
+    def _file_signatures(self) -> List[Optional[Tuple[int, int]]]:
+        return [file_signature(path) for path in self._watched_files()]
+    
+    def execute(self, argv: List[str], cwd: Optional[str] = None) -> Tuple[str, int]:
+        """Run one command line, capturing everything it prints"""
+        if self._file_signatures() != self._signatures:
+            self._reload()
+        
+        output = io.StringIO()
+        previous_cwd = os.getcwd()
+        status = 0
+        try:
+            if cwd:
+                # Relative paths in the command are the client's, not the daemon's
+                os.chdir(cwd)
+            with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+                status = self._run(argv) or 0
+        except SystemExit as e:
+            status = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except Exception as e:
+            output.write(f"❌ Error: {e}\n")
+            status = 1
+        finally:
+            os.chdir(previous_cwd)
+            self._signatures = self._file_signatures()
+        return output.getvalue(), status
+    
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
@@ -0,0 +1,78 @@
+"""
+Incremental JSON parsing helpers
+"""
+
+import json
+from typing import Any, Iterator, TextIO
+
+
+_WHITESPACE = ' \t\r\n'
+
+
+def iter_json_array(f: TextIO, chunk_size: int = 1 << 16) -> Iterator[Any]:
+    """Yield the elements of a top-level JSON array one at a time
+    
+    The file is read in chunks and each element is decoded as soon as it is
+    complete, so memory use is bounded by the largest element rather than
+    the size of the file.
+    """
+    decoder = json.JSONDecoder()
+    buffer = f.read(chunk_size)
+    pos = 0
+    eof = not buffer
+    
+    def refill() -> bool:
+        nonlocal buffer, pos, eof
+        if eof:
+            return False
+        chunk = f.read(chunk_size)
+        if not chunk:
+            eof = True
+            return False
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        return True
+    
+    def skip_whitespace() -> str:
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buffer):
+                return buffer[pos]
+            if not refill():
+                return ''
+    
+    if skip_whitespace() != '[':
+        raise ValueError("Expected a JSON array")
+    pos += 1
+    
+    expect_separator = False
+    while True:
+        char = skip_whitespace()
+        if char == ']':
+            return
+        if not char:
+            raise ValueError("Unexpected end of JSON array")
+        
+        if expect_separator:
+            if char != ',':
+                raise ValueError(f"Expected ',' or ']' at offset {pos}")
+            pos += 1
+            skip_whitespace()
+        
+        while True:
+            try:
+                element, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # The element straddles the chunk boundary; read on and retry
+                if refill():
+                    continue
+                raise
+            if end == len(buffer) and refill():
+                continue
+            break
+        
+        pos = end
+        expect_separator = True
+        yield element
@@ -8,22 +8,62 @@ Description: Log dreams, analyze patterns, and gain insights into your subconsci
 import argparse
 import json
 import sys
+import time
 from datetime import datetime
 from typing import Dict, List, Optional
 import os
 
 from dream_models import Dream, DreamJournal
-from analyzer import DreamAnalyzer
-from visualizer import DreamVisualizer
 from config import Config
 
+# analyzer and visualizer (matplotlib, numpy) are imported on first use, so
+# commands such as add, list and view start without paying for them
+
+
+def _absolute(path: Optional[str]) -> Optional[str]:
+    # The journal service changes into each client's directory while it runs a command
+    return os.path.abspath(path) if path else path
+
 
 class DreamJournalApp:
-    def __init__(self):
-        self.config = Config()
-        self.journal = DreamJournal(self.config.data_file)
-        self.analyzer = DreamAnalyzer(self.journal)
-        self.visualizer = DreamVisualizer(self.journal)
+    def __init__(self, config: Config = None, fsync: bool = False):
+        self.config = config or Config()
+        storage = self.journal_settings = self.config.storage_settings
+        self.journal = DreamJournal(
+            _absolute(self.config.data_file),
+            backend=storage.backend,
+            sqlite_file=_absolute(storage.sqlite_file),
+            binary_file=_absolute(storage.binary_file),
+            compact_threshold=storage.compact_threshold,
+            fsync=storage.fsync or fsync,
+            record_store=storage.record_store
+        )
+        self._analyzer = None
+        self._visualizer = None
+        self.config.add_listener(self._settings_changed)
+    
+    def _settings_changed(self, snapshot):
+        """Rebuild the analyzer and visualizer with a reloaded configuration"""
+        self._analyzer = None
+        self._visualizer = None
+        if snapshot.storage != self.journal_settings:
+            print("⚠️  Storage settings changed; they take effect when the journal is next opened.")
+    
+    @property
+    def analyzer(self):
+        """Pattern analyzer, imported on first use"""
+        if self._analyzer is None:
+            from analyzer import DreamAnalyzer
+            self._analyzer = DreamAnalyzer(self.journal, self.config.analysis_settings)
+        return self._analyzer
+    
+    @property
+    def visualizer(self):
+        """Chart generator, imported on first use"""
+        if self._visualizer is None:
+            from visualizer import DreamVisualizer
+            self._visualizer = DreamVisualizer(self.journal, self.config.visualization_settings)
+        return self._visualizer
     
     def add_dream(self, title: str, content: str, emotions: List[str], 
                   characters: List[str], themes: List[str], 
@@ -89,6 +129,28 @@ class DreamJournalApp:
         if dream.nightmare:
             print("😰 This was a nightmare!")
     
+    def show_similar(self, dream_id: int, limit: int = 5):
+        """Show the dreams whose content is closest to one dream"""
+        dream = self.journal.get_dream_by_id(dream_id)
+        if not dream:
+            print(f"❌ Dream with ID {dream_id} not found.")
+            return
+        
+        keywords = [word for word, weight in self.journal.get_dream_keywords(dream, 5)]
+        print(f"\n🔗 Dreams similar to '{dream.title}'")
+        if keywords:
+            print(f"Keywords: {', '.join(keywords)}")
+        print("=" * 50)
+        
+        matches = self.journal.get_similar_content(dream, limit)
+        if not matches:
+            print("No similar dreams found.")
+            return
+        
+        for match, score in matches:
+            print(f"{score:.2f}  {match.title}")
+            print(f"      Date: {match.date.strftime('%Y-%m-%d %H:%M')}  ID: {match.id}")
+    
     def analyze_patterns(self):
         """Analyze dream patterns and show insights"""
         print("\n🔍 Analyzing your dream patterns...")
@@ -132,21 +194,232 @@ class DreamJournalApp:
         print("=" * 50)
         print(report[:500] + "...")
     
-    def export_data(self, format: str = 'json'):
-        """Export dream data"""
-        if format == 'json':
-            filename = f"dreams_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-            self.journal.export_to_json(filename)
-            print(f"✅ Dreams exported to: {filename}")
-        elif format == 'csv':
-            filename = f"dreams_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-            self.journal.export_to_csv(filename)
-            print(f"✅ Dreams exported to: {filename}")
-        else:
-            print("❌ Unsupported export format. Use 'json' or 'csv'.")
+    def generate_charts(self, output_dir: str = None, workers: int = None):
+        """Render every chart into the chart directory"""
+        output_dir = output_dir or self.config.visualization_settings.chart_directory
+        print(f"\n📈 Generating charts in {output_dir}...")
+        
+        start = time.perf_counter()
+        for result in self.visualizer.generate_all_charts(output_dir, workers=workers):
+            print(f"   {result}")
+        print(f"✅ Charts generated in {time.perf_counter() - start:.2f}s")
+    
+    def import_dreams(self, filename: str, format: str = None, batch_size: int = 10000):
+        """Bulk-import dreams from a JSON, JSON Lines, CSV or columnar file"""
+        from dream_io import iter_records, dream_from_record
+        
+        invalid = 0
+        total = 0
+        
+        def valid_dreams():
+            nonlocal invalid, total
+            for line_number, record in iter_records(filename, format):
+                total += 1
+                try:
+                    yield dream_from_record(record)
+                except ValueError as e:
+                    invalid += 1
+                    print(f"⚠️  Skipping line {line_number}: {e}")
+        
+        try:
+            added = self.journal.add_dreams(valid_dreams(), batch_size=batch_size)
+        except (OSError, ValueError) as e:
+            print(f"❌ Import failed: {e}")
+            return
+        
+        duplicates = total - invalid - added
+        print(f"✅ Imported {added} dreams from {filename} ({duplicates} duplicates, {invalid} invalid skipped)")
+    
+    def export_data(self, format: str = 'json', compression: str = None, output: str = None,
+                    start_date: datetime = None, end_date: datetime = None, **filters):
+        """Export dream data, streaming only the dreams that match the filters"""
+        from dream_io import EXPORT_FORMATS, export_dreams, select_dreams
+        
+        if format not in EXPORT_FORMATS:
+            print(f"❌ Unsupported export format. Use one of: {', '.join(EXPORT_FORMATS)}.")
+            return
+        
+        if output is None:
+            extension = {'columnar': 'djcol'}.get(format, format)
+            output = f"dreams_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+            output += {'gzip': '.gz', 'zstd': '.zst'}.get(compression, '')
+        
+        dreams = select_dreams(self.journal, start_date=start_date, end_date=end_date, **filters)
+        try:
+            export_dreams(dreams, output, format, compression)
+        except (OSError, ValueError) as e:
+            print(f"❌ Export failed: {e}")
+            return
+        print(f"✅ Dreams exported to: {output}")
+    
+    def create_backup(self):
+        """Back up the journal files, copying only the chunks that changed"""
+        storage = self.journal.storage
+        if not self.config.backup_enabled:
+            print("❌ Backups are disabled (backup_enabled in config.json).")
+            return
+        with storage.reading():
+            self.config.create_backup(storage.files(), append_only=storage.append_only_files())
+    
+    def list_backups(self):
+        """List the stored backups, oldest first"""
+        from backup_store import BackupStore
+        
+        backups = BackupStore(self.config.backup_directory).backups
+        if not backups:
+            print("📭 No backups yet.")
+            return
+        print(f"\n🗄️  Backups in {self.config.backup_directory}:")
+        for backup in backups:
+            size = sum(entry['signature'][0] for entry in backup['files'].values())
+            print(f"  {backup['name']}  {backup['created'][:19]}  {size:,} bytes in {len(backup['files'])} files")
+    
+    def restore_backup(self, name: str, output: str = None):
+        """Reassemble a backup's files into a directory"""
+        from backup_store import BackupStore
+        
+        output = output or f"restored_{name}"
+        try:
+            restored = BackupStore(self.config.backup_directory).restore(name, output)
+        except (OSError, ValueError) as e:
+            print(f"❌ Restore failed: {e}")
+            return
+        print(f"✅ Restored {len(restored)} files to {output}")
+    
+    def reload(self):
+        """Re-read the journal after another process changed it"""
+        self.journal.load_dreams()
 
 
-def main():
+def service_socket(config: Config) -> str:
+    """Unix socket of the journal service for the configured data file"""
+    return config.service_settings.socket or f"{os.path.abspath(config.data_file)}.sock"
+
+
+def ingestion_socket(config: Config) -> str:
+    """Unix socket of the ingestion service for the configured data file"""
+    return config.ingestion_settings.socket or f"{os.path.abspath(config.data_file)}.ingest.sock"
+
+
+def ingest(app: DreamJournalApp, socket_path: str):
+    """Run the ingestion service until interrupted, then commit what is queued"""
+    import asyncio
+    import signal
+    from ingestion import IngestionQueue, IngestionServer, describe_metrics
+    from journal_service import available
+    
+    if not available():
+        print("❌ The ingestion service needs Unix domain sockets, which this platform does not support.")
+        return
+    
+    settings = app.config.ingestion_settings
+    queue = IngestionQueue(
+        app.journal,
+        batch_size=settings.batch_size,
+        flush_ms=settings.flush_ms,
+        queue_size=settings.queue_size
+    )
+    server = IngestionServer(queue, socket_path)
+    
+    async def run():
+        stopped = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        # Stop as cleanly on `kill` as on Ctrl+C
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stopped.set)
+        
+        def settings_changed(snapshot):
+            # Runs on the watcher thread; the queue is only changed from the event loop
+            loop.call_soon_threadsafe(queue.configure, snapshot.ingestion.batch_size, snapshot.ingestion.flush_ms)
+        
+        app.config.add_listener(settings_changed)
+        app.config.start_watching()
+        await server.start()
+        print(f"🌙 Dream ingestion service listening on {socket_path} (Ctrl+C to stop)")
+        try:
+            await stopped.wait()
+        finally:
+            app.config.stop_watching()
+            await server.close()
+    
+    asyncio.run(run())
+    print(f"\n📥 Ingestion stopped: {describe_metrics(queue.metrics.to_dict())}")
+
+
+def ingest_client(socket_path: str, send: str = None):
+    """Send a file to a running ingestion service, or show its metrics"""
+    from ingestion import describe_metrics, request_metrics, send_dreams
+    
+    if not os.path.exists(socket_path):
+        print(f"❌ No ingestion service is listening on {socket_path}")
+        return
+    
+    if send:
+        from dream_io import iter_records
+        
+        if not os.path.exists(send):
+            print(f"❌ File not found: {send}")
+            return
+        try:
+            # Lines that are not valid JSON are sent as null and rejected by the service
+            records = (None if isinstance(record, Exception) else record for _, record in iter_records(send))
+            replies = send_dreams(socket_path, records)
+        except (OSError, ValueError) as e:
+            print(f"❌ Sending failed: {e}")
+            return
+        errors = [reply['error'] for reply in replies if not reply.get('ok')]
+        for error in errors[:10]:
+            print(f"⚠️  {error}")
+        print(f"✅ Sent {len(replies)} dreams to {socket_path} ({len(errors)} rejected)")
+        return
+    
+    print(f"📥 {describe_metrics(request_metrics(socket_path))}")
+
+
+def serve(app: DreamJournalApp, socket_path: str):
+    """Run the journal service until interrupted"""
+    import signal
+    from journal_service import JournalServer, available
+    
+    if not available():
+        print("❌ The journal service needs Unix domain sockets, which this platform does not support.")
+        return
+    
+    def run(argv: List[str]) -> int:
+        # Settings edited while the service runs apply from the next command
+        app.config.reload_if_changed()
+        return run_command(app, build_parser().parse_args(argv))
+    
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+    
+    server = JournalServer(socket_path, run, app.journal.storage.files, app.reload)
+    # Stop as cleanly on `kill` as on Ctrl+C
+    signal.signal(signal.SIGTERM, stop)
+    print(f"🌙 Dream journal service listening on {socket_path} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        app.journal.save_dreams()
+        print("\n👋 Journal service stopped.")
+
+
+def parse_date_argument(value: str, end_of_day: bool = False) -> datetime:
+    """Parse a YYYY-MM-DD[THH:MM[:SS]] command-line date"""
+    try:
+        date = datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date: {value!r} (expected YYYY-MM-DD)")
+    if end_of_day and len(value) == 10:
+        # A bare end date includes the whole day
+        date = date.replace(hour=23, minute=59, second=59, microsecond=999999)
+    return date
+
+
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description='Dream Journal Analyzer')
     subparsers = parser.add_subparsers(dest='command', help='Available commands')
     
@@ -169,27 +442,71 @@ def main():
     view_parser = subparsers.add_parser('view', help='View a specific dream')
     view_parser.add_argument('id', type=int, help='Dream ID to view')
     
+    # Similar dreams command
+    similar_parser = subparsers.add_parser('similar', help='Find dreams with similar content')
+    similar_parser.add_argument('id', type=int, help='Dream ID to compare against')
+    similar_parser.add_argument('--limit', type=int, default=5, help='Number of dreams to show')
+    
     # Analyze command
     subparsers.add_parser('analyze', help='Analyze dream patterns')
     
     # Report command
     subparsers.add_parser('report', help='Generate comprehensive report')
     
+    # Charts command
+    charts_parser = subparsers.add_parser('charts', help='Generate all charts')
+    charts_parser.add_argument('--output', help='Output directory (default: visualization.chart_directory)')
+    charts_parser.add_argument('--workers', type=int, help='Rendering processes (default: all cores)')
+    
     # Export command
     export_parser = subparsers.add_parser('export', help='Export dream data')
-    export_parser.add_argument('--format', choices=['json', 'csv'], default='json', help='Export format')
+    export_parser.add_argument('--format', choices=['json', 'jsonl', 'csv', 'columnar'], default='json', help='Export format')
+    export_parser.add_argument('--compress', choices=['gzip', 'zstd'], help='Compress the export')
+    export_parser.add_argument('--output', help='Output file (default: timestamped name)')
+    export_parser.add_argument('--start', type=parse_date_argument, help='Only dreams on or after this date')
+    export_parser.add_argument('--end', type=lambda value: parse_date_argument(value, end_of_day=True),
+                               help='Only dreams on or before this date')
+    export_parser.add_argument('--emotion', help='Only dreams with this emotion')
+    export_parser.add_argument('--theme', help='Only dreams with this theme')
+    export_parser.add_argument('--search', help='Only dreams matching this search query')
+    export_parser.add_argument('--lucid', action='store_true', default=None, help='Only lucid dreams')
+    export_parser.add_argument('--nightmare', action='store_true', default=None, help='Only nightmares')
+    
+    # Import command
+    import_parser = subparsers.add_parser('import', help='Bulk-import dreams from JSON, JSON Lines, CSV or columnar files')
+    import_parser.add_argument('file', help='File to import')
+    import_parser.add_argument('--format', choices=['json', 'jsonl', 'csv', 'columnar'],
+                               help='Input format (guessed from the extension by default)')
+    import_parser.add_argument('--batch-size', type=int, default=10000, help='Dreams committed per write')
+    
+    # Backup command
+    backup_parser = subparsers.add_parser('backup', help='Back up the journal, storing only what changed')
+    backup_parser.add_argument('--list', action='store_true', help='List existing backups')
+    backup_parser.add_argument('--restore', metavar='NAME', help='Restore a backup into a directory')
+    backup_parser.add_argument('--output', help='Directory to restore into (default: restored_<NAME>)')
     
     # Interactive mode
     subparsers.add_parser('interactive', help='Start interactive mode')
     
-    args = parser.parse_args()
+    # Service mode
+    serve_parser = subparsers.add_parser('serve', help='Keep the journal loaded and answer other commands from a daemon')
+    serve_parser.add_argument('--socket', help='Unix socket path (default: next to the data file)')
     
-    if not args.command:
-        parser.print_help()
-        return
-    
-    app = DreamJournalApp()
+    # Ingestion service
+    ingest_parser = subparsers.add_parser('ingest', help='Accept dreams from concurrent producers and commit them in batches')
+    ingest_parser.add_argument('--socket', help='Unix socket path (default: next to the data file)')
+    ingest_parser.add_argument('--send', metavar='FILE', help='Send a JSON, JSON Lines or CSV file to a running ingestion service')
+    ingest_parser.add_argument('--metrics', action='store_true', help='Show the metrics of a running ingestion service')
     
+    return parser
+
+
+# Commands that need the caller's terminal, so are never sent to the service
+LOCAL_COMMANDS = ('interactive', 'serve', 'ingest')
+
+
+def run_command(app: DreamJournalApp, args: argparse.Namespace) -> int:
+    """Run a parsed command against the app and return its exit status"""
     try:
         if args.command == 'add':
             app.add_dream(
@@ -208,24 +525,96 @@ def main():
         elif args.command == 'view':
             app.view_dream(args.id)
         
+        elif args.command == 'similar':
+            app.show_similar(args.id, limit=args.limit)
+        
         elif args.command == 'analyze':
             app.analyze_patterns()
         
         elif args.command == 'report':
             app.generate_report()
         
+        elif args.command == 'charts':
+            app.generate_charts(args.output, workers=args.workers)
+        
         elif args.command == 'export':
-            app.export_data(format=args.format)
+            app.export_data(
+                format=args.format,
+                compression=args.compress,
+                output=args.output,
+                start_date=args.start,
+                end_date=args.end,
+                emotion=args.emotion,
+                theme=args.theme,
+                search=args.search,
+                lucid=args.lucid,
+                nightmare=args.nightmare
+            )
+        
+        elif args.command == 'import':
+            app.import_dreams(args.file, format=args.format, batch_size=args.batch_size)
+        
+        elif args.command == 'backup':
+            if args.list:
+                app.list_backups()
+            elif args.restore:
+                app.restore_backup(args.restore, output=args.output)
+            else:
+                app.create_backup()
         
         elif args.command == 'interactive':
             interactive_mode(app)
     
     except KeyboardInterrupt:
         print("\n\n👋 Goodbye! Sweet dreams!")
-        sys.exit(0)
     except Exception as e:
         print(f"❌ Error: {e}")
-        sys.exit(1)
+        return 1
+    return 0
+
+
+def main():
+    parser = build_parser()
+    argv = sys.argv[1:]
+    args = parser.parse_args(argv)
+    
+    if not args.command:
+        parser.print_help()
+        return
+    
+    config = Config()
+    socket_path = getattr(args, 'socket', None) or service_socket(config)
+    
+    if args.command not in LOCAL_COMMANDS and os.path.exists(socket_path):
+        # Use the warm journal of a running service when there is one
+        from journal_service import send_command
+        
+        reply = send_command(socket_path, argv)
+        if reply is not None:
+            output, status = reply
+            sys.stdout.write(output)
+            sys.exit(status)
+    
+    if args.command == 'ingest' and (args.send or args.metrics):
+        # Producers talk to the running service and never load the journal themselves
+        ingest_client(args.socket or ingestion_socket(config), send=args.send)
+        return
+    
+    # The ingestion service acknowledges a dream once it is written, so the write must survive a power loss;
+    # with group commit that costs one fsync per batch
+    app = DreamJournalApp(config, fsync=args.command == 'ingest' and config.ingestion_settings.fsync)
+    
+    if args.command == 'ingest':
+        ingest(app, args.socket or ingestion_socket(config))
+        return
+    
+    if args.command == 'serve':
+        serve(app, socket_path)
+        return
+    
+    status = run_command(app, args)
+    if status:
+        sys.exit(status)
 
 
 def interactive_mode(app):
@@ -0,0 +1,129 @@
+"""
+Inverted full-text index for dream search
+"""
+
+import re
+from bisect import bisect_left, insort
+from itertools import chain
+from typing import Dict, List, Set, Tuple, Any
+
+from dream_models import Dream
+from indexes import JournalIndex
+
+
+_TOKEN_PATTERN = re.compile(r'\w+')
+
+# Words too common to say anything about a dream's content
+STOP_WORDS = frozenset({
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by',
+    'is', 'was', 'were', 'are', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did',
+    'i', 'me', 'my', 'mine', 'you', 'your', 'yours', 'he', 'him', 'his', 'she', 'her', 'hers',
+    'it', 'its', 'we', 'us', 'our', 'ours', 'they', 'them', 'their', 'theirs'
+})
+
+OR_OPERATORS = {'OR', '|'}
+AND_OPERATORS = {'AND', '&'}
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase word tokens"""
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def dream_tokens(dream: Dream) -> Set[str]:
+    """All distinct tokens in a dream's title, content and tags"""
+    tokens = set(tokenize(dream.title))
+    tokens.update(tokenize(dream.content))
+    for tag in chain(dream.emotions, dream.characters, dream.themes):
+        tokens.update(tokenize(tag))
+    return tokens
+
+
+def parse_query(query: str) -> List[List[Tuple[str, bool]]]:
+    """Parse a search query into OR-ed groups of AND-ed terms
+    
+    Words are AND-ed together unless separated by ``OR``; a trailing ``*``
+    turns a word into a prefix match. Each term is a ``(token, is_prefix)``
+    pair, e.g. ``"fly* OR falling water"`` gives
+    ``[[('fly', True)], [('falling', False), ('water', False)]]``.
+    """
+    groups = [[]]
+    for word in query.split():
+        if word.upper() in OR_OPERATORS:
+            groups.append([])
+            continue
+        if word.upper() in AND_OPERATORS:
+            continue
+        
+        tokens = tokenize(word)
+        if not tokens:
+            continue
+        groups[-1].extend((token, False) for token in tokens[:-1])
+        groups[-1].append((tokens[-1], word.endswith('*')))
+    
+    return [group for group in groups if group]
+
+
+class SearchIndex(JournalIndex):
+    """Maps each token to the ids of the dreams containing it"""
+    
+    name = 'search'
+    
+    def __init__(self):
+        self.postings: Dict[str, Set[str]] = {}
+        # Sorted token list so prefix queries can bisect instead of scanning
+        self._vocabulary: List[str] = []
+    
+    def add(self, dream: Dream):
+        for token in dream_tokens(dream):
+            posting = self.postings.get(token)
+            if posting is None:
+                posting = self.postings[token] = set()
+                insort(self._vocabulary, token)
+            posting.add(dream.id)
+    
+    def remove(self, dream: Dream):
+        for token in dream_tokens(dream):
+            posting = self.postings.get(token)
+            if posting is None:
+                continue
+            posting.discard(dream.id)
+            if not posting:
+                del self.postings[token]
+                del self._vocabulary[bisect_left(self._vocabulary, token)]
+    
+    def _lookup(self, token: str, prefix: bool) -> Set[str]:
+        """Ids of dreams containing a token, or any token starting with it"""
+        if not prefix:
+            return self.postings.get(token, set())
+        
+        matches = set()
+        position = bisect_left(self._vocabulary, token)
+        while position < len(self._vocabulary) and self._vocabulary[position].startswith(token):
+            matches |= self.postings[self._vocabulary[position]]
+            position += 1
+        return matches
+    
+    def search(self, query: str) -> Set[str]:
+        """Ids of dreams matching a query (see ``parse_query`` for the syntax)"""
+        results = set()
+        for group in parse_query(query):
+            postings = sorted((self._lookup(token, prefix) for token, prefix in group), key=len)
+            # Intersect starting from the rarest term to keep the work small
+            group_ids = set(postings[0])
+            for posting in postings[1:]:
+                if not group_ids:
+                    break
+                group_ids &= posting
+            results |= group_ids
+        return results
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {'postings': {token: sorted(ids) for token, ids in self.postings.items()}}
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'SearchIndex':
+        index = cls()
+        index.postings = {token: set(ids) for token, ids in data['postings'].items()}
+        index._vocabulary = sorted(index.postings)
+        return index
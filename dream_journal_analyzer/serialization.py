@@ -0,0 +1,86 @@
+"""
+JSON encoding helpers with an optional native accelerator
+
+orjson or msgspec is used when installed; otherwise everything falls back
+to the standard library ``json`` module with identical output.
+"""
+
+import json
+from typing import Any, Iterator, Optional, Union
+
+from json_stream import iter_json_array
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+def _default_accelerator() -> Optional[str]:
+    if orjson is not None:
+        return 'orjson'
+    if msgspec is not None:
+        return 'msgspec'
+    return None
+
+
+# Name of the library in use, or None for the standard library; may be reassigned
+ACCELERATOR = _default_accelerator()
+
+# Snapshots up to this size are parsed in one call by the accelerator
+WHOLE_FILE_LIMIT = 256 * 1024 * 1024
+
+
+def dumps(value: Any, indent: bool = False) -> str:
+    """Encode a value as JSON text, keeping non-ASCII characters as-is"""
+    return dumpb(value, indent).decode('utf-8')
+
+
+def dumpb(value: Any, indent: bool = False) -> bytes:
+    """Encode a value as UTF-8 JSON bytes, two-space indented if requested"""
+    if ACCELERATOR == 'orjson':
+        return orjson.dumps(value, option=orjson.OPT_INDENT_2 if indent else 0)
+    if ACCELERATOR == 'msgspec':
+        data = msgspec.json.encode(value)
+        return msgspec.json.format(data, indent=2) if indent else data
+    if indent:
+        return json.dumps(value, indent=2, ensure_ascii=False).encode('utf-8')
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """Decode JSON text or bytes"""
+    if ACCELERATOR == 'orjson':
+        return orjson.loads(data)
+    if ACCELERATOR == 'msgspec':
+        try:
+            return msgspec.json.decode(data)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e
+    return json.loads(data)
+
+
+def iter_array_file(path: str) -> Iterator[Any]:
+    """Yield the elements of a JSON array file
+    
+    With an accelerator, files up to ``WHOLE_FILE_LIMIT`` are parsed in one
+    native call; larger files, or any file without one, are parsed
+    incrementally so memory stays bounded by the largest element.
+    """
+    if ACCELERATOR is not None:
+        with open(path, 'rb') as f:
+            data = f.read(WHOLE_FILE_LIMIT + 1)
+            if len(data) <= WHOLE_FILE_LIMIT:
+                values = loads(data)
+                if not isinstance(values, list):
+                    raise ValueError("Expected a JSON array")
+                yield from values
+                return
+    
+    with open(path, 'r', encoding='utf-8') as f:
+        yield from iter_json_array(f)
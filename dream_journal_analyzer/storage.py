@@ -0,0 +1,1098 @@
+"""
+Storage backends for the Dream Journal Analyzer
+"""
+
+import sqlite3
+from collections import Counter
+from contextlib import nullcontext
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Optional, Any, ContextManager, Iterable, Iterator, Tuple, Type
+
+from dream_models import Dream
+from dream_records import LUCID, NIGHTMARE, DreamRecords
+from emotion_trends import EMOTION_BUCKETS, EmotionBuckets, WeeklyEmotions, MonthlyEmotions
+from columnar import ColumnarRecords
+from content_index import ContentIndex
+from indexes import JournalIndex, DateIndex, StatisticsIndex, checkpoint_path, file_signature, load_checkpoint, save_checkpoint
+from atomic_file import atomic_write, replace_file, temp_path
+from file_lock import FileLock
+from journal_log import JournalLog
+from serialization import dumpb, iter_array_file
+from search_index import SearchIndex, parse_query, dream_tokens
+from tag_index import MAX_CANDIDATES, TagIndex, dream_tags, rank_similar, split_token
+
+
+TAG_KINDS = ('emotions', 'characters', 'themes')
+
+
+class StorageBackend:
+    """Interface shared by all dream storage backends
+    
+    A backend owns persistence and answers the journal's queries. Positions
+    passed to ``get_dream_at`` are 1-indexed in newest-first order, matching
+    the numbering shown by ``main.py list``.
+    """
+    
+    @property
+    def dreams(self) -> List[Dream]:
+        """All dreams in insertion order"""
+        raise NotImplementedError
+    
+    def load(self):
+        """(Re)load dreams from persistent storage"""
+        raise NotImplementedError
+    
+    def save(self):
+        """Flush all pending changes to persistent storage"""
+        raise NotImplementedError
+    
+    def add(self, dream: Dream):
+        raise NotImplementedError
+    
+    def add_batch(self, dreams: List[Dream]) -> int:
+        """Add dreams whose ids are not stored yet in one write; return how many were added"""
+        raise NotImplementedError
+    
+    def update(self, dream: Dream, changes: Dict[str, Any]):
+        raise NotImplementedError
+    
+    def delete(self, dream: Dream):
+        raise NotImplementedError
+    
+    def get_dreams(self, limit: int = None, search: str = None) -> List[Dream]:
+        raise NotImplementedError
+    
+    def get_dream_at(self, position: int) -> Optional[Dream]:
+        raise NotImplementedError
+    
+    def get_dreams_by_date_range(self, start_date: datetime, end_date: datetime) -> List[Dream]:
+        raise NotImplementedError
+    
+    def iter_dreams(self) -> Iterator[Dream]:
+        """Stream every dream in insertion order"""
+        raise NotImplementedError
+    
+    def iter_dreams_by_date(self, start_date: datetime = None, end_date: datetime = None) -> Iterator[Dream]:
+        """Stream dreams oldest first, optionally only those within ``[start_date, end_date]``"""
+        raise NotImplementedError
+    
+    def get_dreams_by_emotion(self, emotion: str) -> List[Dream]:
+        raise NotImplementedError
+    
+    def get_dreams_by_theme(self, theme: str) -> List[Dream]:
+        raise NotImplementedError
+    
+    def get_lucid_dreams(self) -> List[Dream]:
+        raise NotImplementedError
+    
+    def get_nightmares(self) -> List[Dream]:
+        raise NotImplementedError
+    
+    def get_statistics(self) -> Dict[str, Any]:
+        raise NotImplementedError
+    
+    def get_date_array(self):
+        """Wall-clock dates of every dream as a numpy ``datetime64[us]`` array, in no particular order"""
+        raise NotImplementedError
+    
+    def get_emotion_buckets(self, bucket: str) -> EmotionBuckets:
+        """Dreams and emotions counted per ``'week'`` or ``'month'``"""
+        raise NotImplementedError
+    
+    def get_cooccurring_tags(self, kind: str, tag: str, limit: int = 10) -> List[Tuple[str, str, int]]:
+        """``(kind, tag, dreams)`` for the tags most often recorded together with a tag"""
+        raise NotImplementedError
+    
+    def get_similar_dreams(self, dream: Dream, limit: int = 5) -> List[Tuple[Dream, float]]:
+        """Dreams whose emotions, characters and themes best match a dream's, with their Jaccard similarity"""
+        raise NotImplementedError
+    
+    def get_content_index(self) -> ContentIndex:
+        """TF-IDF index over the title and content of every dream"""
+        raise NotImplementedError
+    
+    def get_dreams_by_ids(self, dream_ids: List[str]) -> List[Dream]:
+        """Dreams with the given ids, in the same order; unknown ids are skipped"""
+        raise NotImplementedError
+    
+    def files(self) -> List[str]:
+        """Files holding the persistent state, watched for changes made by other processes"""
+        return []
+    
+    def append_only_files(self) -> List[str]:
+        """Those of ``files`` that only ever grow until they are cleared"""
+        return []
+    
+    def reading(self) -> ContextManager[None]:
+        """Hold off other processes' writes, so ``files`` can be copied as one consistent version"""
+        return nullcontext()
+    
+    def close(self):
+        """Release any resources held by the backend"""
+        pass
+
+
+class JsonStorage(StorageBackend):
+    """Keeps dreams in memory, persisted as a JSON snapshot plus an operation log
+    
+    Derived indexes are materialized on first use and checkpointed next to
+    the snapshot when first built and whenever it is compacted. Changes made since the snapshot
+    are remembered by their snapshot-time record, along with the place each
+    changed dream holds in insertion order, so a checkpoint can be brought
+    up to date without a full rebuild.
+    
+    Several processes can share one journal: every write holds a lock on
+    ``<data_file>.lock``, and a writer that finds the snapshot or log
+    changed by someone else reloads after logging its own change, so no
+    process compacts away records it has not seen.
+    """
+    
+    index_types = (DateIndex, SearchIndex, StatisticsIndex, WeeklyEmotions, MonthlyEmotions, TagIndex, ContentIndex)
+    
+    record_stores = {'dict': DreamRecords, 'columnar': ColumnarRecords}
+    
+    def __init__(self, data_file: str, compact_threshold: int = 1000, fsync: bool = False,
+                 record_store: str = 'dict'):
+        if record_store not in self.record_stores:
+            raise ValueError(f"Unknown record store: {record_store}")
+        
+        self.data_file = data_file
+        self.compact_threshold = compact_threshold
+        self.fsync = fsync
+        self.log = JournalLog(f'{data_file}.log', fsync=fsync)
+        self.lock = FileLock(f'{data_file}.lock')
+        self._records_type = self.record_stores[record_store]
+        self._records = self._records_type()
+        self._dreams: Optional[List[Dream]] = None
+        self._indexes: Dict[str, JournalIndex] = {}
+        self._originals: Dict[str, Optional[Dict[str, Any]]] = {}
+        # Changed dreams in insertion order, each mapped to the snapshot dream whose
+        # place it took or to None when it was appended after the snapshot
+        self._placements: Dict[str, Optional[str]] = {}
+        self._snapshot_signature = None
+        self.load()
+    
+    @property
+    def dreams(self) -> List[Dream]:
+        # Hydrating every record is only paid by callers that need them all
+        if self._dreams is None:
+            self._dreams = list(self._records)
+        return self._dreams
+    
+    def load(self):
+        """Stream the dream snapshot and replay the operation log on top of it"""
+        self._records = self._records_type()
+        self._dreams = None
+        self._indexes = {}
+        self._originals = {}
+        self._placements = {}
+        with self.lock.hold(shared=True):
+            self._snapshot_signature = file_signature(self.data_file)
+            self._records = self._read_snapshot()
+            self._replay_log()
+    
+    def _stale(self) -> bool:
+        """Whether another process changed the snapshot or log since this one last read or wrote them"""
+        return (file_signature(self.data_file) != self._snapshot_signature
+                or self.log.disk_size() != self.log.size)
+    
+    def files(self) -> List[str]:
+        return [self.data_file, self.log.log_file]
+    
+    def append_only_files(self) -> List[str]:
+        return [self.log.log_file]
+    
+    def reading(self) -> ContextManager[None]:
+        return self.lock.hold(shared=True)
+    
+    def _read_snapshot(self):
+        """Load the records stored in the snapshot file"""
+        records = self._records_type()
+        if Path(self.data_file).exists():
+            try:
+                for dream_data in iter_array_file(self.data_file):
+                    records.put_raw(dream_data)
+            except (KeyError, TypeError, ValueError) as e:
+                print(f"Warning: Could not load dreams from {self.data_file}: {e}")
+                records = self._records_type()
+        return records
+    
+    def _write_snapshot(self):
+        """Write every record to the snapshot file"""
+        # A crash mid-write must leave the previous snapshot intact
+        with atomic_write(self.data_file, fsync=self.fsync) as f:
+            f.write(dumpb(list(self._records.to_dicts()), indent=True))
+    
+    def _replay_log(self):
+        """Apply logged operations that are not yet part of the snapshot"""
+        for record in self.log.replay():
+            try:
+                op = record['op']
+                if op in ('add', 'update'):
+                    # Replays are idempotent: an id already present is replaced
+                    dream_data = record['dream']
+                    replaces = record.get('id', dream_data.get('id'))
+                    self._remember_original(replaces)
+                    self._remember_original(dream_data.get('id'))
+                    self._place(dream_data.get('id'), replaces)
+                    self._records.put_raw(dream_data, replaces=replaces)
+                elif op == 'delete':
+                    self._remember_original(record['id'])
+                    self._placements.pop(record['id'], None)
+                    self._records.discard(record['id'])
+            except (KeyError, TypeError, ValueError) as e:
+                print(f"Warning: Skipping invalid log record in {self.log.log_file}: {e}")
+    
+    def _remember_original(self, dream_id: Optional[str]):
+        """Keep the snapshot-time record of a dream that is about to change"""
+        if dream_id is not None and dream_id not in self._originals:
+            self._originals[dream_id] = self._records.get_record(dream_id)
+    
+    def _place(self, dream_id: Optional[str], replaces: str = None):
+        """Note where a dream is about to land in insertion order, as the record stores place it"""
+        if dream_id is None:
+            return
+        key = replaces if replaces is not None and replaces != dream_id and replaces in self._records else dream_id
+        if key not in self._records:
+            # Appended, even if an earlier dream with this id was deleted
+            self._placements.pop(dream_id, None)
+            self._placements[dream_id] = None
+        elif key not in self._placements:
+            self._placements[dream_id] = key
+        elif key != dream_id:
+            self._placements = {
+                (dream_id if changed == key else changed): place for changed, place in self._placements.items()
+            }
+    
+    def _materialize(self, index_type: Type[JournalIndex]) -> JournalIndex:
+        """Load an index from its checkpoint, or rebuild and checkpoint it"""
+        index = load_checkpoint(index_type, self.data_file, self._snapshot_signature)
+        if index is None:
+            index = self._snapshot_index(index_type)
+            if index is None:
+                index = index_type()
+                for dream in self._snapshot_dreams():
+                    index.add(dream)
+            # Checkpoint right away so the next run does not rebuild again; only
+            # this index is written, since a read must not rewrite the journal
+            if (index.persistent and self._snapshot_signature is not None
+                    and file_signature(self.data_file) == self._snapshot_signature):
+                save_checkpoint(index, self.data_file, self._snapshot_signature)
+        
+        self._apply_changes(index)
+        return index
+    
+    def _snapshot_index(self, index_type: Type[JournalIndex]) -> Optional[JournalIndex]:
+        """Build an index straight from the snapshot file, where its format allows"""
+        if index_type is DateIndex:
+            # Raw timestamps sort in date order, so no dream is hydrated. Dreams changed in
+            # place stand in for their snapshot state, which keeps the snapshot's order
+            keys = []
+            for dream_id in self._records.ids():
+                if dream_id not in self._placements:
+                    keys.append((self._records.date_key(dream_id), dream_id))
+                elif self._placements[dream_id] is not None:
+                    place = self._placements[dream_id]
+                    keys.append((self._originals[place]['date'], place))
+            kept = set(self._placements.values())
+            keys.extend((original['date'], dream_id) for dream_id, original in self._originals.items()
+                        if original is not None and dream_id not in kept)
+            return DateIndex(keys)
+        return None
+    
+    def _snapshot_dreams(self) -> Iterator[Dream]:
+        """Dreams as the snapshot holds them, before the logged changes"""
+        for dream_id in list(self._records.ids()):
+            if dream_id not in self._originals:
+                yield self._records.get(dream_id)
+        for original in self._originals.values():
+            if original is not None:
+                yield Dream.from_dict(original)
+    
+    def _apply_changes(self, index: JournalIndex):
+        """Replay changes made since the snapshot onto an index built from it"""
+        kept = set(self._placements.values())
+        for dream_id, original in self._originals.items():
+            if original is not None and dream_id not in kept:
+                index.remove(Dream.from_dict(original))
+        for dream_id, place in self._placements.items():
+            current = self._records.get(dream_id)
+            if place is None:
+                index.add(current)
+            else:
+                index.replace(Dream.from_dict(self._originals[place]), current)
+    
+    def _index(self, index_type: Type[JournalIndex]) -> JournalIndex:
+        """Return a live index, materializing it on first use"""
+        index = self._indexes.get(index_type.name)
+        if index is None:
+            index = self._materialize(index_type)
+            self._indexes[index_type.name] = index
+        return index
+    
+    def _update_indexes(self, old: Optional[Dream] = None, new: Optional[Dream] = None):
+        """Move live indexes from a dream's old state to its new one"""
+        for index in self._indexes.values():
+            if old is not None and new is not None:
+                index.replace(old, new)
+            elif old is not None:
+                index.remove(old)
+            elif new is not None:
+                index.add(new)
+    
+    def save(self):
+        """Write a full snapshot and fold the operation log into it"""
+        with self.lock.hold():
+            # Every change is logged as it is made, so what is on disk includes this process's changes
+            if self._stale():
+                self.load()
+            
+            # Checkpoints are tied to the old snapshot, so bring them up to date first
+            for index_type in self.index_types:
+                if index_type.name not in self._indexes and Path(checkpoint_path(self.data_file, index_type)).exists():
+                    self._indexes[index_type.name] = self._materialize(index_type)
+            
+            try:
+                self._write_snapshot()
+                self.log.clear()
+            except Exception as e:
+                print(f"Error saving dreams: {e}")
+                return
+            
+            self._originals = {}
+            self._placements = {}
+            self._snapshot_signature = file_signature(self.data_file)
+            for index in self._indexes.values():
+                if index.persistent:
+                    save_checkpoint(index, self.data_file, self._snapshot_signature)
+    
+    def _log_operation(self, op: str, **payload: Any):
+        """Record a single change in the log, compacting when it grows too long"""
+        self._log_operations(op, [payload])
+    
+    def _log_operations(self, op: str, payloads: List[Dict[str, Any]]):
+        """Record a batch of changes with one write, compacting when the log grows too long"""
+        with self.lock.hold():
+            stale = self._stale()
+            try:
+                self.log.append_many(op, payloads)
+            except Exception:
+                # The change never reached the log, so take it back out of memory: reloading
+                # restores exactly what is on disk, and the caller sees the error
+                self.load()
+                raise
+            
+            if stale:
+                # Pick up the other writers' changes; ours is already in the log
+                self.load()
+            
+            # Let the log grow with the journal so compaction stays amortized O(1)
+            if self.log.record_count >= max(self.compact_threshold, len(self._records) // 2):
+                self.save()
+    
+    def add(self, dream: Dream):
+        previous = self._records.get(dream.id)
+        self._remember_original(dream.id)
+        self._place(dream.id)
+        self._records.put(dream)
+        self._update_indexes(previous, dream)
+        if previous is not None:
+            self._dreams = None
+        elif self._dreams is not None:
+            self._dreams.append(dream)
+        self._log_operation('add', dream=dream.to_dict())
+    
+    def add_batch(self, dreams: List[Dream]) -> int:
+        added = []
+        for dream in dreams:
+            if dream.id in self._records:
+                continue
+            self._remember_original(dream.id)
+            self._place(dream.id)
+            self._records.put(dream)
+            self._update_indexes(new=dream)
+            added.append(dream)
+        
+        if not added:
+            return 0
+        if self._dreams is not None:
+            self._dreams.extend(added)
+        self._log_operations('add', [{'dream': dream.to_dict()} for dream in added])
+        return len(added)
+    
+    def update(self, dream: Dream, changes: Dict[str, Any]):
+        dream_key = dream.id
+        self._remember_original(dream_key)
+        # The dream is changed in place, so keep its old state for the indexes
+        record = self._records.get_record(dream_key)
+        previous = Dream.from_dict(record) if record is not None else None
+        for key, value in changes.items():
+            setattr(dream, key, value)
+        self._remember_original(dream.id)
+        self._place(dream.id, replaces=dream_key)
+        self._records.put(dream, replaces=dream_key)
+        self._update_indexes(previous, dream)
+        # Columnar records hand out copies, so a cached list may hold the old state
+        self._dreams = None
+        self._log_operation('update', id=dream_key, dream=dream.to_dict())
+    
+    def delete(self, dream: Dream):
+        self._remember_original(dream.id)
+        self._placements.pop(dream.id, None)
+        self._records.discard(dream.id)
+        self._update_indexes(old=dream)
+        self._dreams = None
+        self._log_operation('delete', id=dream.id)
+    
+    def _date_index(self) -> DateIndex:
+        """Return the date-ordered index, loading or building it on first use"""
+        return self._index(DateIndex)
+    
+    def get_dreams(self, limit: int = None, search: str = None) -> List[Dream]:
+        if search:
+            matches = self._index(SearchIndex).search(search)
+            dream_ids = self._date_index().sort_newest(matches, self._records.date_key)
+            if limit:
+                dream_ids = dream_ids[:limit]
+        else:
+            dream_ids = self._date_index().newest(limit)
+        
+        return [self._records.get(dream_id) for dream_id in dream_ids]
+    
+    def get_dream_at(self, position: int) -> Optional[Dream]:
+        dream_id = self._date_index().nth_newest(position)
+        return self._records.get(dream_id) if dream_id is not None else None
+    
+    def get_dreams_by_date_range(self, start_date: datetime, end_date: datetime) -> List[Dream]:
+        return [self._records.get(dream_id) for dream_id in self._date_index().between(start_date, end_date)]
+    
+    def iter_dreams(self) -> Iterator[Dream]:
+        return iter(self._records)
+    
+    def iter_dreams_by_date(self, start_date: datetime = None, end_date: datetime = None) -> Iterator[Dream]:
+        index = self._date_index()
+        if start_date is None and end_date is None:
+            dream_ids = index.oldest()
+        else:
+            dream_ids = index.between(start_date or datetime.min, end_date or datetime.max)
+        for dream_id in dream_ids:
+            yield self._records.get(dream_id)
+    
+    def get_dreams_by_emotion(self, emotion: str) -> List[Dream]:
+        return self._records.tagged('emotions', emotion)
+    
+    def get_dreams_by_theme(self, theme: str) -> List[Dream]:
+        return self._records.tagged('themes', theme)
+    
+    def get_lucid_dreams(self) -> List[Dream]:
+        return self._records.flagged(LUCID)
+    
+    def get_nightmares(self) -> List[Dream]:
+        return self._records.flagged(NIGHTMARE)
+    
+    def get_statistics(self) -> Dict[str, Any]:
+        stats = self._index(StatisticsIndex)
+        if not stats.total:
+            return {'total_dreams': 0}
+        
+        if stats.bounds_stale:
+            stats.set_bounds(self._date_index().bounds())
+        
+        return build_statistics(
+            stats.total, stats.lucid, stats.nightmares,
+            datetime.fromisoformat(stats.earliest), datetime.fromisoformat(stats.latest),
+            dict(stats.emotion_counts), dict(stats.theme_counts), dict(stats.character_counts)
+        )
+    
+    def get_date_array(self):
+        import numpy as np
+        
+        dates = [datetime.fromisoformat(self._records.date_key(dream_id)).replace(tzinfo=None) for dream_id in self._records.ids()]
+        return np.array(dates, dtype='datetime64[us]')
+    
+    def get_emotion_buckets(self, bucket: str) -> EmotionBuckets:
+        return self._index(EMOTION_BUCKETS[bucket])
+    
+    def get_cooccurring_tags(self, kind: str, tag: str, limit: int = 10) -> List[Tuple[str, str, int]]:
+        return self._index(TagIndex).cooccurring(kind, tag, limit)
+    
+    def get_similar_dreams(self, dream: Dream, limit: int = 5) -> List[Tuple[Dream, float]]:
+        candidates = (self._records.get(dream_id) for dream_id in self._index(TagIndex).candidates(dream))
+        return rank_similar(dream, (candidate for candidate in candidates if candidate is not None), limit)
+    
+    def get_content_index(self) -> ContentIndex:
+        return self._index(ContentIndex)
+    
+    def get_dreams_by_ids(self, dream_ids: List[str]) -> List[Dream]:
+        dreams = (self._records.get(dream_id) for dream_id in dream_ids)
+        return [dream for dream in dreams if dream is not None]
+
+
+class BinaryStorage(JsonStorage):
+    """JSON storage whose snapshot is a memory-mapped binary file
+    
+    The snapshot is only mapped on load, so start-up cost does not grow with
+    the journal. Statistics, lucid and nightmare selection, date-range
+    queries and date arrays are computed on the mapped columns; dreams are
+    read from the file only when one is actually returned. Changes go
+    through the same operation log as ``JsonStorage`` and are folded into a
+    freshly written snapshot on compaction. See ``binary_snapshot``.
+    """
+    
+    def __init__(self, data_file: str, compact_threshold: int = 1000, fsync: bool = False,
+                 seed_file: str = None):
+        super().__init__(data_file, compact_threshold=compact_threshold, fsync=fsync)
+        
+        if seed_file and not len(self._records) and not Path(data_file).exists() and Path(seed_file).exists():
+            self._import_json(seed_file)
+    
+    def _import_json(self, seed_file: str):
+        """Seed an empty snapshot from an existing JSON journal"""
+        count = 0
+        for dream_data in iter_array_file(seed_file):
+            self._records.put_raw(dream_data)
+            count += 1
+        self.save()
+        print(f"Imported {count} dreams from {seed_file} into {self.data_file}")
+    
+    def _read_snapshot(self):
+        from binary_snapshot import BinarySnapshot, MappedRecords
+        
+        if not Path(self.data_file).exists():
+            return MappedRecords()
+        try:
+            return MappedRecords(BinarySnapshot(self.data_file))
+        except (KeyError, OSError, ValueError) as e:
+            print(f"Warning: Could not load dreams from {self.data_file}: {e}")
+            return MappedRecords()
+    
+    def _write_snapshot(self):
+        from binary_snapshot import BinarySnapshot, MappedRecords, write_snapshot
+        
+        # Write beside the live file so readers never see a partial snapshot
+        temp_file = temp_path(self.data_file)
+        write_snapshot(temp_file, self._records)
+        replace_file(temp_file, self.data_file, fsync=self.fsync)
+        self._records = MappedRecords(BinarySnapshot(self.data_file))
+        # The date index points into the old mapping
+        self._indexes.pop(DateIndex.name, None)
+    
+    def _snapshot_index(self, index_type: Type[JournalIndex]) -> Optional[JournalIndex]:
+        if index_type is StatisticsIndex:
+            return self._records.snapshot_statistics()
+        if issubclass(index_type, EmotionBuckets):
+            return self._records.snapshot_emotions(index_type)
+        return None
+    
+    def _date_index(self) -> DateIndex:
+        index = self._indexes.get(DateIndex.name)
+        if index is None:
+            index = self._records.date_index()
+            self._apply_changes(index)
+            self._indexes[DateIndex.name] = index
+        return index
+    
+    def get_date_array(self):
+        return self._records.date_array()
+
+
+class SQLiteStorage(StorageBackend):
+    """Stores dreams in SQLite and answers queries with indexed SQL
+    
+    Emotions, characters and themes live in normalized lookup tables with
+    ordered link tables, so tag queries and statistics never load dreams
+    into Python. ``dreams`` is only materialized when something needs the
+    whole collection.
+    """
+    
+    def __init__(self, db_file: str, seed_file: str = None):
+        self.db_file = db_file
+        self.conn = sqlite3.connect(db_file)
+        self.conn.execute('PRAGMA foreign_keys = ON')
+        self.conn.execute('PRAGMA journal_mode = WAL')
+        self._dreams: Optional[List[Dream]] = None
+        # Built on first use and kept in memory; SQLite has no checkpoint to tie it to
+        self._content_index: Optional[ContentIndex] = None
+        self._create_schema()
+        
+        if seed_file and self._count() == 0 and Path(seed_file).exists():
+            self._import_json(seed_file)
+    
+    def _create_schema(self):
+        """Create tables and indexes if they do not exist yet"""
+        statements = [
+            '''CREATE TABLE IF NOT EXISTS dreams (
+                   seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                   id TEXT NOT NULL UNIQUE,
+                   title TEXT NOT NULL,
+                   content TEXT NOT NULL,
+                   date TEXT NOT NULL,
+                   lucid INTEGER NOT NULL DEFAULT 0,
+                   nightmare INTEGER NOT NULL DEFAULT 0
+               )''',
+            'CREATE INDEX IF NOT EXISTS idx_dreams_date ON dreams(date)',
+            'CREATE INDEX IF NOT EXISTS idx_dreams_lucid ON dreams(lucid, date) WHERE lucid = 1',
+            'CREATE INDEX IF NOT EXISTS idx_dreams_nightmare ON dreams(nightmare, date) WHERE nightmare = 1',
+            '''CREATE TABLE IF NOT EXISTS dream_tokens (
+                   token TEXT NOT NULL,
+                   dream_seq INTEGER NOT NULL REFERENCES dreams(seq) ON DELETE CASCADE,
+                   PRIMARY KEY (token, dream_seq)
+               ) WITHOUT ROWID''',
+            'CREATE INDEX IF NOT EXISTS idx_dream_tokens_dream ON dream_tokens(dream_seq)',
+        ]
+        
+        for kind in TAG_KINDS:
+            statements.extend([
+                f'''CREATE TABLE IF NOT EXISTS {kind} (
+                        tag_id INTEGER PRIMARY KEY,
+                        name TEXT NOT NULL UNIQUE
+                    )''',
+                f'CREATE INDEX IF NOT EXISTS idx_{kind}_lower ON {kind}(lower(name))',
+                f'''CREATE TABLE IF NOT EXISTS dream_{kind} (
+                        link_id INTEGER PRIMARY KEY,
+                        dream_seq INTEGER NOT NULL REFERENCES dreams(seq) ON DELETE CASCADE,
+                        tag_id INTEGER NOT NULL REFERENCES {kind}(tag_id),
+                        position INTEGER NOT NULL
+                    )''',
+                f'CREATE INDEX IF NOT EXISTS idx_dream_{kind}_dream ON dream_{kind}(dream_seq, position)',
+                f'CREATE INDEX IF NOT EXISTS idx_dream_{kind}_tag ON dream_{kind}(tag_id)',
+            ])
+        
+        has_tokens = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'dream_tokens'"
+        ).fetchone() is not None
+        
+        with self.conn:
+            for statement in statements:
+                self.conn.execute(statement)
+            
+            if not has_tokens:
+                # Databases created before the search index need it backfilled
+                rows = self.conn.execute('SELECT seq, id, title, content, date, lucid, nightmare FROM dreams').fetchall()
+                for (dream_seq, *_), dream in zip(rows, self._hydrate(rows)):
+                    self._insert_tokens(dream_seq, dream)
+    
+    def _import_json(self, seed_file: str):
+        """Seed an empty database from an existing JSON journal"""
+        seed = JsonStorage(seed_file)
+        with self.conn:
+            for dream in seed.dreams:
+                self._insert(dream)
+        print(f"Imported {len(seed.dreams)} dreams from {seed_file} into {self.db_file}")
+    
+    def _count(self) -> int:
+        return self.conn.execute('SELECT COUNT(*) FROM dreams').fetchone()[0]
+    
+    @staticmethod
+    def _date_key(date: datetime) -> str:
+        """Fixed-width ISO timestamp so text comparison matches date order"""
+        return date.isoformat(timespec='microseconds')
+    
+    def _insert(self, dream: Dream, seq: int = None):
+        cursor = self.conn.execute(
+            'INSERT INTO dreams (seq, id, title, content, date, lucid, nightmare) VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (seq, dream.id, dream.title, dream.content, self._date_key(dream.date),
+             int(dream.lucid), int(dream.nightmare))
+        )
+        dream_seq = cursor.lastrowid
+        
+        for kind in TAG_KINDS:
+            for position, name in enumerate(getattr(dream, kind)):
+                self.conn.execute(f'INSERT OR IGNORE INTO {kind} (name) VALUES (?)', (name,))
+                self.conn.execute(
+                    f'''INSERT INTO dream_{kind} (dream_seq, tag_id, position)
+                        SELECT ?, tag_id, ? FROM {kind} WHERE name = ?''',
+                    (dream_seq, position, name)
+                )
+        
+        self._insert_tokens(dream_seq, dream)
+    
+    def _insert_many(self, dreams: List[Dream]):
+        """Insert new dreams with a handful of set-based statements"""
+        self.conn.executemany(
+            'INSERT INTO dreams (id, title, content, date, lucid, nightmare) VALUES (?, ?, ?, ?, ?, ?)',
+            ((dream.id, dream.title, dream.content, self._date_key(dream.date),
+              int(dream.lucid), int(dream.nightmare)) for dream in dreams)
+        )
+        seqs = self._lookup('SELECT id, seq FROM dreams WHERE id IN ({})', [dream.id for dream in dreams])
+        
+        for kind in TAG_KINDS:
+            names = list({name for dream in dreams for name in getattr(dream, kind)})
+            self.conn.executemany(f'INSERT OR IGNORE INTO {kind} (name) VALUES (?)', ((name,) for name in names))
+            tag_ids = self._lookup(f'SELECT name, tag_id FROM {kind} WHERE name IN ({{}})', names)
+            self.conn.executemany(
+                f'INSERT INTO dream_{kind} (dream_seq, tag_id, position) VALUES (?, ?, ?)',
+                ((seqs[dream.id], tag_ids[name], position)
+                 for dream in dreams for position, name in enumerate(getattr(dream, kind)))
+            )
+        
+        self.conn.executemany(
+            'INSERT INTO dream_tokens (token, dream_seq) VALUES (?, ?)',
+            ((token, seqs[dream.id]) for dream in dreams for token in dream_tokens(dream))
+        )
+    
+    def _lookup(self, sql: str, keys: List[Any]) -> Dict[Any, Any]:
+        """Map keys to values with an ``IN`` query, chunked under SQLite's parameter limit"""
+        result = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            result.update(self.conn.execute(sql.format(', '.join('?' * len(chunk))), chunk))
+        return result
+    
+    def _insert_tokens(self, dream_seq: int, dream: Dream):
+        self.conn.executemany(
+            'INSERT INTO dream_tokens (token, dream_seq) VALUES (?, ?)',
+            ((token, dream_seq) for token in dream_tokens(dream))
+        )
+    
+    def _select(self, where: str = '', params: Iterable[Any] = (), order: str = 'seq',
+                limit: int = None, offset: int = None) -> List[Dream]:
+        """Run a query over the dreams table and hydrate matching rows"""
+        sql = f'SELECT seq, id, title, content, date, lucid, nightmare FROM dreams {where} ORDER BY {order}'
+        params = list(params)
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+            if offset:
+                sql += ' OFFSET ?'
+                params.append(offset)
+        
+        rows = self.conn.execute(sql, params).fetchall()
+        return self._hydrate(rows)
+    
+    def _hydrate(self, rows: List[tuple]) -> List[Dream]:
+        """Turn dream rows into Dream objects, fetching their tags in batches"""
+        tags = {row[0]: {kind: [] for kind in TAG_KINDS} for row in rows}
+        seqs = list(tags)
+        
+        for start in range(0, len(seqs), 500):
+            batch = seqs[start:start + 500]
+            placeholders = ', '.join('?' * len(batch))
+            for kind in TAG_KINDS:
+                links = self.conn.execute(
+                    f'''SELECT l.dream_seq, t.name FROM dream_{kind} l
+                        JOIN {kind} t ON t.tag_id = l.tag_id
+                        WHERE l.dream_seq IN ({placeholders})
+                        ORDER BY l.dream_seq, l.position''',
+                    batch
+                )
+                for dream_seq, name in links:
+                    tags[dream_seq][kind].append(name)
+        
+        return [
+            Dream(
+                title=title,
+                content=content,
+                emotions=tags[seq]['emotions'],
+                characters=tags[seq]['characters'],
+                themes=tags[seq]['themes'],
+                lucid=bool(lucid),
+                nightmare=bool(nightmare),
+                date=datetime.fromisoformat(date),
+                id=dream_id
+            )
+            for seq, dream_id, title, content, date, lucid, nightmare in rows
+        ]
+    
+    @property
+    def dreams(self) -> List[Dream]:
+        if self._dreams is None:
+            self._dreams = self._select()
+        return self._dreams
+    
+    def load(self):
+        self._dreams = None
+        self._content_index = None
+    
+    def save(self):
+        self.conn.commit()
+    
+    def files(self) -> List[str]:
+        return [self.db_file, f'{self.db_file}-wal']
+    
+    def add(self, dream: Dream):
+        with self.conn:
+            self._insert(dream)
+        if self._dreams is not None:
+            self._dreams.append(dream)
+        if self._content_index is not None:
+            self._content_index.add(dream)
+    
+    def add_batch(self, dreams: List[Dream]) -> int:
+        added = []
+        with self.conn:
+            existing = set(self._lookup('SELECT id, seq FROM dreams WHERE id IN ({})', list({dream.id for dream in dreams})))
+            for dream in dreams:
+                if dream.id not in existing:
+                    existing.add(dream.id)
+                    added.append(dream)
+            if added:
+                self._insert_many(added)
+        
+        if self._dreams is not None:
+            self._dreams.extend(added)
+        if self._content_index is not None:
+            for dream in added:
+                self._content_index.add(dream)
+        return len(added)
+    
+    def update(self, dream: Dream, changes: Dict[str, Any]):
+        dream_key = dream.id
+        for key, value in changes.items():
+            setattr(dream, key, value)
+        
+        with self.conn:
+            row = self.conn.execute('SELECT seq FROM dreams WHERE id = ?', (dream_key,)).fetchone()
+            if row is None:
+                return
+            # Re-insert under the same seq so insertion order is preserved
+            self.conn.execute('DELETE FROM dreams WHERE seq = ?', (row[0],))
+            self._insert(dream, seq=row[0])
+        self._dreams = None
+        if self._content_index is not None:
+            # The content index finds a dream's row by id, so the changed dream can stand in for the old one
+            self._content_index.remove(dream)
+            self._content_index.add(dream)
+    
+    def delete(self, dream: Dream):
+        with self.conn:
+            self.conn.execute('DELETE FROM dreams WHERE id = ?', (dream.id,))
+        self._dreams = None
+        if self._content_index is not None:
+            self._content_index.remove(dream)
+    
+    def get_dreams(self, limit: int = None, search: str = None) -> List[Dream]:
+        where = ''
+        params = []
+        if search:
+            groups = parse_query(search)
+            if not groups:
+                return []
+            
+            selects = []
+            for group in groups:
+                terms = []
+                for token, prefix in group:
+                    if prefix:
+                        # Every token starting with the prefix sorts inside [prefix, prefix_end)
+                        terms.append('SELECT dream_seq FROM dream_tokens WHERE token >= ? AND token < ?')
+                        params.extend([token, token[:-1] + chr(ord(token[-1]) + 1)])
+                    else:
+                        terms.append('SELECT dream_seq FROM dream_tokens WHERE token = ?')
+                        params.append(token)
+                selects.append(f"SELECT dream_seq FROM ({' INTERSECT '.join(terms)})")
+            where = f"WHERE seq IN ({' UNION '.join(selects)})"
+        
+        return self._select(where, params, order='date DESC, seq', limit=limit or None)
+    
+    def get_dream_at(self, position: int) -> Optional[Dream]:
+        if position < 1:
+            return None
+        dreams = self._select(order='date DESC, seq', limit=1, offset=position - 1)
+        return dreams[0] if dreams else None
+    
+    def get_dreams_by_date_range(self, start_date: datetime, end_date: datetime) -> List[Dream]:
+        return self._select(
+            'WHERE date >= ? AND date <= ?',
+            (self._date_key(start_date), self._date_key(end_date)),
+            order='date, seq'
+        )
+    
+    def _iter_select(self, order: Tuple[str, ...], where: str = '', params: Iterable[Any] = (),
+                     batch_size: int = 1000) -> Iterator[Dream]:
+        """Stream rows in batches, paging by keyset on the ``order`` columns"""
+        columns = ['seq', 'id', 'title', 'content', 'date', 'lucid', 'nightmare']
+        positions = [columns.index(column) for column in order]
+        key = ', '.join(order)
+        conditions = [where] if where else []
+        params = list(params)
+        
+        last = None
+        while True:
+            clauses = conditions + ([f'({key}) > ({", ".join("?" * len(order))})'] if last else [])
+            sql = f'SELECT {", ".join(columns)} FROM dreams'
+            if clauses:
+                sql += ' WHERE ' + ' AND '.join(clauses)
+            # Keyset pagination keeps each batch an index range scan
+            rows = self.conn.execute(f'{sql} ORDER BY {key} LIMIT ?', params + list(last or ()) + [batch_size]).fetchall()
+            if not rows:
+                return
+            yield from self._hydrate(rows)
+            last = [rows[-1][position] for position in positions]
+    
+    def iter_dreams(self) -> Iterator[Dream]:
+        return self._iter_select(('seq',))
+    
+    def iter_dreams_by_date(self, start_date: datetime = None, end_date: datetime = None) -> Iterator[Dream]:
+        conditions, params = [], []
+        if start_date is not None:
+            conditions.append('date >= ?')
+            params.append(self._date_key(start_date))
+        if end_date is not None:
+            conditions.append('date <= ?')
+            params.append(self._date_key(end_date))
+        return self._iter_select(('date', 'seq'), ' AND '.join(conditions), params)
+    
+    def _get_dreams_by_tag(self, kind: str, name: str) -> List[Dream]:
+        return self._select(
+            f'''WHERE seq IN (SELECT l.dream_seq FROM dream_{kind} l
+                              JOIN {kind} t ON t.tag_id = l.tag_id
+                              WHERE lower(t.name) = ?)''',
+            (name.lower(),)
+        )
+    
+    def get_dreams_by_emotion(self, emotion: str) -> List[Dream]:
+        return self._get_dreams_by_tag('emotions', emotion)
+    
+    def get_dreams_by_theme(self, theme: str) -> List[Dream]:
+        return self._get_dreams_by_tag('themes', theme)
+    
+    def get_lucid_dreams(self) -> List[Dream]:
+        return self._select('WHERE lucid = 1')
+    
+    def get_nightmares(self) -> List[Dream]:
+        return self._select('WHERE nightmare = 1')
+    
+    def _tag_counts(self, kind: str) -> Dict[str, int]:
+        # Order by first appearance so ties rank like the JSON backend
+        rows = self.conn.execute(
+            f'''SELECT t.name, COUNT(*) FROM dream_{kind} l
+                JOIN {kind} t ON t.tag_id = l.tag_id
+                GROUP BY l.tag_id ORDER BY MIN(l.link_id)'''
+        )
+        return dict(rows.fetchall())
+    
+    def get_statistics(self) -> Dict[str, Any]:
+        total_dreams, lucid_dreams, nightmares, earliest, latest = self.conn.execute(
+            'SELECT COUNT(*), SUM(lucid), SUM(nightmare), MIN(date), MAX(date) FROM dreams'
+        ).fetchone()
+        
+        if not total_dreams:
+            return {'total_dreams': 0}
+        
+        return build_statistics(
+            total_dreams, lucid_dreams, nightmares,
+            datetime.fromisoformat(earliest), datetime.fromisoformat(latest),
+            self._tag_counts('emotions'), self._tag_counts('themes'), self._tag_counts('characters')
+        )
+    
+    def get_date_array(self):
+        import numpy as np
+        
+        # Date keys always carry microseconds, so the first 26 characters are the wall-clock time
+        rows = self.conn.execute('SELECT substr(date, 1, 26) FROM dreams').fetchall()
+        return np.array([row[0] for row in rows], dtype='datetime64[us]')
+    
+    def get_emotion_buckets(self, bucket: str) -> EmotionBuckets:
+        index = EMOTION_BUCKETS[bucket]()
+        if bucket == 'week':
+            # Monday of the week: step back six days, then forward to the next Monday
+            key = "date(substr(d.date, 1, 10), '-6 days', 'weekday 1')"
+        else:
+            key = 'substr(d.date, 1, 7)'
+        
+        index.totals = dict(self.conn.execute(f'SELECT {key}, COUNT(*) FROM dreams d GROUP BY 1').fetchall())
+        rows = self.conn.execute(
+            f'''SELECT {key}, e.name, COUNT(DISTINCT d.seq) FROM dreams d
+                JOIN dream_emotions l ON l.dream_seq = d.seq
+                JOIN emotions e ON e.tag_id = l.tag_id
+                GROUP BY 1, l.tag_id'''
+        )
+        for key, emotion, count in rows:
+            index.counts.setdefault(key, Counter())[emotion] = count
+        return index
+    
+    def get_cooccurring_tags(self, kind: str, tag: str, limit: int = 10) -> List[Tuple[str, str, int]]:
+        results = []
+        for other_kind in TAG_KINDS:
+            rows = self.conn.execute(
+                f'''SELECT lower(t.name), COUNT(DISTINCT l.dream_seq) FROM dream_{other_kind} l
+                    JOIN {other_kind} t ON t.tag_id = l.tag_id
+                    WHERE l.dream_seq IN (SELECT m.dream_seq FROM dream_{kind} m
+                                          JOIN {kind} u ON u.tag_id = m.tag_id
+                                          WHERE lower(u.name) = ?)
+                    GROUP BY lower(t.name)''',
+                (tag.lower(),)
+            )
+            results.extend((other_kind, name, count) for name, count in rows
+                           if (other_kind, name) != (kind, tag.lower()))
+        # Same order as the JSON backend: most dreams first, then by kind and tag
+        results.sort(key=lambda result: (-result[2], f'{result[0]}:{result[1]}'))
+        return results[:limit]
+    
+    def get_similar_dreams(self, dream: Dream, limit: int = 5) -> List[Tuple[Dream, float]]:
+        # Score only the dreams sharing the most tags, found through the tag indexes
+        shared = Counter()
+        for kind in TAG_KINDS:
+            names = [tag for token_kind, tag in map(split_token, dream_tags(dream)) if token_kind == kind]
+            if not names:
+                continue
+            rows = self.conn.execute(
+                f'''SELECT l.dream_seq, COUNT(DISTINCT lower(t.name)) FROM dream_{kind} l
+                    JOIN {kind} t ON t.tag_id = l.tag_id
+                    WHERE lower(t.name) IN ({', '.join('?' * len(names))})
+                    GROUP BY l.dream_seq''',
+                names
+            )
+            shared.update(dict(rows.fetchall()))
+        
+        seqs = [seq for seq, _ in shared.most_common(MAX_CANDIDATES + 1)]
+        candidates = self._select(f"WHERE seq IN ({', '.join('?' * len(seqs))})", seqs) if seqs else []
+        return rank_similar(dream, (candidate for candidate in candidates if candidate.id != dream.id), limit)
+    
+    def get_content_index(self) -> ContentIndex:
+        if self._content_index is None:
+            index = ContentIndex()
+            for dream in self.iter_dreams():
+                index.add(dream)
+            self._content_index = index
+        return self._content_index
+    
+    def get_dreams_by_ids(self, dream_ids: List[str]) -> List[Dream]:
+        found = {}
+        for start in range(0, len(dream_ids), 500):
+            chunk = dream_ids[start:start + 500]
+            for dream in self._select(f"WHERE id IN ({', '.join('?' * len(chunk))})", chunk):
+                found[dream.id] = dream
+        return [found[dream_id] for dream_id in dream_ids if dream_id in found]
+    
+    def close(self):
+        self.conn.close()
+
+
+def build_statistics(total_dreams: int, lucid_dreams: int, nightmares: int,
+                     earliest_date: datetime, latest_date: datetime,
+                     emotion_counts: Dict[str, int], theme_counts: Dict[str, int],
+                     character_counts: Dict[str, int]) -> Dict[str, Any]:
+    """Assemble the statistics dictionary returned by ``get_statistics``"""
+    return {
+        'total_dreams': total_dreams,
+        'lucid_dreams': lucid_dreams,
+        'nightmares': nightmares,
+        'lucid_percentage': (lucid_dreams / total_dreams) * 100 if total_dreams > 0 else 0,
+        'nightmare_percentage': (nightmares / total_dreams) * 100 if total_dreams > 0 else 0,
+        'earliest_date': earliest_date,
+        'latest_date': latest_date,
+        'emotion_counts': emotion_counts,
+        'theme_counts': theme_counts,
+        'character_counts': character_counts,
+        'total_emotions': len(emotion_counts),
+        'total_themes': len(theme_counts),
+        'total_characters': len(character_counts)
+    }
+
+
+def create_storage(data_file: str, backend: str = 'json', compact_threshold: int = 1000,
+                   fsync: bool = False, sqlite_file: str = None, record_store: str = 'dict',
+                   binary_file: str = None) -> StorageBackend:
+    """Create the storage backend selected in the configuration"""
+    if backend == 'json':
+        return JsonStorage(data_file, compact_threshold=compact_threshold, fsync=fsync, record_store=record_store)
+    if backend == 'sqlite':
+        db_file = sqlite_file or str(Path(data_file).with_suffix('.db'))
+        return SQLiteStorage(db_file, seed_file=data_file)
+    if backend == 'binary':
+        snapshot_file = binary_file or str(Path(data_file).with_suffix('.djsnap'))
+        return BinaryStorage(snapshot_file, compact_threshold=compact_threshold, fsync=fsync, seed_file=data_file)
+    raise ValueError(f"Unknown storage backend: {backend}")
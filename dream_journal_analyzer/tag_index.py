@@ -0,0 +1,160 @@
+"""
+Tag co-occurrence and MinHash similarity index
+"""
+
+import hashlib
+import heapq
+import random
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+from dream_models import Dream
+from indexes import JournalIndex
+
+
+TAG_KINDS = ('emotions', 'characters', 'themes')
+
+# Signature length is BANDS * ROWS; two dreams become candidates when any
+# band matches, which for Jaccard similarity s happens with probability
+# 1 - (1 - s ** ROWS) ** BANDS: about 0.93 at s = 0.5, 0.4 at s = 0.3 and
+# 0.003 for unrelated dreams at s = 0.05
+BANDS = 20
+ROWS = 3
+# Most candidates scored exactly for one lookup, preferring those sharing more bands
+MAX_CANDIDATES = 500
+
+_PRIME = (1 << 61) - 1
+# Fixed seed so signatures stay valid across runs and checkpoints
+_rng = random.Random(20240101)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(BANDS * ROWS)]
+
+
+def tag_token(kind: str, tag: str) -> str:
+    """Token for a tag of one kind; tags compare case-insensitively"""
+    return f'{kind}:{tag.lower()}'
+
+
+def split_token(token: str) -> Tuple[str, str]:
+    kind, _, tag = token.partition(':')
+    return kind, tag
+
+
+def dream_tags(dream: Dream) -> List[str]:
+    """Distinct tag tokens of a dream, in order"""
+    return list(dict.fromkeys(tag_token(kind, tag) for kind in TAG_KINDS for tag in getattr(dream, kind)))
+
+
+def jaccard(first: Iterable[str], second: Iterable[str]) -> float:
+    first, second = set(first), set(second)
+    if not first and not second:
+        return 0.0
+    return len(first & second) / len(first | second)
+
+
+@lru_cache(maxsize=65536)
+def _token_hashes(token: str) -> Tuple[int, ...]:
+    """The token under every MinHash permutation; a signature is their element-wise minimum"""
+    # Built-in hash() is salted per process, so it cannot be checkpointed
+    value = int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'little')
+    return tuple((a * value + b) % _PRIME for a, b in _PERMUTATIONS)
+
+
+def band_keys(tokens: List[str]) -> List[str]:
+    """LSH band keys of a tag set's MinHash signature, one per band"""
+    if not tokens:
+        return []
+    signature = [min(column) for column in zip(*map(_token_hashes, tokens))]
+    keys = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS:(band + 1) * ROWS]
+        digest = hashlib.blake2b(repr(rows).encode('ascii'), digest_size=8).hexdigest()
+        keys.append(f'{band}:{digest}')
+    return keys
+
+
+class TagIndex(JournalIndex):
+    """Tag co-occurrence counts and locality-sensitive hashes of tag sets
+    
+    ``pairs`` maps each tag token to how many dreams it shares with every
+    other token, so the tags seen alongside one tag are read off directly.
+    Each dream's tags are also MinHashed into ``BANDS`` bucket keys; dreams
+    with similar tag sets are likely to share a bucket, so similar dreams
+    are found by scoring the few dreams in the same buckets instead of the
+    whole journal. Both structures change per dream as it is added or
+    removed.
+    """
+    
+    name = 'tags'
+    
+    def __init__(self):
+        self.pairs: Dict[str, Counter] = {}
+        self.buckets: Dict[str, Set[str]] = {}
+    
+    def add(self, dream: Dream):
+        tokens = dream_tags(dream)
+        if len(tokens) > 1:
+            for token in tokens:
+                counts = self.pairs.setdefault(token, Counter())
+                counts.update(other for other in tokens if other != token)
+        for key in band_keys(tokens):
+            self.buckets.setdefault(key, set()).add(dream.id)
+    
+    def remove(self, dream: Dream):
+        tokens = dream_tags(dream)
+        for token in tokens:
+            counts = self.pairs.get(token)
+            if counts is None:
+                continue
+            for other in tokens:
+                if other != token:
+                    counts[other] -= 1
+                    if counts[other] <= 0:
+                        del counts[other]
+            if not counts:
+                del self.pairs[token]
+        for key in band_keys(tokens):
+            bucket = self.buckets.get(key)
+            if bucket is not None:
+                bucket.discard(dream.id)
+                if not bucket:
+                    del self.buckets[key]
+    
+    def cooccurring(self, kind: str, tag: str, limit: int = 10) -> List[Tuple[str, str, int]]:
+        """``(kind, tag, dreams)`` of the tags most often seen with a tag"""
+        counts = self.pairs.get(tag_token(kind, tag), {})
+        ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        return [split_token(token) + (count,) for token, count in ranked]
+    
+    def candidates(self, dream: Dream) -> List[str]:
+        """Ids of dreams sharing an LSH bucket with a dream, most shared buckets first"""
+        shared = Counter()
+        for key in band_keys(dream_tags(dream)):
+            shared.update(self.buckets.get(key, ()))
+        shared.pop(dream.id, None)
+        best = heapq.nsmallest(MAX_CANDIDATES, shared.items(), key=lambda item: (-item[1], item[0]))
+        return [dream_id for dream_id, _ in best]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'pairs': {token: dict(counts) for token, counts in self.pairs.items()},
+            'buckets': {key: sorted(ids) for key, ids in self.buckets.items()}
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'TagIndex':
+        index = cls()
+        index.pairs = {token: Counter(counts) for token, counts in data['pairs'].items()}
+        index.buckets = {key: set(ids) for key, ids in data['buckets'].items()}
+        return index
+
+
+def rank_similar(dream: Dream, candidates: Iterable[Dream], limit: int) -> List[Tuple[Dream, float]]:
+    """Candidates ordered by the Jaccard similarity of their tags to a dream"""
+    if limit < 1:
+        return []
+    tokens = dream_tags(dream)
+    scored = [(candidate, jaccard(tokens, dream_tags(candidate))) for candidate in candidates]
+    scored = [(candidate, score) for candidate, score in scored if score > 0]
+    scored.sort(key=lambda item: (-item[1], item[0].id))
+    return scored[:limit]
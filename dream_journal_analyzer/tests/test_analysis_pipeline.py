@@ -0,0 +1,62 @@
+from collections import Counter
+from datetime import datetime, timedelta
+
+from analysis_pipeline import KeywordMatcher, WordFrequency, count_words, merge_counters, run_pipeline
+from dream_models import Dream
+
+
+WORDS = ['river', 'castle', 'mirror', 'forest', 'teacher', 'staircase', 'ocean', 'garden', 'window', 'shadow']
+
+
+def make_dreams(count: int):
+    """Dreams whose words recur with many tied counts, first seen in different chunks"""
+    base = datetime(2024, 1, 1)
+    dreams = []
+    for i in range(count):
+        words = [WORDS[(i * 3 + k) % len(WORDS)] for k in range(i % 4 + 1)]
+        dreams.append(Dream(f'Dream {i}', ' '.join(words), [], [], [], date=base + timedelta(days=i), id=f'd{i:04d}'))
+    return dreams
+
+
+def word_frequency(dreams, **options):
+    return run_pipeline(dreams, [WordFrequency(limit=len(WORDS), **options)])['common_words']
+
+
+def test_input_has_tied_counts():
+    counts = count_words(dream.content for dream in make_dreams(40))
+    assert len(set(counts.values())) < len(counts)
+
+
+def test_parallel_matches_serial_including_tie_order():
+    dreams = make_dreams(40)
+    serial = word_frequency(dreams, workers=1)
+    
+    for chunk_size in (1, 3, 7, 40):
+        assert word_frequency(dreams, workers=2, chunk_size=chunk_size) == serial
+
+
+def test_merge_counters_keeps_first_seen_order():
+    texts = ['shadow river', 'castle', 'river castle', 'ocean shadow', 'garden']
+    serial = count_words(texts)
+    merged = merge_counters([count_words(texts[i:i + 2]) for i in range(0, len(texts), 2)])
+    
+    assert list(merged.items()) == list(serial.items())
+    assert merged.most_common() == serial.most_common()
+
+
+def test_merge_counters_empty():
+    assert merge_counters([]) == Counter()
+
+
+def test_keyword_matcher_reports_nested_keywords():
+    matcher = KeywordMatcher(['house', 'house party', 'party', 'new york', 'york'])
+    
+    assert matcher.find('A house party in New York') == ['house', 'house party', 'party', 'new york', 'york']
+    assert matcher.find('The partygoers left the warehouse') == []
+
+
+def test_keyword_matcher_handles_punctuation_at_keyword_edges():
+    matcher = KeywordMatcher(['c++', '.net', 'c'])
+    
+    assert matcher.find('Writing C++ and .NET code') == ['c++', '.net', 'c']
+    assert matcher.find('abc++ asp.net') == []
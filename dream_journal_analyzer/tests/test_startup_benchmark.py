@@ -0,0 +1,85 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from startup_benchmark import BUDGETS, COMMANDS, HEAVY_MODULES, check_command, parse_importtime
+
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Trimmed output of ``python -X importtime main.py list``
+CAPTURED = """\
+import time: self [us] | cumulative | imported package
+import time:       193 |        193 |   _io
+import time:        42 |         42 |   marshal
+import time:       521 |       1266 | _frozen_importlib_external
+import time:       300 |        300 |     _collections_abc
+import time:      1200 |       1500 |   collections
+import time:      2500 |       4000 | argparse
+import time:       800 |        800 |     dream_models
+import time:      6000 |       6800 | storage
+some unrelated line written to stderr
+"""
+
+
+def test_parse_importtime_sums_top_level_cumulative_times():
+    import_ms, modules = parse_importtime(CAPTURED)
+    
+    assert import_ms == pytest.approx((1266 + 4000 + 6800) / 1000)
+    assert modules == {'_io', 'marshal', '_frozen_importlib_external', '_collections_abc',
+                       'collections', 'argparse', 'dream_models', 'storage'}
+
+
+def test_parse_importtime_reduces_submodules_to_packages():
+    captured = (
+        "import time:       100 |        100 |     numpy.core._multiarray_umath\n"
+        "import time:       900 |       1000 |   numpy.core\n"
+        "import time:      2000 |       3000 | numpy\n"
+    )
+    import_ms, modules = parse_importtime(captured)
+    
+    assert import_ms == pytest.approx(3.0)
+    assert modules == {'numpy'}
+
+
+def test_parse_importtime_empty():
+    assert parse_importtime('') == (0, set())
+
+
+def test_every_command_has_a_budget():
+    assert set(COMMANDS) == set(BUDGETS)
+
+
+def test_check_command_within_budget():
+    assert check_command('list', BUDGETS['list'] - 1, {'argparse', 'storage'}) == []
+
+
+def test_check_command_over_budget():
+    failures = check_command('list', BUDGETS['list'] + 1, set())
+    
+    assert len(failures) == 1
+    assert failures[0].startswith('list: imports took')
+
+
+def test_check_command_budget_scales():
+    assert check_command('list', BUDGETS['list'] + 1, set(), scale=2.0) == []
+
+
+def test_check_command_flags_heavy_modules():
+    failures = check_command('report', 1.0, {'storage', *HEAVY_MODULES})
+    
+    assert failures == [f"report: imported {', '.join(sorted(HEAVY_MODULES))}"]
+
+
+def test_journal_modules_do_not_import_heavy_modules():
+    """The modules every command loads stay clear of numpy and matplotlib"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import config, dream_models, storage, dream_io, analyzer'],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True
+    )
+    _, modules = parse_importtime(result.stderr)
+    
+    assert {'storage', 'analyzer'} <= modules
+    assert not set(HEAVY_MODULES) & modules
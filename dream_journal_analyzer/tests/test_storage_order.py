@@ -0,0 +1,29 @@
+from datetime import datetime
+
+import pytest
+
+from dream_models import Dream
+from storage import create_storage
+
+
+DAY = datetime(2024, 1, 1)
+
+
+def ids(dreams):
+    return [dream.id for dream in dreams]
+
+
+@pytest.mark.parametrize('backend', ['json', 'binary', 'sqlite'])
+def test_equal_dates_keep_insertion_order(tmp_path, backend):
+    data_file = str(tmp_path / 'dreams.json')
+    storage = create_storage(data_file, backend=backend)
+    for dream_id in 'bac':
+        storage.add(Dream(dream_id, dream_id, [], [], [], date=DAY, id=dream_id))
+    storage.update(storage.get_dream_at(2), {'title': 'changed'})
+    
+    for _ in range(2):
+        assert ids(storage.get_dreams()) == ['b', 'a', 'c']
+        assert [storage.get_dream_at(position).id for position in (1, 2, 3)] == ['b', 'a', 'c']
+        assert ids(storage.get_dreams_by_date_range(DAY, DAY)) == ['b', 'a', 'c']
+        storage.save()
+        storage = create_storage(data_file, backend=backend)
@@ -2,25 +2,222 @@
 Dream data visualization and charting
 """
 
+import functools
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+import matplotlib
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 from collections import Counter
-from datetime import datetime, timedelta
-from typing import Dict, List, Any
+from typing import Dict, List, Optional, Tuple
 import numpy as np
+from config import VisualizationSettings, default_settings
 from dream_models import DreamJournal
+from chart_cache import ChartCache, create_cache
+from serialization import dumpb
+
+# Bump when chart drawing code changes so cached images are not reused
+CHART_VERSION = 1
+
+# Rendering parameters every cached chart depends on
+CHART_PARAMS = {'version': CHART_VERSION, 'dpi': 300, 'matplotlib': matplotlib.__version__}
+
+
+@dataclass
+class ChartData:
+    """Aggregates every chart is drawn from, computed once per rendering run
+    
+    Holds counts only, never dreams, so it is cheap to pickle into the
+    worker processes of ``generate_all_charts``.
+    """
+    
+    total: int
+    lucid: int
+    nightmares: int
+    emotion_counts: Dict[str, int]
+    theme_counts: Dict[str, int]
+    character_counts: Dict[str, int]
+    months: List[str]
+    month_counts: List[int]
+    first_day: Optional[np.datetime64]
+    day_counts: np.ndarray
+    
+    @classmethod
+    def from_journal(cls, journal: DreamJournal) -> 'ChartData':
+        stats = journal.get_statistics()
+        dates = journal.get_date_array()
+        
+        months, month_counts = np.unique(dates.astype('datetime64[M]'), return_counts=True)
+        days = dates.astype('datetime64[D]')
+        first_day = days.min() if len(days) else None
+        day_counts = np.bincount((days - first_day).astype(np.int64)) if len(days) else np.zeros(0, dtype=np.int64)
+        
+        return cls(
+            total=stats['total_dreams'],
+            lucid=stats.get('lucid_dreams', 0),
+            nightmares=stats.get('nightmares', 0),
+            emotion_counts=stats.get('emotion_counts', {}),
+            theme_counts=stats.get('theme_counts', {}),
+            character_counts=stats.get('character_counts', {}),
+            months=[str(month) for month in months],
+            month_counts=month_counts.tolist(),
+            first_day=first_day,
+            day_counts=day_counts
+        )
+    
+    def digest(self) -> str:
+        """Content hash of everything the charts show"""
+        digest = hashlib.sha256(dumpb([
+            self.total, self.lucid, self.nightmares,
+            self.emotion_counts, self.theme_counts, self.character_counts,
+            self.months, self.month_counts, str(self.first_day)
+        ]))
+        digest.update(self.day_counts.astype('<i8').tobytes())
+        return digest.hexdigest()
+
+
+# Longest span, in days, drawn at each timeline resolution
+TIMELINE_RESOLUTIONS = [('day', 366), ('week', 5 * 366), ('month', None)]
+
+
+def bin_timeline(first_day: np.datetime64, day_counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray, str]:
+    """Rebin daily counts to the finest resolution that suits the span
+    
+    Returns the start date of each bin, the dream count per bin and the
+    resolution name. Days are summed into 7-day bins from the first day, or
+    into calendar months, with vectorized ``bincount`` / ``reduceat``.
+    """
+    span = len(day_counts)
+    resolution = next(name for name, limit in TIMELINE_RESOLUTIONS if limit is None or span <= limit)
+    days = first_day + np.arange(span)
+    
+    if resolution == 'day':
+        return days, day_counts, resolution
+    if resolution == 'week':
+        starts = np.arange(0, span, 7)
+        return days[starts], np.add.reduceat(day_counts, starts), resolution
+    
+    months = days.astype('datetime64[M]')
+    offsets = (months - months[0]).astype(np.int64)
+    counts = np.bincount(offsets, weights=day_counts, minlength=offsets[-1] + 1).astype(np.int64)
+    return (months[0] + np.arange(len(counts))).astype('datetime64[D]'), counts, resolution
+
+
+def downsample_minmax(x: np.ndarray, y: np.ndarray, buckets: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Keep the lowest and highest point of each of ``buckets`` equal slices
+    
+    Peaks and gaps survive however many points are dropped, and the output
+    never exceeds ``2 * buckets`` points. Series that already fit are
+    returned unchanged.
+    """
+    if len(y) <= 2 * buckets:
+        return x, y
+    
+    size = -(-len(y) // buckets)
+    # Pad with the last value so every slice has the same length without changing its extremes
+    padded = np.concatenate([y, np.full(size * buckets - len(y), y[-1])]).reshape(buckets, size)
+    base = np.arange(buckets)[:, None] * size
+    picks = np.sort(np.stack([padded.argmin(axis=1), padded.argmax(axis=1)], axis=1) + base, axis=1).ravel()
+    picks = np.unique(np.minimum(picks, len(y) - 1))
+    return x[picks], y[picks]
+
+
+# Charts written by generate_all_charts, in order
+CHARTS = [
+    ('emotion_chart.png', 'create_emotion_chart'),
+    ('theme_pie.png', 'create_theme_pie_chart'),
+    ('timeline.png', 'create_timeline_chart'),
+    ('dream_types.png', 'create_lucid_nightmare_chart'),
+    ('monthly_trends.png', 'create_monthly_trends'),
+    ('characters.png', 'create_character_network'),
+    ('dashboard.png', 'create_comprehensive_dashboard')
+]
+
+
+def _cached(label: str):
+    """Serve a chart method's saved PNG from the render cache when its data is unchanged"""
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, save_path: str = None) -> str:
+            previous = self._data
+            # Aggregate once for both the cache key and the drawing
+            self._data = self.chart_data()
+            try:
+                cache = self.cache
+                if not save_path or cache is None:
+                    return method(self, save_path)
+                
+                key = self._cache_key(method.__name__)
+                if cache.fetch(key, save_path):
+                    return f"{label} saved to {save_path} (cached)"
+                result = method(self, save_path)
+                if result == f"{label} saved to {save_path}":
+                    cache.store(key, save_path)
+                return result
+            finally:
+                self._data = previous
+        wrapper.chart_label = label
+        return wrapper
+    return decorate
+
+
+def _use_agg_backend():
+    # Workers only write files, so they never need a GUI backend
+    plt.switch_backend('Agg')
+
+
+def _render_chart(method: str, data: ChartData, save_path: str,
+                  settings: VisualizationSettings = None) -> Tuple[str, float]:
+    """Render one chart from a snapshot; runs in a worker process"""
+    start = time.perf_counter()
+    visualizer = DreamVisualizer(None, settings, data=data)
+    try:
+        result = getattr(visualizer, method)(save_path)
+    except Exception as e:
+        result = f"Error generating {os.path.basename(save_path)}: {e}"
+    finally:
+        plt.close('all')
+    return result, time.perf_counter() - start
 
 
 class DreamVisualizer:
     """Creates visualizations for dream data"""
     
-    def __init__(self, journal: DreamJournal):
+    def __init__(self, journal: DreamJournal, settings: VisualizationSettings = None, data: ChartData = None):
         self.journal = journal
+        self.settings = settings or default_settings().visualization
+        # Chart timings from the last generate_all_charts call, in seconds
+        self.timings: Dict[str, float] = {}
+        self._data = data
+        self._cache: Optional[ChartCache] = None
+    
+    @property
+    def cache(self) -> Optional[ChartCache]:
+        """Render cache in the chart directory, or None when disabled"""
+        if self._cache is None:
+            self._cache = create_cache(self.settings)
+        return self._cache
     
+    def _cache_key(self, method: str) -> str:
+        return ChartCache.key(method, CHART_PARAMS, self.chart_data().digest())
+    
+    def chart_data(self) -> ChartData:
+        """The aggregate snapshot being drawn, or a fresh one from the journal"""
+        if self._data is not None:
+            return self._data
+        return ChartData.from_journal(self.journal)
+    
+    def _dream_type_counts(self, data: ChartData):
+        """Normal, lucid and nightmare counts"""
+        return data.total - data.lucid - data.nightmares, data.lucid, data.nightmares
+    
+    @_cached('Emotion chart')
     def create_emotion_chart(self, save_path: str = None) -> str:
         """Create a bar chart of emotions"""
-        stats = self.journal.get_statistics()
-        emotion_counts = stats['emotion_counts']
+        emotion_counts = self.chart_data().emotion_counts
         
         if not emotion_counts:
             return "No emotion data available for visualization"
@@ -50,10 +247,10 @@ class DreamVisualizer:
             plt.show()
             return "Emotion chart displayed"
     
+    @_cached('Theme pie chart')
     def create_theme_pie_chart(self, save_path: str = None) -> str:
         """Create a pie chart of dream themes"""
-        stats = self.journal.get_statistics()
-        theme_counts = stats['theme_counts']
+        theme_counts = self.chart_data().theme_counts
         
         if not theme_counts:
             return "No theme data available for visualization"
@@ -83,39 +280,39 @@ class DreamVisualizer:
             plt.show()
             return "Theme pie chart displayed"
     
+    @_cached('Timeline chart')
     def create_timeline_chart(self, save_path: str = None) -> str:
         """Create a timeline chart of dream frequency"""
-        if not self.journal.dreams:
+        data = self.chart_data()
+        if not data.total:
             return "No dream data available for timeline visualization"
         
-        # Group dreams by date
-        dream_dates = [dream.date.date() for dream in self.journal.dreams]
-        date_counts = Counter(dream_dates)
-        
-        # Create a complete date range
-        min_date = min(dream_dates)
-        max_date = max(dream_dates)
-        
-        date_range = []
-        current_date = min_date
-        while current_date <= max_date:
-            date_range.append(current_date)
-            current_date += timedelta(days=1)
-        
-        # Create counts for all dates
-        counts = [date_counts.get(date, 0) for date in date_range]
+        # Bin by day, week or month depending on the span, then keep at most
+        # two points per pixel column so drawing cost does not grow with it
+        fig = plt.figure(figsize=(15, 6))
+        bins, counts, resolution = bin_timeline(data.first_day, data.day_counts)
+        bins, counts = downsample_minmax(bins, counts, int(fig.get_figwidth() * fig.dpi))
+        date_range = bins.tolist()
+        counts = counts.tolist()
         
-        plt.figure(figsize=(15, 6))
-        plt.plot(date_range, counts, marker='o', linewidth=2, markersize=4)
+        if resolution == 'day':
+            plt.plot(date_range, counts, marker='o', linewidth=2, markersize=4)
+        else:
+            plt.plot(date_range, counts, linewidth=1.5)
         plt.fill_between(date_range, counts, alpha=0.3)
         
         plt.title('Dream Frequency Over Time', fontsize=16, fontweight='bold')
         plt.xlabel('Date', fontsize=12)
-        plt.ylabel('Number of Dreams', fontsize=12)
+        plt.ylabel('Number of Dreams' if resolution == 'day' else f'Dreams per {resolution}', fontsize=12)
         
         # Format x-axis
-        plt.gca().xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
-        plt.gca().xaxis.set_major_locator(mdates.MonthLocator())
+        if resolution == 'day':
+            plt.gca().xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
+            plt.gca().xaxis.set_major_locator(mdates.MonthLocator())
+        else:
+            locator = mdates.AutoDateLocator()
+            plt.gca().xaxis.set_major_locator(locator)
+            plt.gca().xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
         plt.xticks(rotation=45)
         
         plt.grid(True, alpha=0.3)
@@ -128,11 +325,10 @@ class DreamVisualizer:
             plt.show()
             return "Timeline chart displayed"
     
+    @_cached('Dream types chart')
     def create_lucid_nightmare_chart(self, save_path: str = None) -> str:
         """Create a chart showing lucid dreams vs nightmares"""
-        lucid_count = len(self.journal.get_lucid_dreams())
-        nightmare_count = len(self.journal.get_nightmares())
-        normal_count = len(self.journal.dreams) - lucid_count - nightmare_count
+        normal_count, lucid_count, nightmare_count = self._dream_type_counts(self.chart_data())
         
         if lucid_count + nightmare_count + normal_count == 0:
             return "No dream data available for lucid/nightmare visualization"
@@ -160,21 +356,14 @@ class DreamVisualizer:
             plt.show()
             return "Dream types chart displayed"
     
+    @_cached('Monthly trends chart')
     def create_monthly_trends(self, save_path: str = None) -> str:
         """Create a chart showing monthly dream trends"""
-        if not self.journal.dreams:
+        data = self.chart_data()
+        sorted_months, counts = data.months, data.month_counts
+        if not sorted_months:
             return "No dream data available for monthly trends"
         
-        # Group by month
-        monthly_counts = {}
-        for dream in self.journal.dreams:
-            month_key = dream.date.strftime('%Y-%m')
-            monthly_counts[month_key] = monthly_counts.get(month_key, 0) + 1
-        
-        # Sort by month
-        sorted_months = sorted(monthly_counts.keys())
-        counts = [monthly_counts[month] for month in sorted_months]
-        
         plt.figure(figsize=(12, 6))
         plt.plot(range(len(sorted_months)), counts, marker='o', linewidth=2, markersize=6)
         plt.fill_between(range(len(sorted_months)), counts, alpha=0.3)
@@ -193,10 +382,10 @@ class DreamVisualizer:
             plt.show()
             return "Monthly trends chart displayed"
     
+    @_cached('Character chart')
     def create_character_network(self, save_path: str = None) -> str:
         """Create a simple character frequency chart"""
-        stats = self.journal.get_statistics()
-        character_counts = stats['character_counts']
+        character_counts = self.chart_data().character_counts
         
         if not character_counts:
             return "No character data available for visualization"
@@ -226,14 +415,15 @@ class DreamVisualizer:
             plt.show()
             return "Character chart displayed"
     
+    @_cached('Dashboard')
     def create_comprehensive_dashboard(self, save_path: str = None) -> str:
         """Create a comprehensive dashboard with multiple charts"""
         fig, axes = plt.subplots(2, 2, figsize=(16, 12))
         fig.suptitle('Dream Journal Dashboard', fontsize=20, fontweight='bold')
         
         # 1. Emotion bar chart
-        stats = self.journal.get_statistics()
-        emotion_counts = stats['emotion_counts']
+        data = self.chart_data()
+        emotion_counts = data.emotion_counts
         if emotion_counts:
             top_emotions = Counter(emotion_counts).most_common(5)
             emotions, counts = zip(*top_emotions)
@@ -242,9 +432,7 @@ class DreamVisualizer:
             axes[0, 0].tick_params(axis='x', rotation=45)
         
         # 2. Dream types pie chart
-        lucid_count = len(self.journal.get_lucid_dreams())
-        nightmare_count = len(self.journal.get_nightmares())
-        normal_count = len(self.journal.dreams) - lucid_count - nightmare_count
+        normal_count, lucid_count, nightmare_count = self._dream_type_counts(data)
         
         if lucid_count + nightmare_count + normal_count > 0:
             labels = ['Normal', 'Lucid', 'Nightmares']
@@ -254,21 +442,15 @@ class DreamVisualizer:
             axes[0, 1].set_title('Dream Types')
         
         # 3. Monthly trends
-        monthly_counts = {}
-        for dream in self.journal.dreams:
-            month_key = dream.date.strftime('%Y-%m')
-            monthly_counts[month_key] = monthly_counts.get(month_key, 0) + 1
-        
-        if monthly_counts:
-            sorted_months = sorted(monthly_counts.keys())
-            counts = [monthly_counts[month] for month in sorted_months]
+        sorted_months, counts = data.months, data.month_counts
+        if sorted_months:
             axes[1, 0].plot(range(len(sorted_months)), counts, marker='o')
             axes[1, 0].set_title('Monthly Trends')
             axes[1, 0].set_xticks(range(len(sorted_months)))
             axes[1, 0].set_xticklabels(sorted_months, rotation=45)
         
         # 4. Top themes
-        theme_counts = stats['theme_counts']
+        theme_counts = data.theme_counts
         if theme_counts:
             top_themes = Counter(theme_counts).most_common(5)
             themes, counts = zip(*top_themes)
@@ -284,33 +466,49 @@ class DreamVisualizer:
             plt.show()
             return "Dashboard displayed"
     
-    def generate_all_charts(self, output_dir: str = "charts") -> List[str]:
-        """Generate all available charts"""
-        import os
-        
-        # Create output directory
+    def generate_all_charts(self, output_dir: str = "charts", workers: int = None) -> List[str]:
+        """Generate all available charts
+        
+        The journal is aggregated once into a ``ChartData`` snapshot, then the
+        charts are rendered in parallel worker processes on matplotlib's Agg
+        backend. ``workers`` defaults to ``visualization.render_workers``, or
+        every core when that is unset; 1 renders in this process. Charts
+        whose data has not changed are copied from the render cache instead.
+        """
         os.makedirs(output_dir, exist_ok=True)
         
-        results = []
-        
-        # Generate each chart
-        charts = [
-            ('emotion_chart.png', self.create_emotion_chart),
-            ('theme_pie.png', self.create_theme_pie_chart),
-            ('timeline.png', self.create_timeline_chart),
-            ('dream_types.png', self.create_lucid_nightmare_chart),
-            ('monthly_trends.png', self.create_monthly_trends),
-            ('characters.png', self.create_character_network),
-            ('dashboard.png', self.create_comprehensive_dashboard)
-        ]
-        
-        for filename, chart_func in charts:
-            filepath = os.path.join(output_dir, filename)
-            try:
-                result = chart_func(filepath)
-                results.append(result)
-                plt.close('all')  # Close all figures to prevent memory issues
-            except Exception as e:
-                results.append(f"Error generating {filename}: {e}")
+        if workers is None:
+            workers = self.settings.render_workers or os.cpu_count() or 1
+        
+        previous = self._data
+        data = self._data = self.chart_data()
+        try:
+            rendered: Dict[str, Tuple[str, float]] = {}
+            jobs = []
+            for filename, method in CHARTS:
+                save_path = os.path.join(output_dir, filename)
+                start = time.perf_counter()
+                if self.cache is not None and self.cache.fetch(self._cache_key(method), save_path):
+                    label = getattr(self, method).chart_label
+                    rendered[filename] = (f"{label} saved to {save_path} (cached)", time.perf_counter() - start)
+                else:
+                    jobs.append((filename, (method, data, save_path, self.settings)))
+        finally:
+            self._data = previous
+        
+        workers = min(workers, len(jobs))
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_use_agg_backend) as executor:
+                results = executor.map(_render_chart, *zip(*(job for _, job in jobs)))
+                rendered.update(zip((filename for filename, _ in jobs), results))
+        else:
+            for filename, job in jobs:
+                rendered[filename] = _render_chart(*job)
         
-        return results
\ No newline at end of file
+        results = []
+        self.timings = {}
+        for filename, _ in CHARTS:
+            result, elapsed = rendered[filename]
+            self.timings[filename] = elapsed
+            results.append(f"{result} ({elapsed:.2f}s)")
+        return results